@@ -1,6 +1,6 @@
 import time
-import sys
-from google.cloud import speech
+import clients
+from transcriptsink import TranscriptWriter
 
 # Constants
 RATE = 16000  # Sample rate (16kHz)
@@ -10,9 +10,15 @@ SILENCE_THRESHOLD = 2  # in seconds, define how long to wait before finalizing a
 class AudioTranscriber:
     """Handles the audio transcription using Google Cloud Speech API."""
 
-    def __init__(self, language_code: str = LANGUAGE_CODE, silence_threshold=SILENCE_THRESHOLD):
+    def __init__(self, language_code: str = LANGUAGE_CODE, silence_threshold=SILENCE_THRESHOLD, speculator=None, output=None):
         self.language_code = language_code
-        self.client = speech.SpeechClient()
+        self.speculator = speculator  # Optional SpeculativeGenerator fed with interim transcripts
+        # Transcripts are written by a background TranscriptWriter, the terminal's by default
+        self._owns_output = output is None
+        self.output = output or TranscriptWriter()
+        # One SpeechClient per process, shared by every transcriber
+        speech = clients.module(clients.SPEECH)
+        self.client = clients.get(clients.SPEECH)
         self.streaming_config = speech.StreamingRecognitionConfig(
             config=speech.RecognitionConfig(
                 encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
@@ -27,7 +33,6 @@ class AudioTranscriber:
 
     def listen_for_transcriptions(self, responses) -> str:
         """Processes streaming responses and returns the final transcription."""
-        num_chars_printed = 0
         for response in responses:
             if not response.results:
                 continue
@@ -37,30 +42,37 @@ class AudioTranscriber:
                 continue
 
             transcript = result.alternatives[0].transcript
-            overwrite_chars = " " * (num_chars_printed - len(transcript))
 
             # Update the last speech time whenever speech is detected
             if result.is_final:
                 self.last_speech_time = time.time()
 
-            # If the transcript is not final, continue to print interim results
+            # If the transcript is not final, continue to show interim results
             if not result.is_final:
-                sys.stdout.write(transcript + overwrite_chars + "\r")
-                sys.stdout.flush()
-                num_chars_printed = len(transcript)
+                self.output.interim(transcript)
+                if self.speculator:
+                    self.speculator.on_interim(transcript)
             else:
-                print(f"Final Transcript Detected: {transcript + overwrite_chars}")
-                num_chars_printed = 0
+                self.output.final(transcript)
 
                 # Store the final transcript if it's not empty
                 self.finalized_transcript = transcript.strip() if transcript.strip() else None
 
+                # A speculator answers every final it was fed interims for, so each one is returned
+                if self.speculator and self.finalized_transcript:
+                    return self.finalized_transcript
+
                 # Once a final transcript is detected, we check for silence or speaker change
                 if self._detect_silence_or_speaker_change():
                     return self.finalized_transcript  # Return final transcript
 
         return ""
 
+    def close(self) -> None:
+        """Close the TranscriptWriter this transcriber created; one passed in is the caller's."""
+        if self._owns_output:
+            self.output.close()
+
     def _detect_silence_or_speaker_change(self) -> bool:
         """Detects if silence or a speaker change has occurred based on the silence threshold."""
         current_time = time.time()
@@ -68,7 +80,7 @@ class AudioTranscriber:
 
         # Check if silence has exceeded the threshold, signaling a possible pause or speaker change
         if time_since_last_speech > self.silence_threshold:
-            print("Silence or speaker change detected, finalizing transcript...")
+            self.output.note("Silence or speaker change detected, finalizing transcript...")
             return True  # Return True when silence or speaker change is detected
 
         return False
@@ -0,0 +1,361 @@
+import os
+import queue
+import re
+import sys
+import threading
+from collections import deque
+from types import SimpleNamespace
+
+# The shared modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import clients
+
+RATE = 16000  # Sample rate (16kHz)
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+STREAM_LIMIT = 290  # seconds of audio per stream, under the API's 305 s cap
+
+
+def _normalize(text: str) -> list:
+    return re.sub(r"[^\w\s']", "", text.lower()).split()
+
+
+def _seconds(result):
+    """A result's end offset in its stream's audio, or None if it has none."""
+    end = getattr(result, "result_end_time", None)
+    return end.total_seconds() if end is not None else None
+
+
+class _RecognitionStream:
+    """One streaming_recognize call fed from its own audio queue on a background thread."""
+
+    def __init__(self, index: int, client, streaming_config, make_request) -> None:
+        self.index = index
+        self.seconds = 0.0  # Audio fed so far
+        self.error = None
+        self.ended = False  # The call has returned; audio fed now is never read
+        self.replayed_seconds = 0.0  # Audio from the previous stream fed in first
+        self._client = client
+        self._streaming_config = streaming_config
+        self._make_request = make_request
+        self._audio = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _requests(self):
+        while True:
+            chunk = self._audio.get()
+            if chunk is None:
+                return
+            yield self._make_request(chunk)
+
+    def _run(self) -> None:
+        try:
+            for response in self._client.streaming_recognize(self._streaming_config, self._requests()):
+                self._results.put(response)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ended = True
+            self._results.put(None)
+
+    def feed(self, chunk: bytes) -> None:
+        self._audio.put(chunk)
+        self.seconds += len(chunk) / (RATE * SAMPLE_WIDTH)
+
+    def finish(self) -> None:
+        """No more audio; the recognizer finalizes what it has and the stream ends."""
+        self._audio.put(None)
+
+    def wait(self) -> None:
+        """Block until the call has returned."""
+        self._thread.join()
+
+    def unread(self) -> list:
+        """Takes back the chunks fed to an ended stream that it never read."""
+        chunks = []
+        while True:
+            try:
+                chunk = self._audio.get_nowait()
+            except queue.Empty:
+                return chunks
+            if chunk is not None:
+                chunks.append(chunk)
+
+    def responses(self):
+        while True:
+            response = self._results.get()
+            if response is None:
+                return
+            yield response
+
+
+class SessionManager:
+    """Keeps one logical transcription session alive across recognition stream limits.
+
+    The next stream is opened `prewarm_seconds` before the current one reaches
+    `rotate_after` seconds of audio. At the switch the last `overlap_seconds` of
+    audio are replayed into the new stream so nothing spoken at the seam is lost,
+    and words the new stream repeats from the old one's final transcripts over
+    that audio are trimmed. A stream that fails, or that the recognizer ends on
+    its own, is replaced the same way.
+    """
+
+    def __init__(
+        self,
+        client,
+        streaming_config,
+        audio,
+        rotate_after: float = STREAM_LIMIT,
+        prewarm_seconds: float = 5.0,
+        overlap_seconds: float = 2.0,
+        make_request=None,
+    ) -> None:
+        """
+        Args:
+            client: A speech.SpeechClient, or anything with a compatible streaming_recognize.
+            streaming_config: The StreamingRecognitionConfig for every stream.
+            audio: Iterable of PCM chunks, e.g. MicStream.empty_buffer().
+            rotate_after (float): Seconds of audio after which a stream is replaced.
+            prewarm_seconds (float): How early the replacement stream is opened.
+            overlap_seconds (float): Audio replayed into the replacement stream.
+            make_request: Builds a request from audio bytes; defaults to
+                speech.StreamingRecognizeRequest.
+        """
+        self.client = client
+        self.streaming_config = streaming_config
+        self.rotate_after = rotate_after
+        self.prewarm_seconds = prewarm_seconds
+        self.overlap_seconds = overlap_seconds
+        self.overlap_bytes = int(overlap_seconds * RATE * SAMPLE_WIDTH)
+        if make_request is None:
+            speech = clients.module(clients.SPEECH)
+            make_request = lambda chunk: speech.StreamingRecognizeRequest(audio_content=chunk)
+        self.make_request = make_request
+        self.rotations = 0
+        self.errors = []
+        self.ended_early = 0  # Streams the recognizer closed without an error before rotation
+        self.trimmed_words = 0
+        self.finished = False
+
+        self._audio = audio
+        self._streams = queue.Queue()  # Streams in the order their results are read
+        self._overlap = deque()
+        self._overlap_size = 0
+        self._stop = threading.Event()
+        self._pump = None
+
+    def __enter__(self):
+        self._pump = threading.Thread(target=self._pump_audio, daemon=True)
+        self._pump.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._stop.set()
+
+    def _open_stream(self) -> _RecognitionStream:
+        stream = _RecognitionStream(self.rotations + 1, self.client, self.streaming_config, self.make_request)
+        self._streams.put(stream)
+        return stream
+
+    def _remember(self, chunk: bytes) -> None:
+        """Keep the last overlap_bytes of audio for replay into the next stream."""
+        self._overlap.append(chunk)
+        self._overlap_size += len(chunk)
+        while self._overlap and self._overlap_size - len(self._overlap[0]) >= self.overlap_bytes:
+            self._overlap_size -= len(self._overlap.popleft())
+
+    def _hand_over(self, active: _RecognitionStream, standby, replay: list) -> _RecognitionStream:
+        """Finish active and start its successor on the replay audio; returns the successor."""
+        if active.error is not None:
+            self.errors.append(active.error)
+        elif active.ended:
+            self.ended_early += 1
+        self.rotations += 1
+        successor = standby or self._open_stream()
+        successor.replayed_seconds = sum(map(len, replay)) / (RATE * SAMPLE_WIDTH)
+        active.finish()
+        for replayed in replay:
+            successor.feed(replayed)
+        return successor
+
+    def _pump_audio(self) -> None:
+        """Feeds audio to the active stream and rotates streams as they near their limit or end."""
+        active = self._open_stream()
+        standby = None
+        try:
+            for chunk in self._audio:
+                if self._stop.is_set():
+                    return
+                chunk = bytes(chunk)
+                self._remember(chunk)
+
+                if not active.ended:
+                    active.feed(chunk)
+                    if standby is None and active.seconds >= self.rotate_after - self.prewarm_seconds:
+                        standby = self._open_stream()
+                    if active.seconds < self.rotate_after:
+                        continue
+                    replay = list(self._overlap)
+                else:
+                    # Audio queued behind an ended stream was never heard, so it is replayed whole
+                    unread = active.unread() + [chunk]
+                    replay = unread if sum(map(len, unread)) > self._overlap_size else list(self._overlap)
+
+                # Hand over: the new stream starts with the recent audio, including this chunk
+                active, standby = self._hand_over(active, standby, replay), None
+
+            # The audio has ended; a stream that stopped before reading the rest hands it on
+            replay = None
+            while not self._stop.is_set():
+                active.finish()
+                active.wait()
+                unread = active.unread()
+                if not unread or unread == replay:
+                    return  # All heard, or the last stream read none of it
+                replay = unread
+                active, standby = self._hand_over(active, standby, replay), None
+        finally:
+            active.finish()
+            if standby is not None:
+                standby.finish()
+            self._streams.put(None)
+
+    def _trim_seam(self, transcript: str, expected: list) -> tuple:
+        """Drop leading words that repeat what the old stream heard before the seam.
+
+        expected holds the normalized words the old stream heard in the audio
+        replayed into the new one. The replay can span an earlier final
+        transcript as well as the one the old stream cut short, so a
+        transcript that repeats a run from the middle of expected is dropped
+        whole and the seam continues after that run.
+
+        Returns the trimmed transcript, the number of words removed and the
+        expected words left, or None once past the seam.
+        """
+        words = transcript.split()
+        normalized = _normalize(transcript)
+        if len(words) != len(normalized):
+            return transcript, 0, None
+        for n in range(min(len(expected), len(normalized)), 0, -1):
+            if expected[-n:] == normalized[:n]:
+                return " ".join(words[n:]), n, None
+        n = len(normalized)
+        for j in range(len(expected) - n, -1, -1):
+            if expected[j : j + n] == normalized:
+                return "", n, expected[j + n :]
+        return transcript, 0, None
+
+    def responses(self):
+        """Yields recognizer responses from every stream in order, as one continuous session."""
+        previous = None
+        heard = []  # (end seconds, normalized words) of the finals of the stream being read
+        while True:
+            stream = self._streams.get()
+            if stream is None:
+                self.finished = True
+                return
+
+            expected = None  # Words the new stream may repeat, from the audio replayed into it
+            if previous is not None:
+                replayed_from = previous.seconds - stream.replayed_seconds
+                expected = [word for end, words in heard if end is None or end >= replayed_from for word in words]
+            previous = stream
+            heard = deque(maxlen=50)
+            for response in stream.responses():
+                if not response.results or not response.results[0].alternatives:
+                    yield response
+                    continue
+
+                result = response.results[0]
+                transcript = result.alternatives[0].transcript
+                if result.is_final:
+                    heard.append((_seconds(result), _normalize(transcript)))
+                if expected is not None:
+                    trimmed, removed, rest = self._trim_seam(transcript, expected)
+                    if result.is_final:
+                        expected = rest
+                        self.trimmed_words += removed
+                    if result.is_final and not trimmed.strip():
+                        continue  # Entirely a repeat of audio already transcribed
+                    if trimmed != transcript:
+                        transcript = trimmed
+                        response = SimpleNamespace(
+                            results=[
+                                SimpleNamespace(
+                                    alternatives=[SimpleNamespace(transcript=trimmed)],
+                                    is_final=result.is_final,
+                                    result_end_time=getattr(result, "result_end_time", None),
+                                )
+                            ]
+                        )
+                yield response
+
+
+def _session_finals(client, pcm: bytes, chunk: int) -> tuple:
+    """Runs pcm through a session on client; returns its final words and the session."""
+    finals = []
+    with SessionManager(
+        client,
+        None,
+        (pcm[i : i + chunk] for i in range(0, len(pcm), chunk)),
+        rotate_after=2.5,
+        prewarm_seconds=0.5,
+        overlap_seconds=1.0,
+        make_request=lambda audio: audio,
+    ) as session:
+        for response in session.responses():
+            result = response.results[0]
+            if result.is_final:
+                finals += result.alternatives[0].transcript.split()
+    return finals, session
+
+
+def check(utterances: int = 6, words_per_utterance: int = 8) -> dict:
+    """Asserts that a session rotating through a fake recognizer keeps every word exactly once.
+
+    Replays scripted utterances through fakerecognizer.FakeSpeechClient with a
+    3 s stream limit and rotation at 2.5 s, so several seams fall inside
+    utterances, and compares the final transcripts with the script. The script
+    is then replayed to a recognizer that ends each stream after one utterance,
+    which the session must replace rather than keep feeding.
+    """
+    from fakerecognizer import FakeSpeechClient, encode_script
+
+    vocabulary = [f"word{i}" for i in range(utterances * words_per_utterance)]
+    script = []
+    for i in range(utterances):
+        script += vocabulary[i * words_per_utterance : (i + 1) * words_per_utterance] + [None] * 4
+    pcm = encode_script(script, vocabulary, RATE)
+    chunk = RATE * SAMPLE_WIDTH // 10  # 100 ms
+    expected = [word for word in script if word is not None]
+
+    client = FakeSpeechClient(vocabulary, RATE, max_stream_seconds=3.0)
+    finals, session = _session_finals(client, pcm, chunk)
+    duplicated = sorted(word for word in set(finals) if finals.count(word) > 1)
+    lost = [word for word in expected if word not in finals]
+    assert not session.errors, session.errors
+    assert session.rotations >= 3, session.rotations
+    assert not duplicated and not lost, f"duplicated {duplicated}, lost {lost}"
+    assert finals == expected, finals
+
+    # Streams that end after each utterance are replaced, not fed into a closed call
+    ended_finals, ended_session = _session_finals(
+        FakeSpeechClient(vocabulary, RATE, single_utterance=True), pcm, chunk
+    )
+    assert not ended_session.errors, ended_session.errors
+    assert ended_session.ended_early >= utterances - 1, ended_session.ended_early
+    assert ended_finals == expected, ended_finals
+    return {
+        "words": len(finals),
+        "rotations": session.rotations,
+        "streams": client.streams_opened,
+        "trimmed_words": session.trimmed_words,
+        "streams_ended_early": ended_session.ended_early,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python SessionManager.py
+    print(f"Seams kept every word exactly once: {check()}")
@@ -1,17 +1,19 @@
-from vertexai.preview.generative_models import (
-    GenerativeModel,
-    SafetySetting,
-    Tool,
-)
-from vertexai.preview.generative_models import grounding
-from google.auth.credentials import AnonymousCredentials
-import vertexai
+import time
+import clients
+from responsecache import ResponseCache
 
 class VertexModel:
     """Handles generating content using the Vertex AI model."""
     
-    def __init__(self, project_id: str, location: str):
-        """Initialize Vertex AI model and set up generation configurations."""
+    def __init__(self, project_id: str, location: str, cache: ResponseCache = None, model=None):
+        """Set up generation configurations and start loading the model in the background.
+
+        model, if given (e.g. a fakellm.FakeLLM), is used instead of Gemini and
+        gets no safety settings.
+        """
+        self.model_name = "gemini-1.5-pro-002"
+        self.cache = cache  # Optional cache for repeated questions
+        self._model = model
         
         # Shared generation config
         self.generation_config = {
@@ -20,52 +22,60 @@ class VertexModel:
             "top_p": 0.95,
         }
         
-        # Shared safety settings
-        self.safety_settings = [
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-        ]
-        
-        # Initialize tools
-        self.tools = [
-            Tool.from_google_search_retrieval(
-                google_search_retrieval=grounding.GoogleSearchRetrieval()
-            ),
-        ]
-        
-        # Initialize Vertex AI
-        vertexai.init(project=project_id, location=location)
-        
-        # Initialize the model
-        self.model = GenerativeModel(
-            "gemini-1.5-pro-002",
-            tools=self.tools,
-        )
+        # Vertex AI and the grounded model are shared per process and built off the main thread
+        self._model_options = {
+            "model_name": self.model_name,
+            "project_id": project_id,
+            "location": location,
+        }
+        if model is None:
+            clients.warm((clients.GEMINI, self._model_options))
+
+    @property
+    def model(self):
+        """The GenerativeModel; waits for the background load on first use."""
+        if self._model is not None:
+            return self._model
+        return clients.get(clients.GEMINI, **self._model_options)
+
+    def generate_tokens(self, transcript: str):
+        """Yields the model's answer to the transcript as it streams in."""
+        cache_config = {"model": self.model_name, **self.generation_config}
+        if self.cache is not None:
+            cached = self.cache.get(transcript, cache_config)
+            if cached is not None:
+                yield cached
+                return
 
-    def generate_response_from_transcript(self, transcript: str) -> None:
-        """Generates content using Vertex AI model based on the transcript."""
         # Use the pre-defined generation config and safety settings
+        started = time.perf_counter()
         responses = self.model.generate_content(
             [transcript],
             generation_config=self.generation_config,
-            safety_settings=self.safety_settings,
+            safety_settings=clients.safety_settings() if self._model is None else None,
             stream=True,
         )
 
+        parts = []
         for response in responses:
             if response.candidates and response.candidates[0].content.parts:
-                print(response.text, end="")
+                parts.append(response.text)
+                yield response.text
+
+        # Only answers that streamed to completion are cached
+        if self.cache is not None:
+            self.cache.put(transcript, cache_config, "".join(parts), time.perf_counter() - started)
+
+    def generate_response_from_transcript(self, transcript: str, tokens=None, output=None) -> None:
+        """Generates content using Vertex AI model based on the transcript.
+
+        tokens, if given, is an already-started answer (e.g. from a SpeculativeGenerator).
+        output, a transcriptsink.TranscriptWriter, takes the answer instead of stdout.
+        """
+        for text in tokens if tokens is not None else self.generate_tokens(transcript):
+            if output:
+                output.token(text)
+            else:
+                print(text, end="")
+        if output:
+            output.answer_done()
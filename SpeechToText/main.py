@@ -1,29 +1,70 @@
-from AudioTranscriber import AudioTranscriber
-
+import sys
+# MicStream first: it puts the repository root on sys.path for the shared modules
 from MicStream import MicStream
+import clients
+from AudioTranscriber import AudioTranscriber
+from audiosource import source_from_args
+from vad import VoiceActivityGate
 from VertexModel import VertexModel
-from google.cloud import speech
+from SessionManager import SessionManager
+from responsecache import ResponseCache
+from speculation import SpeculativeGenerator
+from transcriptsink import TranscriptWriter, sinks_from_args
 
 PROJECT_ID = "propane-sphinx-448317-p4"
 LOCATION = "us-east1"
+RATE = 16000
+CHUNK = int(RATE / 10)  # 100ms
+
+def main(source=None, vad=False, speculate=False, startup_report=False, sinks=None):
+    # The speech client loads in the background; VertexModel warms its own model
+    clients.warm(
+        clients.SPEECH,
+        on_ready=(lambda report: print(clients.format_startup_report(report))) if startup_report else None,
+    )
 
-def main():
     # Initialize Audio Transcriber and Content Generator
-    audio_transcriber = AudioTranscriber()
-    vertex_model = VertexModel(PROJECT_ID, LOCATION)
+    vertex_model = VertexModel(
+        PROJECT_ID, LOCATION, cache=ResponseCache(disk_path="data/response_cache.sqlite")
+    )
+    # Optionally start answering once an interim transcript stops changing
+    speculator = SpeculativeGenerator(vertex_model.generate_tokens) if speculate else None
+
+    # Transcripts and answers are written off the recognizer's thread
+    with TranscriptWriter(sinks) as output, MicStream(source=source) as stream:
+        clients.mark("capture_started")
+        # Waits for the speech client while the first audio is already buffering
+        audio_transcriber = AudioTranscriber(speculator=speculator, output=output)
+        audio_generator = stream.empty_buffer()
+        if vad:
+            # Only send audio that contains speech
+            audio_generator = VoiceActivityGate(RATE).filter(audio_generator)
 
-    with MicStream() as stream:
-        audio_generator = stream.generator()
-        requests = (
-            speech.StreamingRecognizeRequest(audio_content=content)
-            for content in audio_generator
-        )
-        while True:
-            # Start the transcription process
-            responses = audio_transcriber.client.streaming_recognize(audio_transcriber.streaming_config, requests)
-            transcript = audio_transcriber.listen_for_transcriptions(responses)
-            if transcript:
-                vertex_model.generate_response_from_transcript(transcript)
+        # One session spans as many recognition streams as the stream limit requires
+        with SessionManager(
+            audio_transcriber.client, audio_transcriber.streaming_config, audio_generator
+        ) as session:
+            responses = session.responses()
+            while not session.finished:
+                # Start the transcription process
+                transcript = audio_transcriber.listen_for_transcriptions(responses)
+                if transcript:
+                    vertex_model.generate_response_from_transcript(
+                        transcript, speculator.on_final(transcript) if speculator else None, output
+                    )
 
 if __name__ == "__main__":
-    main()
+    # Optional arguments replay a file or synthetic audio, e.g. "recording.wav max --vad"
+    # --jsonl, --socket and --journal send transcripts and answers where raven.py does
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(
+        source_from_args(args, RATE, CHUNK),
+        vad="--vad" in sys.argv,
+        speculate="--speculate" in sys.argv,
+        startup_report="--startup" in sys.argv,
+        sinks=sinks_from_args(
+            jsonl="logs/transcripts.jsonl" if "--jsonl" in sys.argv else None,
+            address=("127.0.0.1", 7878) if "--socket" in sys.argv else None,
+            journal="data/journal" if "--journal" in sys.argv else None,
+        ),
+    )
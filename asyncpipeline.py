@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import sys
+import threading
+
+from transcriptsink import TranscriptWriter
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iterator, stop: threading.Event = None):
+    """Runs a blocking iterator on a worker thread and yields its items to the event loop.
+
+    Setting `stop`, or abandoning/cancelling the async iteration, makes the
+    thread stop pulling after its current item.
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    stop = stop or threading.Event()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, (item, error))
+        except RuntimeError:  # The loop has already closed
+            stop.set()
+
+    def run():
+        try:
+            for item in make_iterator():
+                if stop.is_set():
+                    break
+                put(item)
+        except Exception as e:
+            put(_DONE, e)
+            return
+        put(_DONE)
+
+    loop.run_in_executor(None, run)
+    try:
+        while True:
+            item, error = await items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def iterate_from_thread(async_iterable, loop: asyncio.AbstractEventLoop):
+    """Blocking iterator over an async iterable owned by `loop`, for use on another thread."""
+    iterator = async_iterable.__aiter__()
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+
+async def recognize(client, streaming_config, audio, make_request):
+    """Async iterator over streaming_recognize responses.
+
+    audio may be a plain or an async iterable of PCM chunks. The gRPC call runs on
+    a worker thread, so awaiting a slow consumer never stalls the recognizer.
+    """
+    if hasattr(audio, "__aiter__"):
+        audio = iterate_from_thread(audio, asyncio.get_running_loop())
+    requests = (make_request(bytes(chunk)) for chunk in audio)
+    async for response in iterate_in_thread(
+        lambda: client.streaming_recognize(streaming_config, requests)
+    ):
+        yield response
+
+
+class GenerationQueue:
+    """Runs LLM generations as asyncio tasks with bounded concurrency.
+
+    generate_tokens(transcript) is a blocking iterator of text chunks (e.g. a
+    streaming generate_content call); it runs on a worker thread and each chunk
+    is passed to on_token(utterance_id, token). on_start(utterance_id) is called
+    when a generation gets its slot and on_done(utterance_id) once it has
+    streamed every chunk. With supersede=True, submitting
+    a new utterance cancels every earlier generation that is still queued or
+    streaming.
+    """
+
+    def __init__(
+        self,
+        generate_tokens,
+        max_concurrent: int = 1,
+        supersede: bool = True,
+        on_token=None,
+        on_start=None,
+        on_done=None,
+    ) -> None:
+        self.generate_tokens = generate_tokens
+        self.supersede = supersede
+        self.on_token = on_token or (lambda utterance_id, token: print(token, end="", flush=True))
+        self.on_start = on_start
+        self.on_done = on_done
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._ids = itertools.count(1)
+        self._tasks = {}
+
+        # Statistics
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def submit(self, transcript: str) -> asyncio.Task:
+        """Schedule a generation for transcript and return its task."""
+        utterance_id = next(self._ids)
+        if self.supersede:
+            self.cancel_before(utterance_id)
+        task = asyncio.create_task(self._generate(utterance_id, transcript))
+        self._tasks[utterance_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(utterance_id, None))
+        self.submitted += 1
+        return task
+
+    def cancel_before(self, utterance_id: int) -> None:
+        """Cancel in-flight generations for utterances older than utterance_id."""
+        for earlier, task in list(self._tasks.items()):
+            if earlier < utterance_id and not task.done():
+                task.cancel()
+
+    async def _generate(self, utterance_id: int, transcript: str) -> None:
+        try:
+            async with self._slots:
+                if self.on_start:
+                    self.on_start(utterance_id)
+                async for token in iterate_in_thread(lambda: self.generate_tokens(transcript)):
+                    self.on_token(utterance_id, token)
+            if self.on_done:
+                self.on_done(utterance_id)
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    async def drain(self) -> None:
+        """Wait for every queued and running generation to finish or be cancelled."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._tasks),
+        }
+
+
+async def listen_print_loop(responses, generations: GenerationQueue, latency=None, output: TranscriptWriter = None) -> str:
+    """Async listen_print_loop: writes transcripts and hands finals to the generation queue.
+
+    Unlike the synchronous loop, recognizer responses keep being consumed while
+    answers stream. Every result is passed to latency, a LatencyTracker, if
+    given. Transcripts go to output, or to a TranscriptWriter on the terminal
+    made for this loop.
+    """
+    if output is None:
+        with TranscriptWriter() as output:
+            return await listen_print_loop(responses, generations, latency, output)
+
+    final_transcript = ""
+    async for response in responses:
+        if not response.results:
+            continue
+
+        result = response.results[0]
+        if not result.alternatives:
+            continue
+        if latency:
+            latency.result_received(result)
+
+        transcript = result.alternatives[0].transcript
+
+        if not result.is_final:
+            output.interim(transcript)
+        else:
+            output.final(transcript)
+
+            if transcript.strip():  # Only pass non-empty transcriptions
+                generations.submit(transcript)
+                final_transcript = transcript
+            else:
+                output.note("Skipping empty or noise-only transcription.")
+
+    await generations.drain()
+    return final_transcript
+
+
+async def run_pipeline(
+    client,
+    streaming_config,
+    audio,
+    generate_tokens,
+    make_request,
+    max_concurrent: int = 1,
+    supersede: bool = True,
+    latency=None,
+    output: TranscriptWriter = None,
+) -> str:
+    """Transcribe audio and answer each final transcript without blocking transcription.
+
+    Transcripts and answers go to output, a TranscriptWriter (the terminal's if
+    omitted), and latency, a LatencyTracker, times the results and answers as
+    the synchronous loop does.
+    """
+    if output is None:
+        with TranscriptWriter() as output:
+            return await run_pipeline(
+                client, streaming_config, audio, generate_tokens, make_request,
+                max_concurrent, supersede, latency, output,
+            )
+
+    def on_token(utterance_id, token):
+        if latency:
+            latency.token()
+        output.token(token)
+
+    def on_done(utterance_id):
+        output.answer_done()
+        if latency:
+            latency.llm_done()
+
+    generations = GenerationQueue(
+        generate_tokens,
+        max_concurrent=max_concurrent,
+        supersede=supersede,
+        on_token=on_token,
+        on_start=(lambda utterance_id: latency.llm_request()) if latency else None,
+        on_done=on_done,
+    )
+    responses = recognize(client, streaming_config, audio, make_request)
+    final_transcript = await listen_print_loop(responses, generations, latency, output)
+    output.note(f"\nGeneration stats: {generations.stats()}")
+    return final_transcript
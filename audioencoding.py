@@ -0,0 +1,230 @@
+import io
+import sys
+import time
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:  # Compressed transport is optional; LINEAR16 needs nothing extra
+    soundfile = None
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+# codec -> (soundfile format, soundfile subtype, RecognitionConfig.AudioEncoding name)
+CODECS = {
+    "flac": ("FLAC", "PCM_16", "FLAC"),
+    "ogg_opus": ("OGG", "OPUS", "OGG_OPUS"),
+}
+
+
+class _StreamSink:
+    """Write-only file object for libsndfile that hands out bytes as they are appended.
+
+    The encoder only seeks back when it closes, to patch stream lengths into
+    headers the receiver has already been sent. Streaming receivers do without
+    them, so they are kept aside in `patches` rather than sent, and memory
+    stays bounded by what has not been collected yet.
+    """
+
+    def __init__(self) -> None:
+        self._pending = bytearray()
+        self._position = 0
+        self._end = 0
+        self.patches = []  # (offset, bytes) rewrites of already-sent data
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if self._position < self._end:
+            overlap = min(len(data), self._end - self._position)
+            self.patches.append((self._position, data[:overlap]))
+            self._pending += data[overlap:]
+        else:
+            self._pending += data
+        self._position += len(data)
+        self._end = max(self._end, self._position)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self._end}[whence]
+        self._position = base + offset
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        return b""
+
+    def collect(self) -> bytes:
+        data = bytes(self._pending)
+        self._pending.clear()
+        return data
+
+
+class AudioEncoder:
+    """Compresses MicStream's LINEAR16 output to FLAC or Ogg/Opus on the fly.
+
+    encode() returns whatever compressed bytes the codec has produced so far
+    (possibly none while it fills a frame); close() flushes the rest. `encoding`
+    names the matching RecognitionConfig.AudioEncoding.
+
+    FLAC emits a frame per chunk and is lossless. Opus is roughly 10x smaller
+    but libsndfile only emits whole Ogg pages, which holds back about a second
+    of audio; prefer FLAC where time-to-transcript matters more than bandwidth.
+    """
+
+    def __init__(self, codec: str, rate: int, channels: int = 1) -> None:
+        if soundfile is None:
+            raise RuntimeError("soundfile is required for FLAC/Opus transport")
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {list(CODECS)}")
+
+        file_format, subtype, self.encoding = CODECS[codec]
+        self.codec = codec
+        self.channels = channels
+        self._sink = _StreamSink()
+        self._file = soundfile.SoundFile(
+            self._sink, mode="w", samplerate=rate, channels=channels, format=file_format, subtype=subtype
+        )
+        self._remainder = b""
+
+        # Statistics
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def encode(self, chunk) -> bytes:
+        started = time.process_time()
+        self.bytes_in += len(chunk)
+        data = self._remainder + bytes(chunk) if self._remainder else chunk
+        frame_bytes = SAMPLE_WIDTH * self.channels
+        usable = len(data) - len(data) % frame_bytes
+        self._remainder = bytes(data[usable:])
+
+        samples = np.frombuffer(data, dtype=np.int16, count=usable // SAMPLE_WIDTH)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels)
+        self._file.write(samples)
+        encoded = self._sink.collect()
+        self.bytes_out += len(encoded)
+        self.cpu_seconds += time.process_time() - started
+        return encoded
+
+    def close(self) -> bytes:
+        """Flush the encoder and return its final bytes."""
+        started = time.process_time()
+        self._file.close()
+        encoded = self._sink.collect()
+        self.bytes_out += len(encoded)
+        self.cpu_seconds += time.process_time() - started
+        return encoded
+
+    def filter(self, chunks):
+        """Wraps a PCM chunk generator, yielding compressed chunks."""
+        for chunk in chunks:
+            encoded = self.encode(chunk)
+            if encoded:
+                yield encoded
+        tail = self.close()
+        if tail:
+            yield tail
+
+    def stats(self) -> dict:
+        return {
+            "codec": self.codec,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": self.bytes_in / self.bytes_out if self.bytes_out else 0.0,
+            "cpu_seconds": round(self.cpu_seconds, 4),
+        }
+
+
+def recognition_config(speech, rate: int, language_code: str, codec: str = None):
+    """Builds a RecognitionConfig whose encoding matches the transport codec (None for LINEAR16)."""
+    encoding = "LINEAR16" if codec is None else CODECS[codec][2]
+    return speech.RecognitionConfig(
+        encoding=getattr(speech.RecognitionConfig.AudioEncoding, encoding),
+        sample_rate_hertz=rate,
+        language_code=language_code,
+    )
+
+
+def _decode(encoded: bytes, patches: list) -> np.ndarray:
+    """Decodes streamed output after applying the header patches the encoder wrote at close."""
+    data = bytearray(encoded)
+    for offset, patch in patches:
+        data[offset : offset + len(patch)] = patch
+    samples, _ = soundfile.read(io.BytesIO(bytes(data)), dtype="int16")
+    return samples
+
+
+def benchmark(pcm: bytes, rate: int, chunk: int) -> list:
+    """Round-trips pcm through every codec in `chunk`-frame pieces.
+
+    Reports bytes on the wire, CPU per audio second, and fidelity: FLAC must
+    decode bit-exact, Opus is reported as SNR in dB.
+    """
+    audio_seconds = len(pcm) / (rate * SAMPLE_WIDTH)
+    original = np.frombuffer(pcm, dtype=np.int16).astype(np.float64)
+    results = [
+        {
+            "codec": "linear16",
+            "bytes_on_wire": len(pcm),
+            "kbit_per_s": round(len(pcm) * 8 / audio_seconds / 1000, 1),
+            "cpu_ms_per_audio_s": 0.0,
+        }
+    ]
+    step = chunk * SAMPLE_WIDTH
+    for codec in CODECS:
+        encoder = AudioEncoder(codec, rate)
+        encoded = b"".join(encoder.filter(pcm[i : i + step] for i in range(0, len(pcm), step)))
+        decoded = _decode(encoded, encoder._sink.patches).astype(np.float64)
+
+        row = {
+            "codec": codec,
+            "bytes_on_wire": len(encoded),
+            "kbit_per_s": round(len(encoded) * 8 / audio_seconds / 1000, 1),
+            "cpu_ms_per_audio_s": round(encoder.cpu_seconds / audio_seconds * 1000, 3),
+        }
+        if codec == "flac":
+            row["lossless"] = bool(np.array_equal(decoded, original))
+        else:
+            # Opus adds codec delay; align on the best lag before comparing
+            n = min(len(decoded), len(original))
+            lag = int(np.argmax(np.correlate(decoded[: min(n, rate)], original[: min(n, rate) // 2], "valid")))
+            aligned = decoded[lag : lag + n - lag]
+            reference = original[: len(aligned)]
+            noise = np.sum((aligned - reference) ** 2) or 1e-12
+            row["snr_db"] = round(float(10 * np.log10(np.sum(reference**2) / noise)), 1)
+        results.append(row)
+    return results
+
+
+def check(pcm: bytes, rate: int, chunk: int) -> list:
+    """Asserts that FLAC decodes to exactly the input PCM; returns the benchmark rows."""
+    results = benchmark(pcm, rate, chunk)
+    flac = next(row for row in results if row["codec"] == "flac")
+    assert flac["lossless"], f"FLAC round trip changed the audio: {flac}"
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python audioencoding.py [check] [recording.wav|seconds]
+    from audiosource import FileSource, ToneSource
+
+    rate, chunk = 16000, 1600
+    args = sys.argv[1:]
+    checking = bool(args) and args[0] == "check"
+    if checking:
+        args = args[1:]
+    arg = args[0] if args else "10"
+    if arg.replace(".", "", 1).isdigit():
+        source = ToneSource(rate, chunk, frequency=220, amplitude=0.3, noise=0.02, duration=float(arg))
+    else:
+        source = FileSource(arg, rate, chunk)
+    pcm = source.read()
+
+    for row in (check if checking else benchmark)(pcm, rate, chunk):
+        print(row)
+    if checking:
+        print("FLAC round trip is lossless.")
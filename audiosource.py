@@ -0,0 +1,275 @@
+import abc
+import math
+import os
+import random
+import threading
+import time
+import wave
+from array import array
+from ringbuffer import BLOCK, DROP_OLDEST
+
+try:
+    import pyaudio
+except ImportError:  # Headless boxes can still replay files and synthetic audio
+    pyaudio = None
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+
+class AudioSource(abc.ABC):
+    """Base class for anything that can feed 16-bit mono PCM chunks into a MicStream.
+
+    start() begins delivering chunks of `chunk` frames to on_chunk(data) and
+    calls on_end() when the source runs out. on_chunk returns False to ask the
+    source to stop.
+    """
+
+    # Overflow policy MicStream uses unless told otherwise
+    default_overflow = BLOCK
+    # Playback speed as a multiple of real time; None delivers chunks unpaced
+    speed = 1.0
+
+    def __init__(self, rate: int, chunk: int) -> None:
+        self.rate = rate
+        self.chunk = chunk
+        self.chunks_sent = 0
+
+    @abc.abstractmethod
+    def start(self, on_chunk, on_end) -> None:
+        pass
+
+    @abc.abstractmethod
+    def stop(self) -> None:
+        pass
+
+
+class ThreadedSource(AudioSource):
+    """A source whose chunks come from a generator run on a background thread.
+
+    Subclasses implement _chunks(); chunks are paced at `speed` times real time.
+    """
+
+    def __init__(self, rate: int, chunk: int) -> None:
+        super().__init__(rate, chunk)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, on_chunk, on_end) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(on_chunk, on_end), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    @abc.abstractmethod
+    def _chunks(self):
+        """Yields successive PCM chunks."""
+
+    def read(self) -> bytes:
+        """All of the source's PCM at once, unpaced and without starting its thread.
+
+        Only for sources that end, e.g. a FileSource or a ToneSource with a duration.
+        """
+        return b"".join(self._chunks())
+
+    def _run(self, on_chunk, on_end) -> None:
+        """Deliver chunks, pacing them at `speed` times real time (None for unpaced)."""
+        chunk_seconds = self.chunk / self.rate
+        started = time.perf_counter()
+        try:
+            for data in self._chunks():
+                if self._stop.is_set():
+                    break
+                if self.speed:
+                    due = started + self.chunks_sent * chunk_seconds / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                self.chunks_sent += 1
+                if on_chunk(data) is False:
+                    break
+        finally:
+            on_end()
+
+
+class MicrophoneSource(AudioSource):
+    """Live capture from the default PyAudio input device."""
+
+    # Never stall the PortAudio callback; drop old audio instead
+    default_overflow = DROP_OLDEST
+    _audio_stream = None  # Opened by start()
+
+    def start(self, on_chunk, on_end) -> None:
+        if pyaudio is None:
+            raise RuntimeError("pyaudio is required for live microphone capture")
+
+        def callback(in_data, frame_count, time_info, status_flags):
+            self.chunks_sent += 1
+            if on_chunk(in_data) is False:
+                return None, pyaudio.paAbort
+            return None, pyaudio.paContinue
+
+        self._on_end = on_end
+        self._audio_interface = pyaudio.PyAudio()
+        self._audio_stream = self._audio_interface.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.chunk,
+            # After every chunk of audio is captured, PyAudio invokes the stream_callback function
+            stream_callback=callback,
+        )
+
+    def stop(self) -> None:
+        if self._audio_stream is None:
+            return  # Never started, or already stopped
+        self._audio_stream.stop_stream()
+        self._audio_stream.close()
+        self._audio_stream = None
+        self._audio_interface.terminate()
+        self._on_end()
+
+
+class FileSource(ThreadedSource):
+    """Replays a WAV file or headerless 16-bit mono PCM file.
+
+    speed=1.0 replays in real time, 10.0 at ten times real time, and None as
+    fast as the consumer accepts it.
+    """
+
+    def __init__(self, path: str, rate: int, chunk: int, speed: float = 1.0) -> None:
+        super().__init__(rate, chunk)
+        self.path = path
+        self.speed = speed
+
+        if self._is_wav():
+            with wave.open(path, "rb") as wav:
+                params = (wav.getframerate(), wav.getsampwidth(), wav.getnchannels())
+            if params != (rate, SAMPLE_WIDTH, 1):
+                raise ValueError(
+                    f"{path} is {params[0]} Hz, {params[1] * 8}-bit, {params[2]} channel(s); "
+                    f"expected {rate} Hz, 16-bit mono"
+                )
+
+    def _is_wav(self) -> bool:
+        with open(self.path, "rb") as f:
+            header = f.read(12)
+        return header[:4] == b"RIFF" and header[8:12] == b"WAVE"
+
+    def _chunks(self):
+        chunk_bytes = self.chunk * SAMPLE_WIDTH
+        if self._is_wav():
+            with wave.open(self.path, "rb") as wav:
+                while True:
+                    data = wav.readframes(self.chunk)
+                    if not data:
+                        return
+                    yield data
+        else:
+            with open(self.path, "rb") as f:
+                while True:
+                    data = f.read(chunk_bytes)
+                    if len(data) < SAMPLE_WIDTH:
+                        return
+                    yield data[: len(data) - len(data) % SAMPLE_WIDTH]
+
+
+class ToneSource(ThreadedSource):
+    """Synthetic sine tone with optional white noise, reproducible from a seed.
+
+    A frequency of 0 produces noise only. duration=None generates forever.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        chunk: int,
+        frequency: float = 440.0,
+        amplitude: float = 0.3,
+        noise: float = 0.0,
+        duration: float = None,
+        speed: float = 1.0,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(rate, chunk)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.noise = noise
+        self.duration = duration
+        self.speed = speed
+        self.seed = seed
+
+    def _chunks(self):
+        rng = random.Random(self.seed)
+        step = 2 * math.pi * self.frequency / self.rate
+        total = None if self.duration is None else int(self.duration * self.rate)
+        produced = 0
+        while total is None or produced < total:
+            frames = self.chunk if total is None else min(self.chunk, total - produced)
+            samples = array("h")
+            for n in range(produced, produced + frames):
+                value = self.amplitude * math.sin(step * n)
+                if self.noise:
+                    value += rng.uniform(-self.noise, self.noise)
+                samples.append(int(max(-1.0, min(1.0, value)) * 32767))
+            produced += frames
+            yield samples.tobytes()
+
+
+class PushSource(AudioSource):
+    """Audio handed in by the caller, e.g. a network connection, instead of a capture thread.
+
+    push() stores a chunk directly and end() marks the end of the audio. push()
+    must never wait on the consumer, so callers apply their own backpressure
+    before pushing and the ring drops old audio as a last resort.
+    """
+
+    default_overflow = DROP_OLDEST
+    speed = None
+
+    def start(self, on_chunk, on_end) -> None:
+        self._on_chunk = on_chunk
+        self._on_end = on_end
+
+    def push(self, data: bytes) -> bool:
+        """Store a chunk; False once the stream wants no more audio."""
+        self.chunks_sent += 1
+        return self._on_chunk(data) is not False
+
+    def end(self) -> None:
+        self._on_end()
+
+    def stop(self) -> None:
+        self.end()
+
+
+def source_from_args(args: list, rate: int, chunk: int) -> AudioSource:
+    """Builds a source from command-line arguments.
+
+    []                     -> live microphone
+    ["tone", freq, secs]   -> synthetic tone (both optional)
+    ["noise", secs]        -> synthetic white noise
+    [path, speed]          -> WAV/PCM replay; speed is a factor or "max"
+    """
+    if not args:
+        return MicrophoneSource(rate, chunk)
+
+    kind = args[0]
+    if kind == "tone":
+        frequency = float(args[1]) if len(args) > 1 else 440.0
+        duration = float(args[2]) if len(args) > 2 else None
+        return ToneSource(rate, chunk, frequency=frequency, duration=duration)
+    if kind == "noise":
+        duration = float(args[1]) if len(args) > 1 else None
+        return ToneSource(rate, chunk, frequency=0, amplitude=0, noise=0.3, duration=duration)
+    if not os.path.exists(kind):
+        raise FileNotFoundError(f"No such audio file: {kind}")
+
+    speed = args[1] if len(args) > 1 else "1"
+    return FileSource(kind, rate, chunk, speed=None if speed == "max" else float(speed))
@@ -0,0 +1,141 @@
+import io
+import json
+import multiprocessing
+import re
+import resource
+import sys
+import time
+import numpy as np
+
+import clients
+from audiosource import FileSource
+
+RATE = 16000  # Whisper's sample rate
+CHUNK = 16000
+
+
+def _words(text: str) -> list:
+    return re.sub(r"[^\w' ]", " ", text.lower()).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> int:
+    """Substitutions, insertions and deletions turning reference into hypothesis, in words."""
+    reference, hypothesis = _words(reference), _words(hypothesis)
+    row = list(range(len(hypothesis) + 1))
+    for i, word in enumerate(reference, 1):
+        previous, row[0] = row[0], i
+        for j, other in enumerate(hypothesis, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (word != other))
+    return row[-1]
+
+
+def word_error_rate(references: list, hypotheses: list) -> float:
+    """Word errors over all pairs, per reference word."""
+    words = sum(len(_words(r)) for r in references)
+    errors = sum(word_errors(r, h) for r, h in zip(references, hypotheses))
+    return errors / words if words else 0.0
+
+
+def load_wav(path: str) -> np.ndarray:
+    """A 16 kHz mono 16-bit WAV file as float32 samples in [-1, 1)."""
+    pcm = FileSource(path, RATE, CHUNK, speed=None).read()
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+
+
+def _megabytes(model) -> float:
+    """Size of the model's weights as saved; counts int8 packed weights, unlike summing parameters."""
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 2**20
+
+
+def _peak_rss_megabytes() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def _run(backend: str, threads: int, paths: list, size: str, corrector_model: str, corrector_inputs: list) -> dict:
+    """Load both models on one backend and time them; runs in a fresh process per backend."""
+    options = {"backend": backend, "threads": threads}
+    whisperer = clients.get(clients.WHISPER, size=size, **options)
+    whisperer.transcribe(np.zeros(RATE, dtype=np.float32), fp16=False, language="en")  # Warm-up
+
+    transcripts = []
+    audio_seconds = transcribe_seconds = 0.0
+    for path in paths:
+        audio = load_wav(path)
+        started = time.perf_counter()
+        transcripts.append(whisperer.transcribe(audio, fp16=False, language="en")["text"].strip())
+        transcribe_seconds += time.perf_counter() - started
+        audio_seconds += len(audio) / RATE
+
+    # Every backend corrects the same text so its drift is the corrector's alone
+    corrector = clients.get(clients.CORRECTOR, model=corrector_model, **options)
+    corrector_inputs = corrector_inputs or transcripts
+    corrections = []
+    started = time.perf_counter()
+    for text in corrector_inputs:
+        corrections.append(corrector(text, max_length=100, num_return_sequences=1)[0]["generated_text"])
+    correct_seconds = time.perf_counter() - started
+
+    return {
+        "backend": backend,
+        "threads": threads,
+        "audio_s": round(audio_seconds, 1),
+        # Transcription seconds per second of audio
+        "whisper_rtf": round(transcribe_seconds / audio_seconds, 3) if audio_seconds else 0.0,
+        "corrector_ms": round(1000 * correct_seconds / len(corrector_inputs), 1) if corrector_inputs else 0.0,
+        "whisper_mb": round(_megabytes(whisperer), 1),
+        "corrector_mb": round(_megabytes(corrector.model), 1),
+        "peak_rss_mb": round(_peak_rss_megabytes(), 1),
+        "transcripts": transcripts,
+        "corrections": corrections,
+    }
+
+
+def benchmark(
+    paths: list,
+    backends: tuple = clients.BACKENDS,
+    threads: int = None,
+    size: str = "base",
+    corrector_model: str = "t5-small",
+) -> list:
+    """Real-time factor, memory and word-error drift of each backend against fp32.
+
+    Each backend runs in its own spawned process so peak RSS is its own.
+    wer_vs_fp32 compares Whisper transcripts and corrector_wer_vs_fp32 the
+    corrector's output on the fp32 transcripts, both with fp32 as reference.
+
+    Args:
+        paths (list): 16 kHz mono WAV files.
+        backends (tuple): Backends to compare; fp32 is always run first.
+        threads (int): Torch threads; None keeps torch's default.
+        size (str): Whisper model size.
+        corrector_model (str): Text2text model for the corrector.
+    """
+    backends = ["fp32"] + [b for b in backends if b != "fp32"]
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    baseline = None
+    for backend in backends:
+        with context.Pool(1) as pool:
+            row = pool.apply(
+                _run,
+                (backend, threads, paths, size, corrector_model, baseline["transcripts"] if baseline else None),
+            )
+        baseline = baseline or row
+        row["wer_vs_fp32"] = round(word_error_rate(baseline["transcripts"], row["transcripts"]), 4)
+        row["corrector_wer_vs_fp32"] = round(word_error_rate(baseline["corrections"], row["corrections"]), 4)
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    # Usage: python backendbench.py [threads] recording.wav [recording.wav ...]
+    args = sys.argv[1:]
+    threads = int(args.pop(0)) if args and args[0].isdigit() else None
+    if not args:
+        sys.exit("Usage: python backendbench.py [threads] recording.wav [recording.wav ...]")
+    for row in benchmark(args, threads=threads):
+        print(json.dumps({k: v for k, v in row.items() if k not in ("transcripts", "corrections")}))
@@ -0,0 +1,375 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+import wave
+import numpy as np
+
+from whisperstream import SlidingWindowDecoder
+from whisperworker import whisper_batch_transcriber
+
+RATE = 16000  # Whisper's sample rate
+SAMPLE_WIDTH = 2  # int16 PCM
+EXTENSIONS = (".wav", ".pcm", ".raw")
+
+
+class OfflineWindowDecoder(SlidingWindowDecoder):
+    """SlidingWindowDecoder over audio that is all there up front.
+
+    The windows, silence checks and hypothesis merging are the live decoder's,
+    but every window of a piece is cut at once and the non-silent ones are
+    transcribed `max_batch` at a time by a batch transcriber, as in
+    whisperworker. Nothing is skipped for lag.
+    """
+
+    def __init__(self, transcribe_batch, rate: int = RATE, max_batch: int = 4, **options) -> None:
+        """
+        Args:
+            transcribe_batch: Callable taking a list of float32 arrays and
+                returning their texts, e.g. from whisper_batch_transcriber.
+            rate (int): Sample rate in Hz.
+            max_batch (int): Windows transcribed together at most.
+            **options: window_seconds, hop_seconds, noise_floor_db and
+                holdback, as for SlidingWindowDecoder.
+        """
+        super().__init__(None, rate, **options)
+        self.transcribe_batch = transcribe_batch
+        self.max_batch = max_batch
+
+    def _windows(self, length: int) -> list:
+        """(start, end) of each window over `length` samples, the last one ending at the end."""
+        if length <= self.window:
+            return [(0, length)]
+        ends = list(range(self.window, length, self.hop))
+        if length - ends[-1] > 0:
+            ends.append(length)
+        return [(end - self.window, end) for end in ends]
+
+    def decode_audio(self, audio: np.ndarray) -> list:
+        """All the words in `audio`, merged across overlapping windows."""
+        windows = self._windows(len(audio))
+        texts = [None] * len(windows)  # None marks a silent window
+        loud = []
+        for i, (start, end) in enumerate(windows):
+            self.windows += 1
+            if self.level_db(audio[start:end]) < self.noise_floor_db:
+                self.skipped_silent += 1
+            else:
+                loud.append(i)
+
+        started = time.process_time()
+        for first in range(0, len(loud), self.max_batch):
+            batch = loud[first : first + self.max_batch]
+            samples = []
+            for i in batch:
+                start, end = windows[i]
+                window = audio[start:end].copy()
+                window /= np.max(np.abs(window))
+                samples.append(window)
+            for i, text in zip(batch, self.transcribe_batch(samples)):
+                texts[i] = text.strip()
+        self.decode_seconds += time.process_time() - started
+
+        words = []
+        previous_end = None
+        for (start, end), text in zip(windows, texts):
+            if text is None:
+                words += self.merger.flush()
+            else:
+                # The last window is pulled back to end with the audio, so it overlaps more
+                overlap = max(0, previous_end - start) / self.window if previous_end is not None else None
+                words += self.merger.add(text, overlap, overlap)
+            previous_end = end if text is not None else None
+        words += self.merger.flush()
+        self.words += len(words)
+        return words
+
+
+def audio_info(path: str) -> tuple:
+    """(sample rate, samples) of a 16-bit mono WAV, or of headerless PCM at RATE."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != SAMPLE_WIDTH:
+                raise ValueError("Only 16-bit mono WAV is supported")
+            return wav.getframerate(), wav.getnframes()
+    return RATE, os.path.getsize(path) // SAMPLE_WIDTH
+
+
+def read_samples(path: str, start: int, count: int) -> np.ndarray:
+    """Samples [start, start + count) of a file as float32 in [-1, 1)."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as wav:
+            wav.setpos(start)
+            pcm = np.frombuffer(wav.readframes(count), dtype=np.int16)
+    else:
+        pcm = np.fromfile(path, dtype=np.int16, count=count, offset=start * SAMPLE_WIDTH)
+    return pcm.astype(np.float32) / 32768
+
+
+def split_on_silence(
+    path: str,
+    samples: int,
+    rate: int = RATE,
+    piece_seconds: float = 120.0,
+    search_seconds: float = 20.0,
+    block_seconds: float = 60.0,
+) -> list:
+    """(start, end) sample ranges of about `piece_seconds`, cut at the quietest 100 ms nearby.
+
+    Each cut is placed in the quietest frame of the last `search_seconds`
+    before the target length, so words are rarely split between pieces. The
+    file is scanned `block_seconds` at a time, keeping memory flat.
+    """
+    frame = rate // 10
+    piece = int(piece_seconds * rate) // frame
+    frames = samples // frame
+    if frames <= piece * 3 // 2:
+        return [(0, samples)]
+
+    levels = np.zeros(frames, dtype=np.float32)
+    block = int(block_seconds * 10)
+    for first in range(0, frames, block):
+        count = min(block, frames - first)
+        audio = read_samples(path, first * frame, count * frame)
+        audio = audio[: len(audio) // frame * frame]
+        levels[first : first + len(audio) // frame] = np.sqrt(
+            np.mean(np.square(audio.reshape(-1, frame)), axis=1)
+        )
+
+    search = min(int(search_seconds * 10), piece - 1)
+    cuts = [0]
+    while frames - cuts[-1] > piece * 3 // 2:
+        target = cuts[-1] + piece
+        quietest = target - search + int(np.argmin(levels[target - search : target]))
+        cuts.append(quietest)
+    ranges = [(a * frame + frame // 2 if a else 0, b * frame + frame // 2) for a, b in zip(cuts, cuts[1:])]
+    return ranges + [(ranges[-1][1], samples)]
+
+
+# Set in each worker process by _start_worker
+_transcribe_batch = None
+_load_seconds = 0.0
+
+
+def _start_worker(make_transcriber, options: dict) -> None:
+    """Pool initializer: loads the model once per worker process."""
+    global _transcribe_batch, _load_seconds
+    started = time.perf_counter()
+    _transcribe_batch = make_transcriber(**options)
+    _load_seconds = time.perf_counter() - started
+
+
+def _transcribe_piece(task: tuple) -> dict:
+    """Worker: reads one piece of a file and transcribes it."""
+    global _load_seconds
+    path, number, start, end, rate, decoder_options = task
+    started = time.time()
+    cpu_started = time.process_time()
+    try:
+        decoder = OfflineWindowDecoder(_transcribe_batch, rate, **decoder_options)
+        text = " ".join(decoder.decode_audio(read_samples(path, start, end - start)))
+        error = None
+    except Exception as e:
+        text, error = "", f"{type(e).__name__}: {e}"
+    result = {
+        "path": path,
+        "piece": number,
+        "text": text,
+        "error": error,
+        "started": started,
+        "finished": time.time(),
+        "cpu_s": time.process_time() - cpu_started,
+        "load_s": _load_seconds,  # Reported by a worker's first piece only
+        "worker": os.getpid(),
+    }
+    _load_seconds = 0.0
+    return result
+
+
+def _done_files(output: str) -> set:
+    """Files an earlier run already transcribed into `output` without error."""
+    done = set()
+    if os.path.exists(output):
+        with open(output) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line of an interrupted run
+                if not row.get("error"):
+                    done.add(row["file"])
+    return done
+
+
+def transcribe_directory(
+    directory: str,
+    output: str = "data/transcripts.jsonl",
+    workers: int = None,
+    threads: int = 1,
+    backend: str = "fp32",
+    size: str = "base",
+    parquet: bool = False,
+    piece_seconds: float = 120.0,
+    window_seconds: float = 30.0,
+    hop_seconds: float = 26.0,
+    noise_floor_db: float = -50.0,
+    max_batch: int = 4,
+    make_transcriber=whisper_batch_transcriber,
+    transcriber_options: dict = None,
+) -> dict:
+    """Transcribes every WAV/PCM file under `directory` on a pool of processes.
+
+    Long files are split on silence into pieces, and pieces go out longest
+    first so no core waits on one long file at the end. Each worker loads the
+    model once. A file's row (text, audio seconds, pieces, worker CPU and
+    wall-clock timing) is appended to `output` as JSON lines as soon as all
+    its pieces are back. Files already in `output` are skipped, so an
+    interrupted run resumes.
+
+    Args:
+        directory (str): Searched recursively for .wav, .pcm and .raw files;
+            headerless files are 16 kHz mono int16.
+        output (str): JSON Lines file rows are appended to.
+        workers (int): Processes; one per core if None.
+        threads (int): Torch threads per worker; one per worker keeps cores
+            from being oversubscribed.
+        backend (str): One of clients.BACKENDS.
+        size (str): Whisper model size.
+        parquet (bool): Also write every row in `output` to a .parquet beside it.
+        piece_seconds (float): Target length of the pieces long files are split into.
+        window_seconds (float): Audio per transcription window.
+        hop_seconds (float): New audio between windows.
+        noise_floor_db (float): Windows quieter than this (dBFS) are skipped.
+        max_batch (int): Windows transcribed together at most.
+        make_transcriber: Picklable callable returning transcribe(list of
+            float32 arrays) -> list of texts; Whisper by default.
+        transcriber_options (dict): Keyword arguments for make_transcriber;
+            defaults to size, backend and threads.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count()
+    if transcriber_options is None:
+        transcriber_options = {"size": size, "backend": backend, "threads": threads}
+    decoder_options = {
+        "window_seconds": window_seconds,
+        "hop_seconds": hop_seconds,
+        "noise_floor_db": noise_floor_db,
+        "max_batch": max_batch,
+    }
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    done = _done_files(output)
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.lower().endswith(EXTENSIONS)
+    )
+    files = {}
+    tasks = []
+    rows = []
+    for path in paths:
+        name = os.path.relpath(path, directory)
+        if name in done:
+            continue
+        try:
+            rate, samples = audio_info(path)
+            if rate != RATE:
+                raise ValueError(f"Sample rate {rate} Hz, expected {RATE} Hz")
+            pieces = split_on_silence(path, samples, rate, piece_seconds)
+        except (OSError, ValueError, EOFError, wave.Error) as e:
+            rows.append({"file": name, "error": f"{type(e).__name__}: {e}"})
+            continue
+        files[path] = {"file": name, "audio_s": samples / rate, "pieces": [None] * len(pieces)}
+        for number, (start, end) in enumerate(pieces):
+            tasks.append((path, number, start, end, rate, decoder_options))
+    tasks.sort(key=lambda task: task[3] - task[2], reverse=True)
+    planned = time.perf_counter()
+
+    load_seconds = []
+    cpu_seconds = 0.0
+    audio_seconds = sum(entry["audio_s"] for entry in files.values())
+    with open(output, "a") as out:
+        for row in rows:
+            out.write(json.dumps(row) + "\n")
+        if tasks:
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(workers, initializer=_start_worker, initargs=(make_transcriber, transcriber_options)) as pool:
+                for result in pool.imap_unordered(_transcribe_piece, tasks, chunksize=1):
+                    if result["load_s"]:
+                        load_seconds.append(result["load_s"])
+                    cpu_seconds += result["cpu_s"]
+                    entry = files[result["path"]]
+                    entry["pieces"][result["piece"]] = result
+                    if any(piece is None for piece in entry["pieces"]):
+                        continue
+                    row = _file_row(entry)
+                    rows.append(row)
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                    del files[result["path"]]
+
+    if parquet:
+        _write_parquet(output)
+    wall = time.perf_counter() - started
+    return {
+        "files": len(rows),
+        "skipped_done": len(done),
+        "errors": sum(bool(row.get("error")) for row in rows),
+        "pieces": len(tasks),
+        "workers": workers,
+        "audio_s": round(audio_seconds, 1),
+        "wall_s": round(wall, 2),
+        "plan_s": round(planned - started, 2),
+        "model_load_s": round(max(load_seconds), 2) if load_seconds else 0.0,
+        "realtime_factor": round(audio_seconds / wall, 2) if wall else 0.0,  # Audio seconds per wall second
+        # Share of the pool's core time spent transcribing, from the first piece handed out
+        "core_utilization": round(cpu_seconds / (workers * (wall - (planned - started))), 3) if tasks else 0.0,
+    }
+
+
+def _file_row(entry: dict) -> dict:
+    pieces = entry["pieces"]
+    errors = [piece["error"] for piece in pieces if piece["error"]]
+    started = min(piece["started"] for piece in pieces)
+    finished = max(piece["finished"] for piece in pieces)
+    cpu = sum(piece["cpu_s"] for piece in pieces)
+    return {
+        "file": entry["file"],
+        "text": " ".join(piece["text"] for piece in pieces if piece["text"]),
+        "audio_s": round(entry["audio_s"], 2),
+        "pieces": len(pieces),
+        "workers": len({piece["worker"] for piece in pieces}),
+        "cpu_s": round(cpu, 3),
+        "wall_s": round(finished - started, 3),
+        "started": started,
+        "finished": finished,
+        "rtf": round(cpu / entry["audio_s"], 4) if entry["audio_s"] else 0.0,  # CPU seconds per audio second
+        "error": "; ".join(errors) or None,
+    }
+
+
+def _write_parquet(output: str) -> str:
+    """Writes every row in the JSON Lines output to a Parquet file beside it."""
+    import pandas as pd
+
+    path = os.path.splitext(output)[0] + ".parquet"
+    pd.read_json(output, lines=True).to_parquet(path, engine="pyarrow", index=False)
+    return path
+
+
+if __name__ == "__main__":
+    # Usage: python batchtranscribe.py <directory> [output.jsonl] [workers] [--parquet] [--int8]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        sys.exit("Usage: python batchtranscribe.py <directory> [output.jsonl] [workers] [--parquet] [--int8]")
+    summary = transcribe_directory(
+        args[0],
+        args[1] if len(args) > 1 else "data/transcripts.jsonl",
+        workers=int(args[2]) if len(args) > 2 else None,
+        backend="int8" if "--int8" in sys.argv else "fp32",
+        parquet="--parquet" in sys.argv,
+    )
+    print(json.dumps(summary, indent=2))
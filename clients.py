@@ -0,0 +1,295 @@
+import importlib
+import threading
+import time
+
+# Defaults shared by every script
+PROJECT_ID = "propane-sphinx-448317-p4"
+LOCATION = "us-east1"
+
+# Component names
+SPEECH = "speech"  # speech.SpeechClient
+VERTEXAI = "vertexai"  # vertexai, initialized for a project and location
+GEMINI = "gemini"  # GenerativeModel with Google Search grounding
+TEXT_MODEL = "text_model"  # TextGenerationModel
+WHISPER = "whisper"  # Whisper speech recognition model
+CORRECTOR = "corrector"  # T5 text2text pipeline for transcript correction
+
+# CPU inference backends for the local WHISPER and CORRECTOR models
+BACKENDS = ("fp32", "int8")
+
+_STARTED = time.perf_counter()  # Report times are relative to this module's import
+
+
+def _load_speech():
+    from google.cloud import speech
+
+    return speech
+
+
+def _build_speech(speech):
+    return speech.SpeechClient()
+
+
+def _load_vertexai():
+    return importlib.import_module("vertexai")
+
+
+def _build_vertexai(vertexai, project_id=PROJECT_ID, location=LOCATION):
+    vertexai.init(project=project_id, location=location)
+    return vertexai
+
+
+def _load_generative_models():
+    return importlib.import_module("vertexai.preview.generative_models")
+
+
+def _build_gemini(models, model_name="gemini-1.5-pro-002", project_id=PROJECT_ID, location=LOCATION):
+    get(VERTEXAI, project_id=project_id, location=location)
+    tools = [
+        models.Tool.from_google_search_retrieval(
+            google_search_retrieval=models.grounding.GoogleSearchRetrieval()
+        ),
+    ]
+    return models.GenerativeModel(model_name, tools=tools)
+
+
+def _load_language_models():
+    return importlib.import_module("vertexai.preview.language_models")
+
+
+def _build_text_model(models, model_name="text-bison@001", project_id=PROJECT_ID, location=LOCATION):
+    get(VERTEXAI, project_id=project_id, location=location)
+    return models.TextGenerationModel.from_pretrained(model_name)
+
+
+def _load_whisper():
+    import torch
+    import whisper
+
+    return whisper, torch
+
+
+def _on_backend(model, torch, backend="fp32", threads=None):
+    """Run a torch model with the given CPU backend and intra-op thread count.
+
+    "int8" swaps every Linear layer for a dynamically quantized one: weights
+    are stored as int8 and activations quantized on the fly, which cuts the
+    model's memory and speeds up CPU inference for a small loss in accuracy.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if threads:
+        torch.set_num_threads(threads)  # Process-wide; the last model built wins
+    if backend == "int8":
+        # quantize_dynamic only swaps layers whose type is exactly nn.Linear, and
+        # Whisper subclasses it (to cast weights for fp16), so make those plain first
+        for parent in list(model.modules()):
+            for name, child in parent.named_children():
+                if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                    linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                    linear.weight = child.weight
+                    linear.bias = child.bias
+                    setattr(parent, name, linear)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def _build_whisper(modules, size="base", backend="fp32", threads=None):
+    whisper, torch = modules
+    # Quantized kernels only run on the CPU
+    device = "cuda" if torch.cuda.is_available() and backend == "fp32" else "cpu"
+    return _on_backend(whisper.load_model(size, device=device), torch, backend, threads)
+
+
+def _load_transformers():
+    import torch
+    import transformers
+
+    return transformers, torch
+
+
+def _build_corrector(modules, model="t5-small", backend="fp32", threads=None):
+    transformers, torch = modules
+    corrector = transformers.pipeline("text2text-generation", model=model)
+    corrector.model = _on_backend(corrector.model, torch, backend, threads)
+    return corrector
+
+
+# name -> (import the libraries, build the object from them and keyword options)
+_RECIPES = {
+    SPEECH: (_load_speech, _build_speech),
+    VERTEXAI: (_load_vertexai, _build_vertexai),
+    GEMINI: (_load_generative_models, _build_gemini),
+    TEXT_MODEL: (_load_language_models, _build_text_model),
+    WHISPER: (_load_whisper, _build_whisper),
+    CORRECTOR: (_load_transformers, _build_corrector),
+}
+
+
+def safety_settings() -> list:
+    """Generation safety settings with blocking turned off for every harm category."""
+    models = module(GEMINI)
+    categories = (
+        "HARM_CATEGORY_HATE_SPEECH",
+        "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "HARM_CATEGORY_SEXUALLY_EXPLICIT",
+        "HARM_CATEGORY_HARASSMENT",
+    )
+    return [
+        models.SafetySetting(
+            category=getattr(models.SafetySetting.HarmCategory, category),
+            threshold=models.SafetySetting.HarmBlockThreshold.OFF,
+        )
+        for category in categories
+    ]
+
+
+class _Component:
+    """One lazily built object, timed separately for its imports and its construction."""
+
+    def __init__(self, name: str, options: dict) -> None:
+        self.name = name
+        self.options = options
+        self._load, self._build = _RECIPES[name]
+        self._lock = threading.Lock()
+        self.module = None
+        self.value = None
+        self.ready = False
+        self.warmed = False  # Built by warm() rather than on first use
+        self.import_seconds = None
+        self.init_seconds = None
+        self.waited_seconds = 0.0  # Time callers spent blocked on this component
+        self.ready_at = None
+
+    def load(self):
+        """Import the component's libraries; the cheap half of get()."""
+        if self.module is None:
+            with self._lock:
+                if self.module is None:
+                    started = time.perf_counter()
+                    module = self._load()
+                    self.import_seconds = time.perf_counter() - started
+                    self.module = module
+        return self.module
+
+    def get(self, warming: bool = False):
+        if self.ready:
+            return self.value
+        started = time.perf_counter()
+        module = self.load()
+        with self._lock:
+            if not self.ready:
+                building = time.perf_counter()
+                self.value = self._build(module, **self.options)
+                self.init_seconds = time.perf_counter() - building
+                self.ready_at = time.perf_counter() - _STARTED
+                self.warmed = warming
+                self.ready = True
+        if not warming:
+            # Whether it built the component or waited for warm(), the caller was blocked
+            self.waited_seconds += time.perf_counter() - started
+        return self.value
+
+    def report(self) -> dict:
+        return {
+            "component": self.name,
+            "options": self.options,
+            "import_s": None if self.import_seconds is None else round(self.import_seconds, 3),
+            "init_s": None if self.init_seconds is None else round(self.init_seconds, 3),
+            "ready_at_s": None if self.ready_at is None else round(self.ready_at, 3),
+            "warmed": self.warmed,
+            "waited_s": round(self.waited_seconds, 3),
+        }
+
+
+_components = {}
+_registry_lock = threading.Lock()
+_events = {}
+_errors = {}
+
+
+def _component(name: str, options: dict) -> _Component:
+    if name not in _RECIPES:
+        raise ValueError(f"Unknown component {name!r}, expected one of {list(_RECIPES)}")
+    key = (name, tuple(sorted(options.items())))
+    with _registry_lock:
+        if key not in _components:
+            _components[key] = _Component(name, options)
+        return _components[key]
+
+
+def get(name: str, **options):
+    """The process-wide instance of a component, built on first use.
+
+    Options (model names, project, location) select the instance; the same
+    options always return the same object. If warm() is still building it, this
+    waits for that build instead of starting another.
+    """
+    return _component(name, options).get()
+
+
+def module(name: str, **options):
+    """The component's imported library without building it, e.g. google.cloud.speech for SPEECH."""
+    return _component(name, options).load()
+
+
+def warm(*components, on_ready=None) -> threading.Thread:
+    """Build components on a background thread so the caller can start capturing audio.
+
+    Each component is a name, or a (name, options) pair for non-default
+    options. They are built in the order given, so list the one needed first
+    first. on_ready, if given, is called with startup_report() once all of
+    them are built. A failed build is recorded and retried by the next get().
+    """
+    pending = [
+        _component(*component) if isinstance(component, tuple) else _component(component, {})
+        for component in components
+    ]
+
+    def run():
+        for component in pending:
+            try:
+                component.get(warming=True)
+            except Exception as e:
+                _errors[component.name] = e
+        if on_ready:
+            on_ready(startup_report())
+
+    thread = threading.Thread(target=run, name="clients-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark(event: str) -> None:
+    """Record a startup milestone, e.g. "capture_started", for the report."""
+    _events.setdefault(event, round(time.perf_counter() - _STARTED, 3))
+
+
+def startup_report() -> dict:
+    """Per-component import and init cost, when each became ready, and startup milestones."""
+    with _registry_lock:
+        components = list(_components.values())
+    return {
+        "components": [c.report() for c in components],
+        "events": dict(_events),
+        "errors": {name: repr(e) for name, e in _errors.items()},
+    }
+
+
+def format_startup_report(report: dict = None) -> str:
+    """startup_report() as a small table for the terminal."""
+    report = report or startup_report()
+    lines = [f"{'component':<12} {'import s':>9} {'init s':>9} {'ready at':>9} {'waited s':>9}  warmed"]
+    for row in report["components"]:
+        cells = [
+            "-" if row[k] is None else f"{row[k]:.3f}" for k in ("import_s", "init_s", "ready_at_s")
+        ]
+        lines.append(
+            f"{row['component']:<12} {cells[0]:>9} {cells[1]:>9} {cells[2]:>9} "
+            f"{row['waited_s']:>9.3f}  {row['warmed']}"
+        )
+    for event, at in report["events"].items():
+        lines.append(f"{event}: {at:.3f}s")
+    for name, error in report["errors"].items():
+        lines.append(f"{name} failed: {error}")
+    return "\n".join(lines)
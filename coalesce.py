@@ -0,0 +1,94 @@
+import threading
+from collections import Counter, deque
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+MAX_REQUEST_BYTES = 25600  # Streaming recognize rejects audio_content larger than this
+
+
+class CoalescingPolicy:
+    """Decides how much buffered audio MicStream.empty_buffer sends per request.
+
+    A request aims for `target_ms` of audio. When less than that is queued the
+    stream waits at most `max_delay_ms` for more before sending what it has, so
+    coalescing never adds more than that to time-to-transcript. When the
+    consumer falls behind, the frame size follows a smoothed estimate of the
+    backlog (up to `max_request_bytes`), so a slow consumer catches up in a few
+    large requests instead of many small ones, and frames shrink back to the
+    target once it keeps up again.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        target_ms: float = 100.0,
+        max_delay_ms: float = 50.0,
+        max_request_bytes: int = MAX_REQUEST_BYTES,
+        smoothing: float = 0.25,
+        max_samples: int = 10000,
+    ) -> None:
+        """
+        Args:
+            rate (int): Sample rate in Hz.
+            target_ms (float): Audio per request while the consumer keeps up.
+            max_delay_ms (float): Longest the stream holds audio back waiting
+                for a frame to fill; 0 sends whatever is queued.
+            max_request_bytes (int): Hard cap on audio bytes per request.
+            smoothing (float): Weight of the latest backlog in the moving
+                estimate that sizes frames (1.0 follows it exactly).
+            max_samples (int): Request sizes kept for percentiles.
+        """
+        self.bytes_per_ms = rate * SAMPLE_WIDTH / 1000
+        self.max_request_bytes = max_request_bytes - max_request_bytes % SAMPLE_WIDTH
+        self.target_bytes = min(self._align(target_ms * self.bytes_per_ms), self.max_request_bytes)
+        self.max_delay = max_delay_ms / 1000
+        self.smoothing = smoothing
+        self._backlog = 0.0
+        self._lock = threading.Lock()
+        self._sizes = deque(maxlen=max_samples)
+
+        # Statistics
+        self.requests = 0
+        self.bytes = 0
+        self.waits = 0  # Frames that waited for audio to fill
+        self.histogram = Counter()  # Request duration, rounded down to 10 ms -> count
+
+    @staticmethod
+    def _align(size: float) -> int:
+        return max(SAMPLE_WIDTH, int(size) - int(size) % SAMPLE_WIDTH)
+
+    def frame_bytes(self, backlog: int) -> int:
+        """Size of the next request given `backlog` unread bytes."""
+        self._backlog += self.smoothing * (backlog - self._backlog)
+        size = min(max(self.target_bytes, self._align(self._backlog)), self.max_request_bytes)
+        return min(size, backlog - backlog % SAMPLE_WIDTH) or backlog
+
+    def record(self, size: int, waited: bool = False) -> None:
+        """Count one emitted request of `size` bytes."""
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            self.waits += waited
+            self._sizes.append(size)
+            self.histogram[int(size / self.bytes_per_ms) // 10 * 10] += 1
+
+    def stats(self) -> dict:
+        """Distribution of emitted request sizes, in bytes and milliseconds of audio."""
+        with self._lock:
+            sizes = sorted(self._sizes)
+            histogram = dict(sorted(self.histogram.items()))
+        if not sizes:
+            return {"requests": 0}
+
+        def percentile(p: float) -> int:
+            return sizes[min(len(sizes) - 1, int(p / 100 * len(sizes)))]
+
+        return {
+            "requests": self.requests,
+            "mean_bytes": round(self.bytes / self.requests),
+            "p50_bytes": percentile(50),
+            "p95_bytes": percentile(95),
+            "max_bytes": sizes[-1],
+            "mean_ms": round(self.bytes / self.requests / self.bytes_per_ms, 1),
+            "waited": self.waits,
+            "histogram_ms": histogram,
+        }
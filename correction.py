@@ -0,0 +1,199 @@
+import re
+import threading
+import time
+from collections import deque
+
+from responsecache import ResponseCache
+
+_SENTENCE_END = re.compile(r"[.!?]$")
+
+
+class CorrectionStage:
+    """Corrects transcript phrases with a text2text pipeline on a background thread.
+
+    submit() only queues the phrase, so the transcription loop never waits on
+    the model. The stage takes every phrase queued since its last pipeline
+    call, splits those longer than `max_tokens` into chunks at sentence (or
+    else word) boundaries instead of letting the model truncate them, looks
+    each chunk up in the cache, and corrects the misses in one batched call.
+    on_corrected(phrase_id, text, corrected) is called from the stage's thread.
+    """
+
+    def __init__(
+        self,
+        load_corrector,
+        on_corrected=None,
+        max_batch: int = 8,
+        max_tokens: int = 100,
+        max_pending: int = 64,
+        cache: ResponseCache = None,
+    ) -> None:
+        """
+        Args:
+            load_corrector: Called once on the stage's thread to get the pipeline,
+                e.g. lambda: clients.get(clients.CORRECTOR), so loading it does
+                not hold up the caller either.
+            on_corrected: Callback for each corrected phrase; prints by default.
+            max_batch (int): Chunks corrected per pipeline call at most.
+            max_tokens (int): Longest chunk, in the pipeline tokenizer's tokens
+                (words if it has none).
+            max_pending (int): Phrases queued before the oldest is dropped.
+            cache (ResponseCache): Corrections of earlier chunks, keyed on the
+                exact text; an in-memory one by default.
+        """
+        self.load_corrector = load_corrector
+        self.on_corrected = on_corrected or (lambda phrase_id, text, corrected: print(f"Corrected: {corrected}"))
+        self.max_batch = max_batch
+        self.max_tokens = max_tokens
+        # Case and punctuation are what gets corrected, so they must not be normalized away
+        self.cache = cache or ResponseCache(max_entries=1024, ttl=None, normalize=False)
+        self.config = {"max_length": max_tokens + max_tokens // 2}  # Corrections can run a little longer
+        self._pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._next_id = 0
+        self._closed = False
+        self._corrector = None
+        self._thread = threading.Thread(target=self._run, name="correction", daemon=True)
+        self._thread.start()
+
+        # Statistics
+        self.submitted = 0
+        self.dropped = 0
+        self.errors = 0
+        self.corrected = 0
+        self.chunks = 0
+        self.split_phrases = 0  # Phrases longer than max_tokens
+        self.calls = 0
+        self.generated = 0  # Chunks sent to the model
+        self.model_seconds = 0.0
+        self.max_queue_seconds = 0.0  # Longest a phrase waited before its batch started
+
+    def submit(self, text: str) -> int:
+        """Queue a phrase for correction and return its id; never blocks."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("CorrectionStage is closed")
+            phrase_id = self._next_id
+            self._next_id += 1
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1  # deque drops the oldest phrase
+            self._pending.append((phrase_id, text, time.perf_counter()))
+            self.submitted += 1
+            self._cond.notify()
+        return phrase_id
+
+    def _token_counts(self, words: list) -> list:
+        tokenizer = getattr(self._corrector, "tokenizer", None)
+        if tokenizer is None:
+            return [1] * len(words)
+        return [len(ids) for ids in tokenizer(words, add_special_tokens=False)["input_ids"]]
+
+    def split(self, text: str) -> list:
+        """Chunks of at most max_tokens tokens, cut after a sentence where possible."""
+        words = text.split()
+        chunks = []
+        start = 0
+        tokens = 0
+        last_sentence = None  # Index after the latest sentence end in the current chunk
+        budget = self.max_tokens - 1  # Room for the end-of-sequence token
+        counts = self._token_counts(words)
+        for i, count in enumerate(counts):
+            if tokens + count > budget and i > start:
+                cut = last_sentence if last_sentence and last_sentence > start else i
+                chunks.append(" ".join(words[start:cut]))
+                start = cut
+                tokens = sum(counts[start:i])
+                last_sentence = None
+            tokens += count
+            if _SENTENCE_END.search(words[i]):
+                last_sentence = i + 1
+        if start < len(words):
+            chunks.append(" ".join(words[start:]))
+        return chunks
+
+    def _take(self) -> list:
+        """Wait for phrases, then take every queued one; empty once closed and drained."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            batch = list(self._pending)
+            self._pending.clear()
+            return batch
+
+    def _generate(self, chunks: list) -> list:
+        started = time.perf_counter()
+        results = self._corrector(chunks, num_return_sequences=1, batch_size=len(chunks), **self.config)
+        self.model_seconds += time.perf_counter() - started
+        self.calls += 1
+        self.generated += len(chunks)
+        # A list input gives one dict per chunk, or one single-item list when num_return_sequences is set
+        return [(r[0] if isinstance(r, list) else r)["generated_text"] for r in results]
+
+    def _run(self) -> None:
+        while True:
+            phrases = self._take()
+            if not phrases:
+                return
+            try:
+                self._correct(phrases)
+            except Exception as e:  # Keep the stage alive; these phrases go uncorrected
+                self.errors += 1
+                print(f"Correction failed: {e!r}")
+
+    def _correct(self, phrases: list) -> None:
+        if self._corrector is None:
+            self._corrector = self.load_corrector()
+        self.max_queue_seconds = max(self.max_queue_seconds, time.perf_counter() - phrases[0][2])
+
+        split = []
+        for phrase_id, text, _ in phrases:
+            chunks = self.split(text)
+            self.split_phrases += len(chunks) > 1
+            self.chunks += len(chunks)
+            split.append((phrase_id, text, chunks))
+
+        # Misses, once each even if several phrases share a chunk
+        corrections = {}
+        misses = []
+        for _, _, chunks in split:
+            for chunk in chunks:
+                if chunk in corrections or chunk in misses:
+                    continue
+                cached = self.cache.get(chunk, self.config)
+                if cached is None:
+                    misses.append(chunk)
+                else:
+                    corrections[chunk] = cached
+        for i in range(0, len(misses), self.max_batch):
+            batch = misses[i : i + self.max_batch]
+            called = time.perf_counter()
+            outputs = self._generate(batch)
+            latency = (time.perf_counter() - called) / len(batch)
+            for chunk, output in zip(batch, outputs):
+                corrections[chunk] = output
+                self.cache.put(chunk, self.config, output, latency)
+
+        for phrase_id, text, chunks in split:
+            self.corrected += 1
+            self.on_corrected(phrase_id, text, " ".join(corrections[chunk] for chunk in chunks))
+
+    def close(self, timeout: float = None) -> None:
+        """Correct what is still queued, then stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "corrected": self.corrected,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "chunks": self.chunks,
+            "split_phrases": self.split_phrases,
+            "pipeline_calls": self.calls,
+            "mean_batch": round(self.generated / self.calls, 2) if self.calls else 0.0,
+            "model_s": round(self.model_seconds, 3),
+            "max_queue_s": round(self.max_queue_seconds, 3),
+            "cache": self.cache.stats(),
+        }
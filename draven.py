@@ -1,10 +1,8 @@
-import queue
-import pyaudio
-from google.cloud import speech
-from google.cloud import language_v1
-import vertexai
-from vertexai.preview.language_models import TextGenerationModel
+import sys
+import clients
 import micstream
+from audiosource import source_from_args
+from intentgate import IntentGate
 
 # Audio recording parameters
 RATE = 16000
@@ -13,31 +11,41 @@ CHUNK = int(RATE / 10)  # 100ms
 # Google Cloud setup
 PROJECT_ID = "propane-sphinx-448317-p4"
 LOCATION = "us-east1"  # Vertex AI location
-vertexai.init(project=PROJECT_ID, location=LOCATION)
+TEXT_MODEL = "text-bison@001"
 
-# Initialize Vertex AI Text Generation model
-generation_model = TextGenerationModel.from_pretrained("text-bison@001")
+# Only questions and requests are sent to the text model
+intent_gate = IntentGate()
 
 # Speech-to-Text streaming
-def transcribe_streaming():
-    client = speech.SpeechClient()
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=RATE,
-        language_code="en-US",
-    )
-    streaming_config = speech.StreamingRecognitionConfig(
-        config=config, interim_results=True
+def transcribe_streaming(source=None, startup_report=False):
+    # The speech client and text model load in the background while capture starts
+    clients.warm(
+        clients.SPEECH,
+        (clients.TEXT_MODEL, {"model_name": TEXT_MODEL, "project_id": PROJECT_ID, "location": LOCATION}),
+        on_ready=(lambda report: print(clients.format_startup_report(report))) if startup_report else None,
     )
 
-    with MicrophoneStream() as stream:
-        audio_generator = stream.generator()
+    with micstream.MicStream(RATE, CHUNK, source=source) as stream:
+        clients.mark("capture_started")
+        speech = clients.module(clients.SPEECH)
+        client = clients.get(clients.SPEECH)
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=RATE,
+            language_code="en-US",
+        )
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=config, interim_results=True
+        )
+
+        audio_generator = stream.empty_buffer()
         requests = (
-            speech.StreamingRecognizeRequest(audio_content=chunk)
+            speech.StreamingRecognizeRequest(audio_content=bytes(chunk))
             for chunk in audio_generator
         )
         responses = client.streaming_recognize(config=streaming_config, requests=requests)
         process_responses(responses)
+    print(f"Intent gate stats: {intent_gate.stats()}")
 
 # Process responses from Speech-to-Text
 def process_responses(responses):
@@ -56,14 +64,16 @@ def process_responses(responses):
 
 # Detect if the text is a question or ask
 def is_question(text):
-    """Simple heuristic to detect questions or asks."""
-    question_keywords = ["describe","show", "explain", "what", "why", "how", "when", "who", "can", "could", "would", "is", "are", "do", "does"]
-    return any(word in text.lower() for word in question_keywords) or text.strip().endswith("?")
+    """Whole-word rules for questions and asks; see intentgate.DEFAULT_RULES."""
+    return intent_gate.check(text)
 
 # Generate response using Vertex AI
 def generate_response(prompt):
     """Generates a response using Vertex AI Text Generation Model."""
     print("Generating response...")
+    generation_model = clients.get(
+        clients.TEXT_MODEL, model_name=TEXT_MODEL, project_id=PROJECT_ID, location=LOCATION
+    )
     response = generation_model.predict(
         prompt,
         max_output_tokens=200,
@@ -74,4 +84,5 @@ def generate_response(prompt):
 # Main function
 if __name__ == "__main__":
     print("Listening for questions or requests...")
-    transcribe_streaming()
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    transcribe_streaming(source_from_args(args, RATE, CHUNK), startup_report="--startup" in sys.argv)
@@ -0,0 +1,93 @@
+import random
+import time
+from types import SimpleNamespace
+
+
+def make_chunk(text: str) -> SimpleNamespace:
+    """A stand-in for one streamed GenerationResponse carrying text."""
+    part = SimpleNamespace(text=text)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))], text=text)
+
+
+class FakeLLM:
+    """In-process stand-in for a streaming LLM with scripted latency.
+
+    Called as generate_tokens(transcript) it yields `tokens` text chunks, the
+    first after `first_token_latency` seconds and each later one after
+    `token_latency`; generate_content(..., stream=True) yields the same chunks
+    wrapped like GenerativeModel responses, so it can stand in for the model
+    inside VertexModel. A share of calls can be made slow to start (a latency
+    tail) or fail before their first token. Latencies can be jittered, all
+    reproducibly from a seed. slow_calls and failing_calls script what
+    happens to particular calls instead, e.g. to check retries and hedging.
+    """
+
+    def __init__(
+        self,
+        first_token_latency: float = 0.3,
+        token_latency: float = 0.02,
+        tokens: int = 20,
+        jitter: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 2.0,
+        error_rate: float = 0.0,
+        error: type = ConnectionError,
+        seed: int = 0,
+        slow_calls=(),
+        failing_calls: dict = None,
+    ) -> None:
+        """
+        Args:
+            first_token_latency (float): Seconds before the first chunk.
+            token_latency (float): Seconds between later chunks.
+            tokens (int): Chunks per answer.
+            jitter (float): Each delay is scaled by a random factor in [1 - jitter, 1 + jitter].
+            slow_rate (float): Share of calls whose first token takes slow_latency instead.
+            slow_latency (float): First-token latency of slow calls.
+            error_rate (float): Share of calls that raise `error` instead of answering.
+            error (type): Exception raised by failing calls.
+            seed (int): Seed for jitter, slow calls and failures.
+            slow_calls: Numbers of the calls (from 1) that are slow.
+            failing_calls (dict): Call number -> chunks yielded before that
+                call raises `error`; 0 fails before the first token.
+        """
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.error = error
+        self.slow_calls = set(slow_calls)
+        self.failing_calls = failing_calls or {}
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+        self.tokens_sent = 0
+
+    def _sleep(self, seconds: float) -> None:
+        if self.jitter:
+            seconds *= self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def __call__(self, transcript: str):
+        self.calls += 1
+        call = self.calls
+        fail_at = 0 if self._random.random() < self.error_rate else None
+        slow = self._random.random() < self.slow_rate or call in self.slow_calls
+        fail_at = self.failing_calls.get(call, fail_at)
+        words = transcript.split() or ["ok"]
+        for i in range(self.tokens):
+            self._sleep((self.slow_latency if slow else self.first_token_latency) if i == 0 else self.token_latency)
+            if i == fail_at:
+                self.failures += 1
+                raise self.error("Scripted failure")
+            self.tokens_sent += 1
+            yield f"{words[i % len(words)]} "
+
+    def generate_content(self, contents, generation_config=None, safety_settings=None, stream=True):
+        """GenerativeModel.generate_content; contents is a list whose first item is the prompt."""
+        for text in self(contents[0]):
+            yield make_chunk(text)
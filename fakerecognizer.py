@@ -0,0 +1,114 @@
+import datetime
+import time
+from array import array
+from types import SimpleNamespace
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+
+class StreamLimitExceeded(Exception):
+    """Raised like the Cloud API's OutOfRange when a stream carries too much audio."""
+
+
+def encode_script(words: list, vocabulary: list, rate: int = 16000, frame_ms: int = 100) -> bytes:
+    """Renders a script as PCM that FakeSpeechClient can "recognize".
+
+    Each word becomes one frame whose samples all equal its 1-based index in
+    vocabulary; None becomes a frame of silence. Consecutive silent frames end
+    an utterance.
+    """
+    frame = int(rate * frame_ms / 1000)
+    pcm = array("h")
+    for word in words:
+        value = 0 if word is None else vocabulary.index(word) + 1
+        pcm.extend([value] * frame)
+    return pcm.tobytes()
+
+
+def make_response(transcript: str, is_final: bool, end_seconds: float) -> SimpleNamespace:
+    """A stand-in for StreamingRecognizeResponse with one result and one alternative."""
+    result = SimpleNamespace(
+        alternatives=[SimpleNamespace(transcript=transcript, confidence=1.0)],
+        is_final=is_final,
+        result_end_time=datetime.timedelta(seconds=end_seconds),
+    )
+    return SimpleNamespace(results=[result])
+
+
+class FakeSpeechClient:
+    """In-process stand-in for speech.SpeechClient.streaming_recognize.
+
+    Decodes audio produced by encode_script: an interim result after every word,
+    and a final result after `endpoint_frames` silent frames or when the request
+    stream ends. Latency, a stream duration limit and failures can be scripted so
+    pipeline code can be exercised without the network. With single_utterance
+    the stream ends after its first final result, as the Cloud API's does.
+    """
+
+    def __init__(
+        self,
+        vocabulary: list,
+        rate: int = 16000,
+        frame_ms: int = 100,
+        endpoint_frames: int = 3,
+        response_latency: float = 0.0,
+        max_stream_seconds: float = None,
+        single_utterance: bool = False,
+    ) -> None:
+        self.vocabulary = vocabulary
+        self.rate = rate
+        self.frame_bytes = int(rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.frame_seconds = frame_ms / 1000
+        self.endpoint_frames = endpoint_frames
+        self.response_latency = response_latency
+        self.max_stream_seconds = max_stream_seconds
+        self.single_utterance = single_utterance
+        self.streams_opened = 0
+        self.requests_received = 0
+        self.bytes_received = 0
+
+    def streaming_recognize(self, config, requests, **kwargs):
+        """Yields responses for one stream; config is accepted and ignored."""
+        self.streams_opened += 1
+        return self._recognize(requests)
+
+    def _respond(self, words: list, is_final: bool, end_seconds: float) -> SimpleNamespace:
+        if self.response_latency:
+            time.sleep(self.response_latency)
+        return make_response(" ".join(words), is_final, end_seconds)
+
+    def _recognize(self, requests):
+        pending = b""
+        words = []
+        silent = 0
+        frames = 0
+        for request in requests:
+            audio = getattr(request, "audio_content", request)
+            self.requests_received += 1
+            self.bytes_received += len(audio)
+            pending += bytes(audio)
+
+            while len(pending) >= self.frame_bytes:
+                value = array("h", pending[:SAMPLE_WIDTH])[0]
+                pending = pending[self.frame_bytes :]
+                frames += 1
+                seconds = frames * self.frame_seconds
+                if self.max_stream_seconds is not None and seconds > self.max_stream_seconds:
+                    raise StreamLimitExceeded(
+                        f"Exceeded maximum allowed stream duration of {self.max_stream_seconds} seconds."
+                    )
+
+                if 0 < value <= len(self.vocabulary):
+                    words.append(self.vocabulary[value - 1])
+                    silent = 0
+                    yield self._respond(words, False, seconds)
+                elif words:
+                    silent += 1
+                    if silent >= self.endpoint_frames:
+                        yield self._respond(words, True, seconds)
+                        words = []
+                        if self.single_utterance:
+                            return
+
+        if words:
+            yield self._respond(words, True, frames * self.frame_seconds)
@@ -0,0 +1,373 @@
+import asyncio
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from micstream import MicStream, SAMPLE_WIDTH
+from audiosource import PushSource
+from coalesce import CoalescingPolicy
+from asyncpipeline import recognize
+
+try:
+    from google.cloud import speech
+except ImportError:  # The gateway can run against FakeSpeechClient without the SDK
+    speech = None
+
+# Audio every client sends: 16 kHz, 16-bit mono PCM
+RATE = 16000
+CHUNK = int(RATE / 10)  # 100ms
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+class RecognizerPool:
+    """Shares a fixed set of recognizer clients across sessions.
+
+    Each client owns one gRPC channel, and a channel multiplexes only so many
+    concurrent streams, so a new session goes to the client with the fewest
+    active sessions.
+    """
+
+    def __init__(self, clients: list) -> None:
+        if not clients:
+            raise ValueError("RecognizerPool needs at least one client")
+        self.clients = list(clients)
+        self._load = [0] * len(self.clients)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple:
+        """Returns (index, client) for the least loaded channel."""
+        with self._lock:
+            index = min(range(len(self._load)), key=self._load.__getitem__)
+            self._load[index] += 1
+            return index, self.clients[index]
+
+    def release(self, index: int) -> None:
+        with self._lock:
+            self._load[index] -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"channels": len(self.clients), "sessions_per_channel": list(self._load)}
+
+
+class _Session:
+    """One client connection: its audio stream and backpressure counters."""
+
+    def __init__(self, session_id: int, stream: MicStream, source: PushSource, channel: int) -> None:
+        self.id = session_id
+        self.stream = stream
+        self.source = source
+        self.channel = channel
+        self.started = time.perf_counter()
+        self.bytes_in = 0
+        self.interims = 0
+        self.finals = 0
+        self.pauses = 0  # Times reading from the socket stopped because the ring was full
+        self.paused_seconds = 0.0
+
+    def stats(self) -> dict:
+        buffer = self.stream.buffer_stats()
+        return {
+            "session": self.id,
+            "channel": self.channel,
+            "audio_seconds": round(self.bytes_in / (RATE * SAMPLE_WIDTH), 2),
+            "interims": self.interims,
+            "finals": self.finals,
+            "pauses": self.pauses,
+            "paused_seconds": round(self.paused_seconds, 3),
+            "buffer_level": buffer["level"],
+            "buffer_high_water": buffer["high_water"],
+            "dropped_bytes": buffer["dropped_bytes"],
+        }
+
+
+class TranscriptionGateway:
+    """TCP gateway that transcribes many concurrent audio feeds in one process.
+
+    A client connects, streams raw 16 kHz 16-bit mono PCM, and half-closes the
+    connection when its audio ends. Each connection gets its own MicStream fed
+    by a PushSource and its own recognition stream on a channel from a shared
+    RecognizerPool. Transcripts come back on the same connection as JSON lines,
+    {"session", "transcript", "is_final"}, followed by one {"session", "stats"}
+    line before the server closes it. If recognition fails, a
+    {"session", "error"} line is sent instead of the stats.
+
+    When a session's ring buffer is full the gateway stops reading its socket,
+    so TCP flow control slows that client down without affecting the others.
+    """
+
+    def __init__(
+        self,
+        clients: list,
+        streaming_config,
+        make_request=None,
+        host: str = HOST,
+        port: int = PORT,
+        buffer_seconds: float = 5.0,
+        max_sessions: int = 64,
+    ) -> None:
+        """
+        Args:
+            clients: Recognizer clients to share, e.g. several speech.SpeechClient
+                instances, or FakeSpeechClient for tests.
+            streaming_config: The StreamingRecognitionConfig for every session.
+            make_request: Builds a request from audio bytes; defaults to
+                speech.StreamingRecognizeRequest.
+            host (str): Interface to listen on.
+            port (int): Port to listen on; 0 picks a free one.
+            buffer_seconds (float): Audio buffered per session before reading
+                from its socket pauses.
+            max_sessions (int): Concurrent sessions; further connections wait.
+        """
+        self.pool = RecognizerPool(clients)
+        self.streaming_config = streaming_config
+        self.make_request = make_request or (
+            lambda chunk: speech.StreamingRecognizeRequest(audio_content=chunk)
+        )
+        self.host = host
+        self.port = port
+        self.buffer_seconds = buffer_seconds
+        self.max_sessions = max_sessions
+        self.server = None
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self._slots = None
+
+        # Statistics
+        self.sessions_served = 0
+        self.session_errors = 0
+        self.audio_seconds = 0.0
+        self._wall_started = None
+        self._cpu_started = None
+
+    async def start(self) -> asyncio.AbstractServer:
+        """Start listening; `port` is updated with the bound port."""
+        loop = asyncio.get_running_loop()
+        # Every session holds two blocking threads: the recognizer call and its request iterator
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=2 * self.max_sessions + 4))
+        self._slots = asyncio.Semaphore(self.max_sessions)
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self) -> None:
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _feed(self, session: _Session, reader: asyncio.StreamReader) -> None:
+        """Copy socket audio into the session's ring, pausing while it is full."""
+        chunk_bytes = CHUNK * SAMPLE_WIDTH
+        try:
+            while True:
+                try:
+                    data = await reader.readexactly(chunk_bytes)
+                except asyncio.IncompleteReadError as e:
+                    data = e.partial[: len(e.partial) - len(e.partial) % SAMPLE_WIDTH]
+                    if data:
+                        session.bytes_in += len(data)
+                        session.source.push(data)
+                    return
+
+                if session.stream.buffer_stats()["free"] < len(data):
+                    session.pauses += 1
+                    paused = time.perf_counter()
+                    while session.stream.buffer_stats()["free"] < len(data):
+                        await asyncio.sleep(CHUNK / RATE / 4)
+                    session.paused_seconds += time.perf_counter() - paused
+
+                session.bytes_in += len(data)
+                if not session.source.push(data):
+                    return
+        except ConnectionError:
+            return
+        finally:
+            session.source.end()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async with self._slots:
+            session_id = next(self._ids)
+            source = PushSource(RATE, CHUNK)
+            # Request-sized reads keep each message under the API limit and the borrowed slice small
+            stream = MicStream(
+                RATE,
+                CHUNK,
+                self.buffer_seconds,
+                source=source,
+                log_mode="off",
+                coalesce=CoalescingPolicy(RATE, max_delay_ms=0),
+            )
+            channel, client = self.pool.acquire()
+            session = _Session(session_id, stream, source, channel)
+            self.sessions[session_id] = session
+            self.sessions_served += 1
+
+            try:
+                with stream:
+                    feed = asyncio.create_task(self._feed(session, reader))
+                    try:
+                        async for response in recognize(
+                            client, self.streaming_config, stream.empty_buffer(), self.make_request
+                        ):
+                            if not response.results or not response.results[0].alternatives:
+                                continue
+                            result = response.results[0]
+                            if result.is_final:
+                                session.finals += 1
+                            else:
+                                session.interims += 1
+                            self._send(
+                                writer,
+                                {
+                                    "session": session_id,
+                                    "transcript": result.alternatives[0].transcript,
+                                    "is_final": result.is_final,
+                                },
+                            )
+                            await writer.drain()
+                    finally:
+                        feed.cancel()
+                    self._send(writer, {"session": session_id, "stats": session.stats()})
+                    await writer.drain()
+            except ConnectionError:
+                pass  # The client went away; its audio stream has already ended
+            except Exception as e:
+                # The recognizer failed: tell the client why, then free its channel and close
+                self.session_errors += 1
+                try:
+                    self._send(writer, {"session": session_id, "error": f"{type(e).__name__}: {e}"})
+                    await writer.drain()
+                except ConnectionError:
+                    pass
+            finally:
+                self.pool.release(channel)
+                self.audio_seconds += session.bytes_in / (RATE * SAMPLE_WIDTH)
+                del self.sessions[session_id]
+                writer.close()
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, message: dict) -> None:
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+
+    def stats(self) -> dict:
+        """Gateway totals, the pool's load and every live session's backpressure.
+
+        sessions_per_core is audio seconds transcribed per CPU second: how many
+        real-time feeds one core sustains at the current load.
+        """
+        wall = time.perf_counter() - self._wall_started if self._wall_started else 0.0
+        cpu = time.process_time() - self._cpu_started if self._cpu_started else 0.0
+        audio = self.audio_seconds + sum(
+            s.bytes_in / (RATE * SAMPLE_WIDTH) for s in list(self.sessions.values())
+        )
+        return {
+            "active_sessions": len(self.sessions),
+            "sessions_served": self.sessions_served,
+            "session_errors": self.session_errors,
+            "audio_seconds": round(audio, 2),
+            "cpu_utilization": round(cpu / wall, 3) if wall else 0.0,
+            "sessions_per_core": round(audio / cpu, 1) if cpu else 0.0,
+            "pool": self.pool.stats(),
+            "sessions": [s.stats() for s in list(self.sessions.values())],
+        }
+
+
+async def send_audio(host: str, port: int, pcm: bytes, speed: float = 1.0) -> list:
+    """Client side: stream pcm to a gateway in 100 ms chunks and collect its replies.
+
+    speed paces the audio as a multiple of real time (None sends it unpaced).
+    Returns the decoded JSON messages in the order received.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    chunk_bytes = CHUNK * SAMPLE_WIDTH
+
+    async def upload():
+        started = time.perf_counter()
+        for n, i in enumerate(range(0, len(pcm), chunk_bytes)):
+            if speed:
+                delay = started + n * CHUNK / RATE / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            writer.write(pcm[i : i + chunk_bytes])
+            await writer.drain()
+        writer.write_eof()
+
+    upload_task = asyncio.create_task(upload())
+    messages = [json.loads(line) async for line in reader]
+    await upload_task
+    writer.close()
+    return messages
+
+
+async def _benchmark(sessions: int, seconds: float, channels: int, speed: float) -> dict:
+    """Serve `sessions` simulated feeds through FakeSpeechClient and check every transcript."""
+    from fakerecognizer import FakeSpeechClient, encode_script
+
+    vocabulary = [f"word{n}" for n in range(sessions * 4)]
+    clients = [FakeSpeechClient(vocabulary, RATE) for _ in range(channels)]
+    gateway = TranscriptionGateway(clients, None, make_request=lambda chunk: chunk, port=0, max_sessions=sessions)
+    await gateway.start()
+
+    # Each session repeats its own four words, so a transcript routed to the wrong session shows
+    scripts = []
+    for n in range(sessions):
+        words = vocabulary[n * 4 : n * 4 + 4]
+        utterances = max(1, int(seconds / ((len(words) + 3) * 0.1)))
+        scripts.append((words, encode_script((words + [None] * 3) * utterances, vocabulary, RATE)))
+
+    results = await asyncio.gather(
+        *(send_audio(gateway.host, gateway.port, pcm, speed) for _, pcm in scripts)
+    )
+    stats = gateway.stats()
+    await gateway.close()
+
+    expected = [" ".join(words) for words, _ in scripts]
+    finals = [[m["transcript"] for m in messages if m.get("is_final")] for messages in results]
+    stats["transcripts_correct"] = all(
+        finals[n] and all(f == expected[n] for f in finals[n]) for n in range(sessions)
+    )
+    stats["sessions"] = [messages[-1]["stats"] for messages in results]
+    return stats
+
+
+if __name__ == "__main__":
+    # Usage: python gateway.py [port]                        serve with Cloud Speech
+    #        python gateway.py bench [sessions] [seconds]     fake recognizer, real-time feeds
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        sessions = int(args[1]) if len(args) > 1 else 32
+        seconds = float(args[2]) if len(args) > 2 else 10.0
+        result = asyncio.run(_benchmark(sessions, seconds, channels=4, speed=1.0))
+        summary = {k: v for k, v in result.items() if k != "sessions"}
+        summary["max_paused_seconds"] = max(s["paused_seconds"] for s in result["sessions"])
+        summary["cores"] = os.cpu_count()
+        print(json.dumps(summary, indent=2))
+    else:
+        config = speech.StreamingRecognitionConfig(
+            config=speech.RecognitionConfig(
+                encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+                sample_rate_hertz=RATE,
+                language_code="en-US",
+            ),
+            interim_results=True,
+        )
+        gateway = TranscriptionGateway(
+            [speech.SpeechClient() for _ in range(4)],
+            config,
+            port=int(args[0]) if args else PORT,
+        )
+        print(f"Transcription gateway listening on {gateway.host}:{gateway.port}")
+        asyncio.run(gateway.serve_forever())
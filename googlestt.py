@@ -1,14 +1,10 @@
 import sys
-import logging
-import queue
-from google.cloud import speech
-import pyaudio
-from google.cloud import aiplatform
-from google.auth.credentials import AnonymousCredentials
-import base64
-import vertexai
-from vertexai.preview.generative_models import GenerativeModel, Part, SafetySetting, Tool
-from vertexai.preview.generative_models import grounding
+import asyncio
+import clients
+from micstream import MicStream
+from audiosource import source_from_args
+from vad import VoiceActivityGate
+import asyncpipeline
 
 # Audio recording parameters
 RATE = 16000
@@ -17,142 +13,31 @@ LANGUAGE_CODE = "en-US"
 LOCATION = "us-east1"
 PROJECT_ID = "propane-sphinx-448317-p4" 
 
-# Create model
+# The model itself is built on first use (or warmed in main) by clients
 generation_config = {
     "max_output_tokens": 8192,
     "temperature": 1,
     "top_p": 0.95,
 }
-safety_settings = [
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF
-    ),
-]
-tools = [
-    Tool.from_google_search_retrieval(
-        google_search_retrieval=grounding.GoogleSearchRetrieval()
-    ),
-]
-vertexai.init(project="propane-sphinx-448317-p4", location="us-east1")
-model = GenerativeModel(
-    "gemini-1.5-pro-002",
-    tools=tools,
-)
-
-# Audio stream class
-class MicStream:
-    """Opens a recording stream as an empty_buffer yielding the audio chunks."""
-
-    def __init__(self: object, rate: int, chunk: int) -> None:
-        self._rate = rate
-        self._chunk = chunk
-        self._buff = queue.Queue()
-        self.closed = True
-
-        # Initialize a logger for this instance
-        self.logger = logging.getLogger(self.__class__.__name__)
-        self.logger.setLevel(logging.DEBUG)
-
-
-        handler = logging.FileHandler("logs/audio_stream.log")
-        handler.setLevel(logging.DEBUG)
-
-        # Create a formatter and set it for the handler
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        handler.setFormatter(formatter)
-
-        # Add the handler to the logger
-        self.logger.addHandler(handler)
-
-        self.logger.info("MicStream initialized.")
-
-    def __enter__(self: object) -> object:
-        self._audio_interface = pyaudio.PyAudio()
-        self._audio_stream = self._audio_interface.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self._rate,
-            input=True,
-            frames_per_buffer=self._chunk,
-            # After every chunk of audio is captured, PyAudio invokes the stream_callback function
-            stream_callback=self._fill_buffer,
-        )
-        self.closed = False
-        self.logger.info("Audio stream opened.")
-        return self
-
-    def _fill_buffer(self: object, in_data: object, frame_count: int, time_info: object, status_flags: object) -> object:
-        """Fill the buffer with audio data."""
-        self._buff.put(in_data)
-        self.logger.debug(f"Added chunk of size {len(in_data)} to buffer.")
-        return None, pyaudio.paContinue
-
-    def empty_buffer(self: object) -> object:
-        """Generates audio chunks from the stream."""
-        while not self.closed:
-            self.logger.info("Waiting for the first chunk...")
-            chunk = self._buff.get()
-            if chunk is None:
-                self.logger.info("Stream closed, no more data.")
-                return
-
-            self.logger.debug(f"Received first chunk: {len(chunk)} bytes")
-            data = [chunk]
-
-            # Adding additional chunks, if available
-            self.logger.info("Checking for additional chunks...")
-            while True:
-                try:
-                    chunk = self._buff.get(block=False)
-                    if chunk is None:
-                        self.logger.info("Stream closed, no more data.")
-                        return
-                    data.append(chunk)
-                    self.logger.debug(f"Received additional chunk: {len(chunk)} bytes")
-                except queue.Empty:
-                    self.logger.info("No more chunks available, moving to next iteration.")
-                    break
-
-            # After gathering chunks, yield the combined data
-            self.logger.info(f"Yielding a total of {len(b''.join(data))} bytes of audio data.")
-            yield b"".join(data)
-
-    def __exit__(self: object, type: object, value: object, traceback: object) -> None:
-        self._audio_stream.stop_stream()
-        self._audio_stream.close()
-        self.closed = True
-        self._buff.put(None)
-        self._audio_interface.terminate()
-        self.logger.info("Audio stream closed.")
 
-
-def generate(transcript):
-    responses = model.generate_content(
+def generate_tokens(transcript):
+    """Yields the model's answer to transcript as it streams in."""
+    responses = clients.get(clients.GEMINI).generate_content(
         [transcript],
         generation_config=generation_config,
-        safety_settings=safety_settings,
+        safety_settings=clients.safety_settings(),
         stream=True,
     )
 
     for response in responses:
         if not response.candidates or not response.candidates[0].content.parts:
             continue
-        print(response.text, end="")
+        yield response.text
+
+
+def generate(transcript):
+    for text in generate_tokens(transcript):
+        print(text, end="")
 
 
 
@@ -189,34 +74,81 @@ def listen_print_loop(responses: object) -> str:
 
 
 
-def main() -> None:
-    """Transcribe speech and get responses from Vertex AI."""
+def main(
+    source: object = None,
+    vad: bool = False,
+    use_async: bool = False,
+    startup_report: bool = False,
+) -> None:
+    """Transcribe speech and get responses from Vertex AI.
+
+    source is an audiosource.AudioSource; the live microphone is used if omitted.
+    vad puts a VoiceActivityGate in front of the recognizer to skip silence.
+    use_async runs the asyncio pipeline, so answers stream while transcription
+    continues and a new utterance cancels the answer to the previous one.
+    startup_report prints import and init time per component once they are ready.
+    """
     language_code = "en-US"  # Language code
 
-    client = speech.SpeechClient()
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=RATE,
-        language_code=language_code,
+    # Clients and the model load in the background while the microphone starts
+    clients.warm(
+        clients.SPEECH,
+        clients.GEMINI,
+        on_ready=(lambda report: print(clients.format_startup_report(report))) if startup_report else None,
     )
 
-    streaming_config = speech.StreamingRecognitionConfig(
-        config=config, interim_results=True
-    )
+    with MicStream(RATE, CHUNK, source=source) as stream:
+        clients.mark("capture_started")
+        speech = clients.module(clients.SPEECH)
+        client = clients.get(clients.SPEECH)
+        config = speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=RATE,
+            language_code=language_code,
+        )
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=config, interim_results=True
+        )
 
-    with MicStream(RATE, CHUNK) as stream:
         audio_empty_buffer = stream.empty_buffer()
+        gate = VoiceActivityGate(RATE) if vad else None
+        if gate:
+            audio_empty_buffer = gate.filter(audio_empty_buffer)
         requests = (
-            speech.StreamingRecognizeRequest(audio_content=content)
+            speech.StreamingRecognizeRequest(audio_content=bytes(content))
             for content in audio_empty_buffer
         )
 
         print("Starting to listen and transcribe...")
+        if use_async:
+            final_transcript = asyncio.run(
+                asyncpipeline.run_pipeline(
+                    client,
+                    streaming_config,
+                    audio_empty_buffer,
+                    generate_tokens,
+                    make_request=lambda content: speech.StreamingRecognizeRequest(
+                        audio_content=content
+                    ),
+                )
+            )
+            print(f"Final Transcription: {final_transcript}")
+            return
+
         responses = client.streaming_recognize(streaming_config, requests)
 
         # Get the final transcription from the server responses
         final_transcript = listen_print_loop(responses)
         print(f"Final Transcription: {final_transcript}")
+        if gate:
+            print(f"Voice activity gate: {gate.stats()}")
 
 if __name__ == "__main__":
-    main()
+    # Optional arguments replay a file or synthetic audio, e.g. "recording.wav 10 --vad --async"
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(
+        source_from_args(args, RATE, CHUNK),
+        vad="--vad" in sys.argv,
+        use_async="--async" in sys.argv,
+        startup_report="--startup" in sys.argv,
+    )
@@ -0,0 +1,220 @@
+import csv
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+import numpy as np
+
+# The substring check draven used before the gate, kept as a baseline
+LEGACY_KEYWORDS = (
+    "describe", "show", "explain", "what", "why", "how", "when", "who",
+    "can", "could", "would", "is", "are", "do", "does",
+)
+
+_SUBJECTS = r"(?:you|i|we|it|there|this|that|these|those|he|she|they|my|your|the|a|any)"
+
+# (name, pattern, weight); patterns only match whole words and are searched in the
+# lowercased transcript, so "is" does not fire inside "this" nor "how" inside "show"
+DEFAULT_RULES = (
+    # Opens with a question word, but not an exclamation like "what a day" or "how nice"
+    ("wh_opening", r"^(?:so\s+|and\s+|but\s+|ok(?:ay)?\s+)?(?:what|why|how|when|where|who|whom|whose|which)\b(?!\s+(?:a|an|nice|great|lovely)\b)", 1.0),
+    ("contracted_wh", r"^(?:what|how|where|who|why|when)'s\b", 1.0),
+    # Opens with an auxiliary followed by its subject: "is it", "can you", "does this"
+    ("inverted_auxiliary", rf"^(?:can|could|would|will|should|shall|is|are|was|were|do|does|did|have|has|may|might)\s+{_SUBJECTS}\b", 1.0),
+    # Opens with an instruction, optionally after "please"
+    ("imperative", r"^(?:please\s+)?(?:describe|show|explain|tell|give|list|define|summarize|summarise|translate|compare|remind|help|walk|find|recommend)\b(?=\s+\w)", 1.0),
+    # Asks embedded in a statement
+    ("embedded_ask", r"\b(?:i want to know|i wonder|i'd like to know|any idea|do you know|can you|could you|would you)\b", 1.0),
+    # Instructions phrased as advice, e.g. "i think you should explain that"
+    ("indirect_request", r"\byou (?:should|need to|have to|must)\s+(?:please\s+)?(?:describe|show|explain|tell|give|list|define|summarize|summarise|compare|walk)\b", 1.0),
+    ("question_mark", r"\?\s*$", 1.0),
+    # Statements about knowing or doing, e.g. "i know what you mean", "i'll explain later"
+    ("first_person_statement", r"^(?:i|we|he|she|they)(?:'ll|'d)?\s+(?:know|don't know|think|was|were|will|did|asked)\b", -0.5),
+)
+
+
+class HashedLogisticScorer:
+    """Tiny logistic regression over hashed word unigrams and bigrams.
+
+    Small enough to train in milliseconds on a few hundred labeled transcripts
+    and to score one in microseconds, with no dependency beyond numpy.
+    """
+
+    def __init__(self, features: int = 2**12, epochs: int = 200, learning_rate: float = 0.5, l2: float = 1e-3) -> None:
+        """
+        Args:
+            features (int): Hash buckets.
+            epochs (int): Passes of gradient descent in fit().
+            learning_rate (float): Step size.
+            l2 (float): Weight decay.
+        """
+        self.features = features
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+        self.weights = np.zeros(features)
+        self.bias = 0.0
+
+    def _indices(self, text: str) -> list:
+        words = ["<s>"] + re.findall(r"[\w']+", text.lower())
+        grams = words[1:] + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return sorted({zlib.crc32(gram.encode("utf-8")) % self.features for gram in grams})
+
+    def fit(self, texts: list, labels: list) -> "HashedLogisticScorer":
+        rows = np.zeros((len(texts), self.features))
+        for row, text in zip(rows, texts):
+            row[self._indices(text)] = 1.0
+        labels = np.asarray(labels, dtype=float)
+        for _ in range(self.epochs):
+            error = 1 / (1 + np.exp(-(rows @ self.weights + self.bias))) - labels
+            self.weights -= self.learning_rate * (rows.T @ error / len(texts) + self.l2 * self.weights)
+            self.bias -= self.learning_rate * error.mean()
+        return self
+
+    def __call__(self, text: str) -> float:
+        """Probability that the transcript is a question or request."""
+        return float(1 / (1 + np.exp(-(self.weights[self._indices(text)].sum() + self.bias))))
+
+
+class IntentGate:
+    """Decides whether a final transcript is a question or request worth an LLM call.
+
+    Each rule is compiled once and searched on its own, so rules whose
+    matches overlap (a negative first-person opening and an ask later in the
+    same words) all count. Each rule that matches adds its weight; an
+    optional scorer (text -> probability) adds scorer_weight * (2p - 1). The
+    transcript passes when the total reaches `threshold`.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, threshold: float = 0.5, scorer=None, scorer_weight: float = 1.0) -> None:
+        """
+        Args:
+            rules: (name, pattern, weight) triples; patterns are regular
+                expressions over the lowercased, stripped transcript.
+            threshold (float): Score needed to pass.
+            scorer: Optional callable returning the probability of an ask,
+                e.g. a fitted HashedLogisticScorer.
+            scorer_weight (float): Most the scorer can add or subtract.
+        """
+        self.weights = {name: weight for name, _, weight in rules}
+        self._patterns = [(name, re.compile(pattern)) for name, pattern, _ in rules]
+        self.threshold = threshold
+        self.scorer = scorer
+        self.scorer_weight = scorer_weight
+
+        # Statistics
+        self.checked = 0
+        self.passed = 0
+        self.seconds = 0.0
+        self.rule_hits = Counter()
+
+    def matches(self, text: str) -> set:
+        """Names of the rules that match anywhere in the transcript."""
+        text = text.strip().lower()
+        return {name for name, pattern in self._patterns if pattern.search(text)}
+
+    def score(self, text: str) -> float:
+        names = self.matches(text)
+        self.rule_hits.update(names)
+        total = sum(self.weights[name] for name in names)
+        if self.scorer is not None:
+            total += self.scorer_weight * (2 * self.scorer(text) - 1)
+        return total
+
+    def check(self, text: str) -> bool:
+        """True if the transcript should go to the LLM."""
+        started = time.perf_counter()
+        passed = bool(text.strip()) and self.score(text) >= self.threshold
+        self.seconds += time.perf_counter() - started
+        self.checked += 1
+        self.passed += passed
+        return passed
+
+    def stats(self) -> dict:
+        return {
+            "checked": self.checked,
+            "llm_calls": self.passed,
+            "llm_calls_avoided": self.checked - self.passed,
+            "mean_us": round(1e6 * self.seconds / self.checked, 1) if self.checked else 0.0,
+            "rule_hits": dict(self.rule_hits.most_common()),
+        }
+
+
+def legacy_is_question(text: str) -> bool:
+    """draven's original heuristic: any keyword as a substring, or a trailing "?"."""
+    return any(word in text.lower() for word in LEGACY_KEYWORDS) or text.strip().endswith("?")
+
+
+def load_fixture(path: str) -> tuple:
+    """Transcripts and 0/1 labels from a CSV with transcript and is_request columns."""
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    return [row["transcript"] for row in rows], [int(row["is_request"]) for row in rows]
+
+
+def evaluate(check, texts: list, labels: list) -> dict:
+    """Precision and recall of check(text) -> bool, and the LLM calls it would make."""
+    predicted = [bool(check(text)) for text in texts]
+    true_positives = sum(p and l for p, l in zip(predicted, labels))
+    calls = sum(predicted)
+    positives = sum(labels)
+    precision = true_positives / calls if calls else 0.0
+    recall = true_positives / positives if positives else 0.0
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+        "llm_calls": calls,
+        "wasted_calls": calls - true_positives,
+    }
+
+
+def _cross_validated(texts: list, labels: list, folds: int = 5) -> list:
+    """Gate-with-scorer decisions where each transcript is scored by a model not trained on it."""
+    decisions = [False] * len(texts)
+    for fold in range(folds):
+        train = [i for i in range(len(texts)) if i % folds != fold]
+        scorer = HashedLogisticScorer().fit([texts[i] for i in train], [labels[i] for i in train])
+        gate = IntentGate(scorer=scorer)
+        for i in range(fold, len(texts), folds):
+            decisions[i] = gate.check(texts[i])
+    return decisions
+
+
+def check_rules() -> None:
+    """Asserts that overlapping rules all score, on transcripts outside the fixture."""
+    gate = IntentGate()
+    cases = (
+        # (transcript, rules expected to match, passes)
+        ("i think you should explain that", {"first_person_statement", "indirect_request"}, True),
+        ("i think, could you walk me through it", {"first_person_statement", "embedded_ask"}, True),
+        ("we were wondering why it failed?", {"first_person_statement", "question_mark"}, True),
+        ("i know what you mean", {"first_person_statement"}, False),
+        ("they asked how it works", {"first_person_statement"}, False),
+        ("show me the logs", {"imperative"}, True),
+    )
+    for text, expected, passes in cases:
+        assert gate.matches(text) == expected, (text, gate.matches(text))
+        assert gate.check(text) == passes, text
+
+
+if __name__ == "__main__":
+    # Usage: python intentgate.py [fixture.csv]
+    check_rules()
+    texts, labels = load_fixture(sys.argv[1] if len(sys.argv) > 1 else "data/intents.csv")
+    legacy = evaluate(legacy_is_question, texts, labels)
+    gate = IntentGate()
+    rules = evaluate(gate.check, texts, labels)
+    decisions = iter(_cross_validated(texts, labels))
+    scored = evaluate(lambda _: next(decisions), texts, labels)
+    # The rules were written against this fixture, so their line is a fit, not an estimate;
+    # only the scorer's cross-validated line measures anything held out
+    for name, result in (
+        ("legacy substrings", legacy),
+        ("rules (fit on fixture)", rules),
+        ("rules + scorer (5-fold)", scored),
+    ):
+        avoided = legacy["llm_calls"] - result["llm_calls"]
+        print(f"{name:<24} {result}  calls avoided vs legacy: {avoided}")
+    print(f"Gate stats: {gate.stats()}")
@@ -0,0 +1,514 @@
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+MANIFEST = "segments.bin"
+MANIFEST_ENTRY = struct.Struct("<qddq")  # Segment number, first and last indexed time, records
+COUNT = struct.Struct("<q")
+
+
+def _segment_path(directory: str, number: int, suffix: str) -> str:
+    return os.path.join(directory, f"journal-{number:06d}{suffix}")
+
+
+def words(text: str) -> list:
+    """Lowercased words of a transcript, as indexed and searched."""
+    return re.findall(r"[\w']+", text.lower())
+
+
+def terms(text_words: list) -> set:
+    """What a record is indexed under: its words and its pairs of adjacent words."""
+    return set(text_words) | {f"{a} {b}" for a, b in zip(text_words, text_words[1:])}
+
+
+def term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _write_atomically(path: str, parts: list) -> None:
+    with open(path + ".tmp", "wb") as f:
+        for part in parts:
+            f.write(part)
+    os.replace(path + ".tmp", path)
+
+
+class _ActiveSegment:
+    """The segment being appended to, with its time and word indexes in memory.
+
+    Memory is bounded by the segment limits; seal() writes both indexes next
+    to the records and the segment is never written again.
+    """
+
+    def __init__(self, directory: str, number: int, writable: bool = True) -> None:
+        self.number = number
+        self.path = _segment_path(directory, number, ".jsonl")
+        self.times = array("d")  # Never decreasing, so it can be bisected
+        self.offsets = array("q")
+        self._postings = {}  # Term hash -> record ordinals
+        self.size = 0
+        self._file = None
+        if writable:
+            self._file = open(self.path, "a+b")
+        elif os.path.exists(self.path):
+            self._file = open(self.path, "rb")
+        if self._file is not None:
+            self._recover(writable)
+
+    def _recover(self, writable: bool) -> None:
+        """Index what was appended but never sealed; a writer cuts off a torn last line."""
+        self._file.seek(0)
+        offset = 0
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break
+            self._index(json.loads(line), offset)
+            offset += len(line)
+        if writable:
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        self.size = offset
+
+    def _index(self, record: dict, offset: int) -> None:
+        ordinal = len(self.times)
+        self.times.append(max(record["time"], self.times[-1]) if self.times else record["time"])
+        self.offsets.append(offset)
+        for term in terms(words(record.get("text", ""))):
+            self._postings.setdefault(term_hash(term), array("I")).append(ordinal)
+
+    def append(self, record: dict) -> None:
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        self._file.write(line)
+        self._file.flush()
+        self._index(record, self.size)
+        self.size += len(line)
+
+    def postings(self, key: int):
+        return self._postings.get(key, ())
+
+    def record(self, ordinal: int) -> dict:
+        end = self.offsets[ordinal + 1] if ordinal + 1 < len(self.offsets) else self.size
+        return json.loads(os.pread(self._file.fileno(), end - self.offsets[ordinal], self.offsets[ordinal]))
+
+    @property
+    def first(self) -> float:
+        return self.times[0]
+
+    @property
+    def last(self) -> float:
+        return self.times[-1]
+
+    @property
+    def term_count(self) -> int:
+        return len(self._postings)
+
+    def seal(self, directory: str) -> bytes:
+        """Write the indexes and return the segment's manifest entry."""
+        count = len(self.times)
+        _write_atomically(
+            _segment_path(directory, self.number, ".idx"),
+            [COUNT.pack(count), self.times.tobytes(), self.offsets.tobytes()],
+        )
+        keys = array("Q", sorted(self._postings))
+        starts = array("Q", [0])
+        postings = array("I")
+        for key in keys:
+            postings.extend(self._postings[key])
+            starts.append(len(postings))
+        _write_atomically(
+            _segment_path(directory, self.number, ".words"),
+            [COUNT.pack(len(keys)), keys.tobytes(), starts.tobytes(), postings.tobytes()],
+        )
+        self.close()
+        return MANIFEST_ENTRY.pack(self.number, self.times[0], self.times[-1], count)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class _SealedSegment:
+    """A finished segment read through mmap; nothing is loaded up front.
+
+    The .words file holds the term count, the sorted term hashes, where each
+    hash's postings start, and the postings (record ordinals). The .idx file
+    holds the record count, then every record's time and byte offset; it and
+    the records are only mapped once a query needs them. Lookups bisect the
+    mapped arrays directly.
+    """
+
+    def __init__(self, directory: str, number: int, first: float, last: float) -> None:
+        self.directory = directory
+        self.number = number
+        self.first = first
+        self.last = last
+        self._maps = []
+        word_index = self._map(".words")
+        (count,) = COUNT.unpack_from(word_index)
+        self.term_count = count
+        self._keys = memoryview(word_index)[8 : 8 + 8 * count].cast("Q")
+        self._starts = memoryview(word_index)[8 + 8 * count : 16 + 16 * count].cast("Q")
+        self._postings = memoryview(word_index)[16 + 16 * count :].cast("I")
+        self._records = None
+        self._times = None
+        self._offsets = None
+
+    def _load(self) -> None:
+        if self._records is not None:
+            return
+        self._records = memoryview(self._map(".jsonl"))
+        index = self._map(".idx")
+        (count,) = COUNT.unpack_from(index)
+        self._times = memoryview(index)[8 : 8 + 8 * count].cast("d")
+        self._offsets = memoryview(index)[8 + 8 * count : 8 + 16 * count].cast("q")
+
+    @property
+    def times(self):
+        self._load()
+        return self._times
+
+    def _map(self, suffix: str) -> mmap.mmap:
+        with open(_segment_path(self.directory, self.number, suffix), "rb") as f:
+            self._maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._maps[-1]
+
+    def postings(self, key: int):
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return ()
+        return self._postings[self._starts[i] : self._starts[i + 1]]
+
+    def record(self, ordinal: int) -> dict:
+        self._load()
+        offsets = self._offsets
+        end = offsets[ordinal + 1] if ordinal + 1 < len(offsets) else len(self._records)
+        return json.loads(bytes(self._records[offsets[ordinal] : end]))
+
+    def close(self) -> None:
+        for view in (self._records, self._times, self._offsets, self._keys, self._starts, self._postings):
+            if view is not None:
+                view.release()
+        for mapped in self._maps:
+            mapped.close()
+
+
+class TranscriptJournal:
+    """Append-only journal of final transcripts and answers with time and word indexes.
+
+    Records (dicts with a "time" and usually a "text") are appended as JSON
+    lines to the active segment, which is sealed once it spans
+    `segment_seconds` or holds `max_records`: its time index and inverted word
+    index are written beside it and a manifest entry records the times it
+    covers. Queries pick segments from the manifest and bisect their mapped
+    indexes, keeping at most `open_segments` mapped at once, so memory stays
+    flat however long the journal runs. A segment left unsealed by a crash is
+    re-indexed on open. A read-only journal can be queried while another
+    process appends to the same directory; it sees what was there when opened.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_seconds: float = 3600.0,
+        max_records: int = 50000,
+        open_segments: int = 16,
+        readonly: bool = False,
+    ) -> None:
+        """
+        Args:
+            directory (str): Where segments and the manifest go; created if missing.
+            segment_seconds (float): Most time one segment spans.
+            max_records (int): Most records in one segment.
+            open_segments (int): Sealed segments kept mapped between queries.
+            readonly (bool): Only query; the active segment is read as it stands.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.max_records = max_records
+        self.open_segments = open_segments
+        self.readonly = readonly
+        self._numbers = array("q")
+        self._firsts = array("d")
+        self._lasts = array("d")
+        self._counts = array("q")
+        manifest = os.path.join(directory, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest, "rb") as f:
+                data = f.read()
+            for entry in MANIFEST_ENTRY.iter_unpack(data[: len(data) - len(data) % MANIFEST_ENTRY.size]):
+                self._add_entry(entry)
+        self._mapped = OrderedDict()
+        self._active = _ActiveSegment(directory, self._numbers[-1] + 1 if self._numbers else 0, not readonly)
+        self.closed = False
+
+        # Statistics
+        self.appended = 0
+        self.sealed = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.segments_mapped = 0
+
+    def _add_entry(self, entry: tuple) -> None:
+        number, first, last, count = entry
+        self._numbers.append(number)
+        self._firsts.append(first)
+        self._lasts.append(last)
+        self._counts.append(count)
+
+    def append(self, record: dict) -> None:
+        """Add a record; record["time"] is a time.time() value."""
+        if self.readonly:
+            raise ValueError("The journal was opened read-only")
+        active = self._active
+        if active.times and (
+            len(active.times) >= self.max_records or record["time"] - active.times[0] >= self.segment_seconds
+        ):
+            self._seal()
+        self._active.append(record)
+        self.appended += 1
+
+    def _seal(self) -> None:
+        entry = self._active.seal(self.directory)
+        with open(os.path.join(self.directory, MANIFEST), "ab") as f:
+            f.write(entry)
+        self._add_entry(MANIFEST_ENTRY.unpack(entry))
+        self.sealed += 1
+        self._active = _ActiveSegment(self.directory, self._active.number + 1)
+
+    def _segment(self, i: int) -> _SealedSegment:
+        number = self._numbers[i]
+        segment = self._mapped.pop(number, None)
+        if segment is None:
+            segment = _SealedSegment(self.directory, number, self._firsts[i], self._lasts[i])
+            self.segments_mapped += 1
+            if len(self._mapped) >= self.open_segments:
+                self._mapped.popitem(last=False)[1].close()
+        self._mapped[number] = segment
+        return segment
+
+    def _segments(self, start: float, end: float, newest_first: bool = False):
+        """Segments that may hold records between start and end, the active one included."""
+        order = range(len(self._numbers))
+        if newest_first:
+            if self._active.times and self._active.times[-1] >= start and self._active.times[0] <= end:
+                yield self._active
+            order = reversed(order)
+        for i in order:
+            if self._lasts[i] >= start and self._firsts[i] <= end:
+                yield self._segment(i)
+        if not newest_first and self._active.times and self._active.times[-1] >= start and self._active.times[0] <= end:
+            yield self._active
+
+    def _timed(self, started: float) -> None:
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - started
+
+    def between(self, start: float, end: float, limit: int = None) -> list:
+        """Records from `start` to `end` (time.time() values, inclusive), oldest first."""
+        started = time.perf_counter()
+        found = []
+        for segment in self._segments(start, end):
+            first = bisect.bisect_left(segment.times, start)
+            last = bisect.bisect_right(segment.times, end)
+            for ordinal in range(first, last):
+                if limit is not None and len(found) >= limit:
+                    break
+                found.append(segment.record(ordinal))
+        self._timed(started)
+        return found
+
+    @staticmethod
+    def _search_segment(segment, keys: list, wanted: list, start: float, end: float, limit: int) -> list:
+        # Separate from search() so the postings views are gone before the next segment
+        # is mapped, which may close this one
+        lists = sorted((segment.postings(key) for key in keys), key=len)
+        found = []
+        if not lists[0]:
+            return found
+        bounded = segment.first < start or segment.last > end
+        for ordinal in reversed(lists[0]):
+            if bounded and not start <= segment.times[ordinal] <= end:
+                continue
+            if not all(_contains(postings, ordinal) for postings in lists[1:]):
+                continue
+            # Hash collisions and word order are settled against the text itself
+            record = segment.record(ordinal)
+            if _has_phrase(words(record.get("text", "")), wanted):
+                found.append(record)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def search(self, phrase: str, start: float = 0.0, end: float = float("inf"), limit: int = 100) -> list:
+        """Records whose text contains `phrase` as consecutive words, newest first."""
+        started = time.perf_counter()
+        wanted = words(phrase)
+        found = []
+        if wanted:
+            # A phrase is looked up by its adjacent pairs, which are far rarer than its words
+            query = wanted if len(wanted) == 1 else [f"{a} {b}" for a, b in zip(wanted, wanted[1:])]
+            keys = [term_hash(term) for term in dict.fromkeys(query)]
+            for segment in self._segments(start, end, newest_first=True):
+                found += self._search_segment(segment, keys, wanted, start, end, limit - len(found))
+                if len(found) >= limit:
+                    break
+        self._timed(started)
+        return found
+
+    def close(self) -> None:
+        """Seal the active segment so the next open starts clean."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._active.times and not self.readonly:
+            self._seal()
+        self._active.close()
+        if not self.readonly and not self._active.times:
+            os.remove(self._active.path)  # Opened after the last seal and never written
+        for segment in self._mapped.values():
+            segment.close()
+        self._mapped.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def stats(self) -> dict:
+        return {
+            "records": sum(self._counts) + len(self._active.times),
+            "segments": len(self._numbers) + bool(self._active.times),
+            "appended": self.appended,
+            "sealed": self.sealed,
+            "active_records": len(self._active.times),
+            "active_terms": self._active.term_count,
+            "mapped_segments": len(self._mapped),
+            "segments_mapped": self.segments_mapped,
+            "queries": self.queries,
+            "mean_query_ms": round(1000 * self.query_seconds / self.queries, 3) if self.queries else 0.0,
+        }
+
+
+def _contains(postings, ordinal: int) -> bool:
+    i = bisect.bisect_left(postings, ordinal)
+    return i < len(postings) and postings[i] == ordinal
+
+
+def _has_phrase(text_words: list, phrase: list) -> bool:
+    size = len(phrase)
+    return any(text_words[i : i + size] == phrase for i in range(len(text_words) - size + 1))
+
+
+def _rss_megabytes() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def benchmark(days: float = 21.0, utterances_per_hour: int = 360, directory: str = None) -> dict:
+    """Fills a journal with `days` of scripted transcripts and answers, then times queries.
+
+    Reports append rate, the mean and worst latency of 5-minute range queries
+    and word and phrase searches spread over the whole period, and RSS before
+    and after the queries.
+    """
+    import itertools
+    import random
+    import tempfile
+
+    rng = random.Random(0)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    cumulative = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulary))))  # Zipf-like
+    start = time.mktime((2026, 1, 5, 0, 0, 0, 0, 0, -1))
+    records = int(days * 24 * utterances_per_hour)
+
+    def latencies(query, arguments: list) -> dict:
+        costs = []
+        hits = 0
+        for argument in arguments:
+            started = time.perf_counter()
+            hits += len(query(*argument))
+            costs.append(time.perf_counter() - started)
+        costs.sort()
+        return {
+            "mean_ms": round(1000 * sum(costs) / len(costs), 3),
+            "p99_ms": round(1000 * costs[min(len(costs) - 1, int(0.99 * len(costs)))], 3),
+            "max_ms": round(1000 * costs[-1], 3),
+            "hits": hits,
+        }
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        journal = TranscriptJournal(tmp)
+        started = time.perf_counter()
+        for i in range(records):
+            at = start + i * 3600 / utterances_per_hour
+            transcript = " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(4, 16)))
+            journal.append({"type": "final", "time": at, "utterance": i, "text": transcript})
+            answer = " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(10, 40)))
+            journal.append({"type": "answer", "time": at + 1, "utterance": i, "transcript": transcript, "text": answer})
+        append_seconds = time.perf_counter() - started
+        journal.close()
+
+        journal = TranscriptJournal(tmp, readonly=True)
+        rss_before = _rss_megabytes()
+        span = days * 86400
+        windows = [(at, at + 300) for at in (start + rng.uniform(0, span - 300) for _ in range(200))]
+        report = {
+            "days": days,
+            "records": 2 * records,
+            "appends_per_s": round(2 * records / append_seconds),
+            "disk_mb": round(sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)) / 2**20, 1),
+            "between_5min": latencies(journal.between, windows),
+            "search_rare_word": latencies(journal.search, [(rng.choice(vocabulary[2000:]),) for _ in range(100)]),
+            "search_common_word": latencies(journal.search, [(rng.choice(vocabulary[:20]),) for _ in range(100)]),
+            "search_phrase": latencies(journal.search, [(f"{rng.choice(vocabulary[:50])} {rng.choice(vocabulary[:50])}",) for _ in range(100)]),
+            "search_in_window": latencies(
+                lambda word, window: journal.search(word, *window), [(rng.choice(vocabulary[:200]), window) for window in windows[:100]]
+            ),
+            "rss_before_queries_mb": round(rss_before, 1),
+            "rss_after_queries_mb": round(_rss_megabytes(), 1),
+            "journal": journal.stats(),
+        }
+        journal.close()
+    return report
+
+
+def _parse_time(text: str) -> float:
+    """A time.time() value, or local time written as "YYYY-MM-DD HH:MM[:SS]"."""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for layout in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return time.mktime(time.strptime(text, layout))
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognized time: {text}")
+
+
+if __name__ == "__main__":
+    # Usage: python journal.py bench [days]
+    #        python journal.py <journal dir> between "2026-10-18 14:00" "2026-10-18 14:05"
+    #        python journal.py <journal dir> search <words...>
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        print(json.dumps(benchmark(float(args[1]) if len(args) > 1 else 21.0), indent=2))
+    elif len(args) == 4 and args[1] == "between":
+        with TranscriptJournal(args[0], readonly=True) as journal:
+            for record in journal.between(_parse_time(args[2]), _parse_time(args[3])):
+                print(json.dumps(record))
+    elif len(args) >= 3 and args[1] == "search":
+        with TranscriptJournal(args[0], readonly=True) as journal:
+            for record in journal.search(" ".join(args[2:])):
+                print(json.dumps(record))
+    else:
+        sys.exit('Usage: python journal.py bench [days] | <dir> between <start> <end> | <dir> search <words...>')
@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+from collections import deque
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+# Per-stage latencies, in pipeline order
+STAGES = (
+    "capture_to_yield",  # Chunk captured in _fill_buffer -> yielded by empty_buffer
+    "yield_to_request",  # Chunk yielded -> StreamingRecognizeRequest handed to gRPC
+    "request_to_interim",  # Audio sent -> interim result covering it received
+    "request_to_final",  # Audio sent -> final result covering it received
+    "final_to_llm_request",  # Final result -> LLM request issued
+    "llm_request_to_first_token",
+    "first_token_to_last_token",
+    "final_to_first_token",  # What the user waits for once they stop speaking
+)
+
+
+class LatencyTracker:
+    """Timestamps each stage of the speech-to-answer pipeline and keeps per-stage latency histograms.
+
+    Audio is correlated by byte offset: captured and yielded chunks by their
+    position in the MicStream ring buffer (so dropped audio does not skew the
+    match), and a recognizer result by the request that carried the audio at
+    its result_end_time. Each histogram holds the most
+    recent `max_samples` latencies, so memory stays bounded on long sessions.
+    """
+
+    def __init__(self, rate: int, max_samples: int = 10000, on_sample=None) -> None:
+        """
+        Args:
+            rate (int): Sample rate in Hz, used to turn result_end_time into bytes.
+            max_samples (int): Latencies kept per stage.
+            on_sample (callable): Called as on_sample(stage, seconds) for every
+                new latency, for live monitoring.
+        """
+        self.bytes_per_second = rate * SAMPLE_WIDTH
+        self.on_sample = on_sample
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._samples = {stage: deque(maxlen=max_samples) for stage in STAGES}
+        self._counts = dict.fromkeys(STAGES, 0)
+
+        # (end offset, timestamp) pairs for captured and sent audio
+        self._captured = deque(maxlen=max_samples)
+        self._last_yield = None
+        self._sent = deque(maxlen=max_samples)
+        self._sent_bytes = 0
+
+        self._final_at = None
+        self._llm_request_at = None
+        self._first_token_at = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+        if self.on_sample:
+            self.on_sample(stage, seconds)
+
+    @staticmethod
+    def _time_at(marks: deque, offset: int) -> float:
+        """Timestamp of the chunk whose byte range contains offset, or None.
+
+        Offsets are looked up in increasing order, so marks for audio entirely
+        before offset are discarded as we go.
+        """
+        while marks and marks[0][0] <= offset:
+            marks.popleft()
+        return marks[0][1] if marks else None
+
+    # Audio path
+
+    def chunk_captured(self, end_offset: int) -> None:
+        """Mark a chunk stored in the ring buffer, ending at end_offset bytes written."""
+        with self._lock:
+            self._captured.append((end_offset, time.perf_counter()))
+
+    def chunk_yielded(self, offset: int) -> None:
+        """Mark a chunk yielded to the consumer, starting at offset bytes written."""
+        now = time.perf_counter()
+        with self._lock:
+            captured_at = self._time_at(self._captured, offset)
+            self._last_yield = now
+        if captured_at is not None:
+            self.record("capture_to_yield", now - captured_at)
+
+    def requests(self, chunks):
+        """Wraps the audio chunks feeding the request generator, marking each as sent."""
+        for chunk in chunks:
+            now = time.perf_counter()
+            with self._lock:
+                self._sent_bytes += len(chunk)
+                self._sent.append((self._sent_bytes, now))
+                last_yield = self._last_yield
+            if last_yield is not None:
+                self.record("yield_to_request", now - last_yield)
+            yield chunk
+
+    def reset_stream(self) -> None:
+        """Call when a new recognition stream starts; result offsets restart at zero."""
+        with self._lock:
+            self._sent.clear()
+            self._sent_bytes = 0
+
+    # Recognizer results
+
+    def result_received(self, result) -> None:
+        """Record a StreamingRecognitionResult, interim or final."""
+        now = time.perf_counter()
+        end_time = getattr(result, "result_end_time", None)
+        if end_time is not None:
+            offset = int(end_time.total_seconds() * self.bytes_per_second)
+            with self._lock:
+                # The result covers audio up to offset; match the request that carried its last byte
+                sent_at = self._time_at(self._sent, max(offset - 1, 0))
+            if sent_at is not None:
+                stage = "request_to_final" if result.is_final else "request_to_interim"
+                self.record(stage, now - sent_at)
+        if result.is_final:
+            self._final_at = now
+
+    # LLM generation
+
+    def llm_request(self) -> None:
+        now = time.perf_counter()
+        self._llm_request_at = now
+        self._first_token_at = None
+        if self._final_at is not None:
+            self.record("final_to_llm_request", now - self._final_at)
+
+    def token(self) -> None:
+        """Call for every streamed chunk of the answer."""
+        if self._first_token_at is not None:
+            return
+        now = time.perf_counter()
+        self._first_token_at = now
+        if self._llm_request_at is not None:
+            self.record("llm_request_to_first_token", now - self._llm_request_at)
+        if self._final_at is not None:
+            self.record("final_to_first_token", now - self._final_at)
+
+    def llm_done(self) -> None:
+        """Call once the answer has finished streaming."""
+        if self._first_token_at is not None:
+            self.record("first_token_to_last_token", time.perf_counter() - self._first_token_at)
+        self._final_at = None
+
+    # Reporting
+
+    def summary(self) -> dict:
+        """Per-stage count, p50/p95/p99 and max latency in milliseconds."""
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self._samples.items()}
+            counts = dict(self._counts)
+
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+        report = {}
+        for stage, values in snapshot.items():
+            if not values:
+                continue
+            report[stage] = {
+                "count": counts[stage],
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return report
+
+    def export_json(self, path: str) -> None:
+        """Write the session summary to path."""
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "started": self.started,
+                    "duration_s": round(time.time() - self.started, 3),
+                    "stages": self.summary(),
+                },
+                f,
+                indent=4,
+            )
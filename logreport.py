@@ -0,0 +1,473 @@
+import ast
+import calendar
+import csv
+import gzip
+import json
+import re
+import sys
+import time
+from collections import Counter, deque
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+# Messages MicStream and streamlog.ThroughputSummary write, old and current
+ADDED = "Added chunk of size "
+YIELDED = "Yielding a total of "
+SUMMARY = "Summary: "
+INITIALIZED = "MicStream initialized."
+CLOSED = "Audio stream closed."
+BUFFER_STATS = "Buffer stats: "
+SUMMARY_PATTERN = re.compile(
+    r"Summary: ([\d.]+) chunks/s, ([\d.]+) bytes/s, (\d+) yields, max queue depth (\d+) bytes over ([\d.]+)s"
+)
+
+BUCKET_FIELDS = (
+    "bucket_start",
+    "chunks",
+    "bytes",
+    "yields",
+    "coalescing_mean",
+    "interarrival_mean_ms",
+    "interarrival_max_ms",
+    "jitter_mean_ms",
+    "late_chunks",
+    "missing_chunks_est",
+    "burst_chunks",
+    "stalls",
+    "stall_total_ms",
+    "stall_max_ms",
+    "max_backlog_bytes",
+    "summary_chunks_per_s",
+    "summary_max_depth_bytes",
+)
+
+
+class _Histogram:
+    """Counts of integer values; memory grows with the range of values, not their number."""
+
+    def __init__(self) -> None:
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0
+
+    def add(self, value: float) -> None:
+        self.counts[round(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> int:
+        rank = min(self.count - 1, int(p / 100 * self.count))
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen > rank:
+                return value
+        return 0
+
+    def summary(self, scale: float = 1.0) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count / scale, 2),
+            "p50": round(self.percentile(50) / scale, 2),
+            "p95": round(self.percentile(95) / scale, 2),
+            "p99": round(self.percentile(99) / scale, 2),
+            "max": round(self.max / scale, 2),
+        }
+
+
+def _new_bucket(start: int) -> dict:
+    bucket = dict.fromkeys(BUCKET_FIELDS, 0)
+    bucket["bucket_start"] = start
+    bucket["summary_chunks_per_s"] = ""
+    bucket["summary_max_depth_bytes"] = ""
+    bucket["_coalescing"] = 0.0
+    bucket["_interarrival"] = 0.0
+    bucket["_intervals"] = 0
+    bucket["_jitter"] = 0.0
+    return bucket
+
+
+class LogAnalyzer:
+    """Capture-health metrics from MicStream log lines, in one pass and constant memory.
+
+    Reads verbose per-chunk logs (chunks added by the capture callback,
+    yields to the consumer, including the older format with its extra
+    "first chunk" lines) and the periodic "Summary:" lines the default log
+    mode writes. For each session it measures chunk inter-arrival times and
+    their jitter against the interval the chunk size implies, how many chunks
+    each yield coalesces, consumer stalls (gaps between yields while audio was
+    waiting) and late, missing and bursty chunks. Overruns and dropped bytes
+    come from the buffer stats logged at close. Latencies are kept as
+    millisecond histograms and per-bucket totals are handed to on_bucket as
+    each bucket ends.
+    """
+
+    def __init__(
+        self,
+        rate: int = 16000,
+        bucket_seconds: float = 60.0,
+        stall_ms: float = 200.0,
+        late_factor: float = 1.5,
+        burst_factor: float = 0.5,
+        max_pending: int = 100000,
+        on_bucket=None,
+    ) -> None:
+        """
+        Args:
+            rate (int): Sample rate in Hz, to turn chunk sizes into durations.
+            bucket_seconds (float): Width of each on_bucket row.
+            stall_ms (float): Gap between yields with audio waiting that counts as a stall.
+            late_factor (float): Inter-arrival times above this multiple of
+                the chunk duration count as late chunks.
+            burst_factor (float): Inter-arrival times below this multiple
+                count as burst chunks, e.g. a callback catching up.
+            max_pending (int): Unconsumed chunks tracked for stall timing; the
+                oldest are forgotten beyond this, so memory stays bounded.
+            on_bucket: Called with a dict of BUCKET_FIELDS for each bucket
+                that saw events, in time order.
+        """
+        self.bytes_per_ms = rate * SAMPLE_WIDTH / 1000
+        self.bucket_seconds = bucket_seconds
+        self.stall_ms = stall_ms
+        self.late_factor = late_factor
+        self.burst_factor = burst_factor
+        self.on_bucket = on_bucket
+        self._pending = deque(maxlen=max_pending)  # (time, bytes) of chunks added but not yet yielded
+        self._pending_bytes = 0
+        self._second = None  # Last "YYYY-MM-DD HH:MM:SS" parsed and its epoch seconds
+        self._epoch = 0
+        self._bucket = None
+        self._new_session()
+
+        # Statistics
+        self.lines = 0
+        self.malformed = 0
+        self.sessions = 0
+        self.first_time = None
+        self.last_time = None
+        self.chunks = 0
+        self.bytes = 0
+        self.yields = 0
+        self.yield_bytes = 0
+        self.interarrival = _Histogram()  # ms
+        self.jitter = _Histogram()  # |inter-arrival - chunk duration|, ms
+        self.coalescing = _Histogram()  # Chunks per yield, in tenths
+        self.chunk_wait = _Histogram()  # Chunk added -> yielded, ms
+        self.stalls = _Histogram()  # ms
+        self.late_chunks = 0
+        self.missing_chunks = 0
+        self.burst_chunks = 0
+        self.unconsumed_bytes = 0  # Left in the buffer when a session ended
+        self.unmatched_yield_bytes = 0  # Yielded without a logged capture, e.g. after forgotten chunks
+        self.max_backlog_bytes = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+        self.summary_lines = 0
+        self.summary_chunks_per_s = _Histogram()  # In tenths
+        self.summary_max_depth = 0
+        self.summary_lowest_capture_ratio = None  # Captured bytes/s over the rate's
+
+    def _new_session(self) -> None:
+        self._last_added = None
+        self._last_yield = None
+        self._chunk_ms = None
+        self._smoothed_jitter = 0.0
+
+    def _end_session(self) -> None:
+        self.unconsumed_bytes += self._pending_bytes
+        self._pending.clear()
+        self._pending_bytes = 0
+        self._new_session()
+
+    def _time(self, line: str) -> float:
+        second = line[:19]
+        if second != self._second:
+            self._epoch = calendar.timegm(time.strptime(second, "%Y-%m-%d %H:%M:%S"))
+            self._second = second
+        return self._epoch + int(line[20:23]) / 1000
+
+    def _bucket_for(self, now: float) -> dict:
+        start = int(now // self.bucket_seconds * self.bucket_seconds)
+        if self._bucket is None or start > self._bucket["bucket_start"]:
+            self._emit_bucket()
+            self._bucket = _new_bucket(start)
+        return self._bucket
+
+    def _emit_bucket(self) -> None:
+        bucket = self._bucket
+        if bucket is None or self.on_bucket is None:
+            return
+        row = {field: bucket[field] for field in BUCKET_FIELDS}
+        row["bucket_start"] = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(bucket["bucket_start"]))
+        row["coalescing_mean"] = round(bucket["_coalescing"] / bucket["yields"], 2) if bucket["yields"] else ""
+        intervals = bucket["_intervals"]
+        row["interarrival_mean_ms"] = round(bucket["_interarrival"] / intervals, 1) if intervals else ""
+        row["jitter_mean_ms"] = round(bucket["_jitter"] / intervals, 1) if intervals else ""
+        self.on_bucket(row)
+
+    def feed(self, line: str) -> None:
+        """Account for one log line."""
+        self.lines += 1
+        parts = line.rstrip("\n").split(" - ", 3)
+        if len(parts) < 4 or len(parts[0]) < 23:
+            self.malformed += 1
+            return
+        try:
+            now = self._time(parts[0])
+        except ValueError:
+            self.malformed += 1
+            return
+        message = parts[3]
+        if self.first_time is None:
+            self.first_time = now
+        self.last_time = now
+
+        if message.startswith(ADDED):
+            self._added(now, int(message[len(ADDED) :].split(" ", 1)[0]))
+        elif message.startswith(YIELDED):
+            self._yielded(now, int(message[len(YIELDED) :].split(" ", 1)[0]))
+        elif message.startswith(SUMMARY):
+            self._summary(now, message)
+        elif message.startswith(INITIALIZED):
+            self._end_session()
+            self.sessions += 1
+        elif message.startswith(CLOSED):
+            self._closed(message)
+
+    def _added(self, now: float, size: int) -> None:
+        bucket = self._bucket_for(now)
+        self.chunks += 1
+        self.bytes += size
+        bucket["chunks"] += 1
+        bucket["bytes"] += size
+        self._chunk_ms = size / self.bytes_per_ms
+        if self._last_added is not None:
+            interval = max(0.0, (now - self._last_added) * 1000)
+            deviation = abs(interval - self._chunk_ms)
+            self.interarrival.add(interval)
+            self.jitter.add(deviation)
+            bucket["_interarrival"] += interval
+            bucket["_jitter"] += deviation
+            bucket["_intervals"] += 1
+            bucket["interarrival_max_ms"] = max(bucket["interarrival_max_ms"], round(interval))
+            if interval > self.late_factor * self._chunk_ms:
+                missing = max(0, round(interval / self._chunk_ms) - 1)
+                self.late_chunks += 1
+                self.missing_chunks += missing
+                bucket["late_chunks"] += 1
+                bucket["missing_chunks_est"] += missing
+            elif interval < self.burst_factor * self._chunk_ms:
+                self.burst_chunks += 1
+                bucket["burst_chunks"] += 1
+        self._last_added = now
+
+        if not self._pending_bytes and self._last_yield is not None and self._last_yield > now:
+            self._last_yield = now  # Out-of-order timestamps from different threads
+        self._pending.append((now, size))
+        self._pending_bytes += size
+        if self._pending_bytes > self.max_backlog_bytes:
+            self.max_backlog_bytes = self._pending_bytes
+        bucket["max_backlog_bytes"] = max(bucket["max_backlog_bytes"], self._pending_bytes)
+
+    def _yielded(self, now: float, size: int) -> None:
+        bucket = self._bucket_for(now)
+        self.yields += 1
+        self.yield_bytes += size
+        bucket["yields"] += 1
+        if self._chunk_ms:
+            factor = size / (self._chunk_ms * self.bytes_per_ms)
+            self.coalescing.add(10 * factor)
+            bucket["_coalescing"] += factor
+
+        if self._pending:
+            # A stall is the time audio sat waiting since the previous yield
+            oldest = self._pending[0][0]
+            since = max(oldest, self._last_yield) if self._last_yield is not None else oldest
+            gap = (now - since) * 1000
+            if gap >= self.stall_ms:
+                self.stalls.add(gap)
+                bucket["stalls"] += 1
+                bucket["stall_total_ms"] += round(gap)
+                bucket["stall_max_ms"] = max(bucket["stall_max_ms"], round(gap))
+
+        remaining = size
+        while remaining and self._pending:
+            added, chunk = self._pending[0]
+            self.chunk_wait.add(max(0.0, (now - added) * 1000))
+            if chunk <= remaining:
+                self._pending.popleft()
+                self._pending_bytes -= chunk
+                remaining -= chunk
+            else:
+                self._pending[0] = (added, chunk - remaining)
+                self._pending_bytes -= remaining
+                remaining = 0
+        self.unmatched_yield_bytes += remaining
+        self._last_yield = now
+
+    def _summary(self, now: float, message: str) -> None:
+        match = SUMMARY_PATTERN.match(message)
+        if not match:
+            self.malformed += 1
+            return
+        chunks_per_s, bytes_per_s, yields, depth, seconds = match.groups()
+        bucket = self._bucket_for(now)
+        self.summary_lines += 1
+        self.summary_chunks_per_s.add(10 * float(chunks_per_s))
+        self.summary_max_depth = max(self.summary_max_depth, int(depth))
+        ratio = float(bytes_per_s) / (1000 * self.bytes_per_ms)
+        if self.summary_lowest_capture_ratio is None or ratio < self.summary_lowest_capture_ratio:
+            self.summary_lowest_capture_ratio = ratio
+        chunks = round(float(chunks_per_s) * float(seconds))
+        bucket["summary_chunks_per_s"] = chunks_per_s
+        bucket["summary_max_depth_bytes"] = max(int(depth), bucket["summary_max_depth_bytes"] or 0)
+        if int(yields) and chunks:
+            self.coalescing.add(10 * chunks / int(yields))
+
+    def _closed(self, message: str) -> None:
+        i = message.find(BUFFER_STATS)
+        if i >= 0:
+            try:
+                stats = ast.literal_eval(message[i + len(BUFFER_STATS) :])
+                self.overruns += stats.get("overruns", 0)
+                self.dropped_bytes += stats.get("dropped_bytes", 0)
+            except (ValueError, SyntaxError):
+                self.malformed += 1
+        self._end_session()
+
+    def finish(self) -> dict:
+        """Close the last bucket and return the summary."""
+        self._end_session()
+        self._emit_bucket()
+        self._bucket = None
+        duration = (self.last_time - self.first_time) if self.first_time is not None else 0.0
+        return {
+            "lines": self.lines,
+            "malformed_lines": self.malformed,
+            "sessions": self.sessions,
+            "span_s": round(duration, 3),
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "yields": self.yields,
+            "yield_bytes": self.yield_bytes,
+            "interarrival_ms": self.interarrival.summary(),
+            "jitter_ms": self.jitter.summary(),
+            "coalescing_chunks_per_yield": self.coalescing.summary(10),
+            "chunk_wait_ms": self.chunk_wait.summary(),
+            "stalls_ms": self.stalls.summary(),
+            "late_chunks": self.late_chunks,
+            "missing_chunks_est": self.missing_chunks,
+            "burst_chunks": self.burst_chunks,
+            "max_backlog_bytes": self.max_backlog_bytes,
+            "unconsumed_bytes": self.unconsumed_bytes,
+            "unmatched_yield_bytes": self.unmatched_yield_bytes,
+            "overruns": self.overruns,
+            "dropped_bytes": self.dropped_bytes,
+            "summary_lines": self.summary_lines,
+            "summary_chunks_per_s": self.summary_chunks_per_s.summary(10),
+            "summary_max_depth_bytes": self.summary_max_depth,
+            "summary_lowest_capture_ratio": (
+                round(self.summary_lowest_capture_ratio, 3) if self.summary_lowest_capture_ratio is not None else None
+            ),
+        }
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", errors="replace")
+    return open(path, errors="replace")
+
+
+def analyze(path: str, csv_path: str = None, **options) -> dict:
+    """Reads a MicStream log (optionally gzipped) once; writes per-bucket rows to csv_path if given.
+
+    options are passed to LogAnalyzer.
+    """
+    out = open(csv_path, "w", newline="") if csv_path else None
+    try:
+        writer = None
+        if out:
+            writer = csv.DictWriter(out, fieldnames=BUCKET_FIELDS)
+            writer.writeheader()
+        analyzer = LogAnalyzer(on_bucket=writer.writerow if writer else None, **options)
+        started = time.perf_counter()
+        with _open(path) as f:
+            for line in f:
+                analyzer.feed(line)
+        report = analyzer.finish()
+        elapsed = time.perf_counter() - started
+        report["parse_s"] = round(elapsed, 3)
+        report["lines_per_s"] = round(analyzer.lines / elapsed) if elapsed else 0
+        return report
+    finally:
+        if out:
+            out.close()
+
+
+def benchmark(lines: int = 2000000, directory: str = None) -> dict:
+    """Parses a synthetic verbose log of `lines` lines and reports throughput and peak memory.
+
+    Capture jitters around 100 ms with a late chunk every 500, and the
+    consumer stalls for half a second every 1000 chunks.
+    """
+    import os
+    import random
+    import resource
+    import tempfile
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        path = os.path.join(tmp, "audio_stream.log")
+        now = calendar.timegm((2026, 1, 5, 9, 0, 0, 0, 0, 0))
+        stalled_until = 0.0
+        pending = []
+        written = 0
+        with open(path, "w") as f:
+            f.write(time.strftime("%Y-%m-%d %H:%M:%S,000", time.gmtime(now)) + " - MicStream - INFO - MicStream initialized.\n")
+            chunk = 0
+            while written < lines:
+                chunk += 1
+                now += rng.gauss(0.1, 0.004) + (0.25 if chunk % 500 == 0 else 0.0)
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(now)) + f",{int(now * 1000) % 1000:03d}"
+                f.write(f"{stamp} - MicStream - DEBUG - Added chunk of size 3200 to buffer.\n")
+                pending.append(3200)
+                written += 1
+                if chunk % 1000 == 0:
+                    stalled_until = now + 0.5
+                if now >= stalled_until:
+                    f.write(f"{stamp} - MicStream - INFO - Yielding a total of {sum(pending)} bytes of audio data.\n")
+                    pending = []
+                    written += 1
+        size_mb = os.path.getsize(path) / 2**20
+        report = analyze(path)
+    return {
+        "lines": report["lines"],
+        "log_mb": round(size_mb, 1),
+        "lines_per_s": report["lines_per_s"],
+        "mb_per_s": round(size_mb / report["parse_s"], 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "late_chunks": report["late_chunks"],
+        "stalls": report["stalls_ms"]["count"],
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python logreport.py [log] [buckets.csv] [bucket seconds]
+    #        python logreport.py bench [lines]
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        print(json.dumps(benchmark(int(args[1]) if len(args) > 1 else 2000000), indent=2))
+    else:
+        print(json.dumps(
+            analyze(
+                args[0] if args else "logs/audio_stream.log",
+                args[1] if len(args) > 1 else None,
+                bucket_seconds=float(args[2]) if len(args) > 2 else 60.0,
+            ),
+            indent=2,
+        ))
@@ -1,88 +1,182 @@
 import sys
-import logging
-import queue
-import pyaudio
-import os
+from ringbuffer import RingBuffer, BufferOverrun
+from audiosource import AudioSource, MicrophoneSource
+from streamlog import get_stream_logger, ThroughputSummary
+from latency import LatencyTracker
+from asyncpipeline import iterate_in_thread
+from coalesce import CoalescingPolicy
+from recorder import SessionRecorder
+
+# Audio recording parameters
+RATE = 16000
+CHUNK = int(RATE / 10)  # 100ms
+SAMPLE_WIDTH = 2  # bytes per paInt16 sample
 
 
 class MicStream:
     """Opens a recording stream as an empty_buffer yielding the audio chunks."""
 
-    def __init__(self, rate: int, chunk: int) -> None:
+    def __init__(
+        self,
+        rate: int = RATE,
+        chunk: int = CHUNK,
+        buffer_seconds: float = 30.0,
+        overflow: str = None,
+        source: AudioSource = None,
+        log_mode: str = "summary",
+        log_interval: float = 5.0,
+        latency: LatencyTracker = None,
+        coalesce: CoalescingPolicy = None,
+        recorder: SessionRecorder = None,
+    ) -> None:
+        """
+        Args:
+            rate (int): Sample rate in Hz.
+            chunk (int): Frames per captured chunk.
+            buffer_seconds (float): Audio the ring buffer holds before overflowing.
+            overflow (str): Ring buffer policy when the consumer falls behind:
+                "block", "drop_oldest" or "raise". Defaults to the source's policy.
+            source (AudioSource): Where audio comes from; defaults to the microphone.
+            log_mode (str): "summary" logs chunks/s, bytes/s and max queue depth
+                every log_interval seconds; "verbose" also logs every chunk
+                added and yielded; "off" logs only open/close events.
+            log_interval (float): Seconds between summary records.
+            latency (LatencyTracker): Receives capture and yield timestamps.
+            coalesce (CoalescingPolicy): Sizes each yielded chunk; by default
+                empty_buffer yields whatever is queued.
+            recorder (SessionRecorder): Keeps a copy of every captured chunk,
+                including any the ring buffer later drops; closed with the stream.
+        """
+        if log_mode not in ("summary", "verbose", "off"):
+            raise ValueError(f"Unknown log mode {log_mode!r}")
         self._rate = rate
         self._chunk = chunk
-        self._buff = queue.Queue()
-        self.closed = True
-
-        # Ensure the 'logs' directory exists
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)  # Create the directory if it doesn't exist
-
-        # Initialize a logger for this instance
-        self.logger = logging.getLogger(self.__class__.__name__)
-        self.logger.setLevel(logging.DEBUG)
-
-        handler = logging.FileHandler(os.path.join(log_dir, "audio_stream.log"))
-        handler.setLevel(logging.DEBUG)
-
-        # Create a formatter and set it for the handler
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        self._source = source if source is not None else MicrophoneSource(rate, chunk)
+        chunk_bytes = chunk * SAMPLE_WIDTH
+        capacity = max(1, int(buffer_seconds * rate / chunk)) * chunk_bytes
+        self._buff = RingBuffer(
+            capacity,
+            policy=overflow or self._source.default_overflow,
+            align=SAMPLE_WIDTH,
         )
-        handler.setFormatter(formatter)
+        self._error = None
+        self._latency = latency
+        self._coalesce = coalesce
+        self._recorder = recorder
+        self.closed = True
 
-        # Add the handler to the logger
-        self.logger.addHandler(handler)
+        # Records are handed to a background writer; the handler is attached once per process
+        self.logger = get_stream_logger(self.__class__.__name__)
+        self._log_mode = log_mode
+        self._summary = ThroughputSummary(self.logger, log_interval) if log_mode != "off" else None
 
         self.logger.info("MicStream initialized.")
 
     def __enter__(self):
-        self._audio_interface = pyaudio.PyAudio()
-        self._audio_stream = self._audio_interface.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self._rate,
-            input=True,
-            frames_per_buffer=self._chunk,
-            # After every chunk of audio is captured, PyAudio invokes the stream_callback function
-            stream_callback=self._fill_buffer,
-        )
         self.closed = False
-        self.logger.info("Audio stream opened.")
+        self._source.start(self._fill_buffer, self._buff.close)
+        self.logger.info(f"Audio stream opened from {self._source.__class__.__name__}.")
         return self
 
-    def _fill_buffer(self, in_data, frame_count, time_info, status_flags):
-        """Fill the buffer with audio data."""
-        self._buff.put(in_data)
-        return None, pyaudio.paContinue
+    def _fill_buffer(self, in_data) -> bool:
+        """Copy the captured chunk into the ring buffer; False stops the source."""
+        if self._recorder:
+            self._recorder.write(in_data)
+        try:
+            stored = self._buff.write(in_data)
+            if stored and self._latency:
+                self._latency.chunk_captured(self._buff.write_position)
+            if self._summary:
+                self._summary.add_chunk(len(in_data), len(self._buff))
+            if self._log_mode == "verbose":
+                self.logger.debug("Added chunk of size %d to buffer.", len(in_data))
+        except BufferOverrun as e:
+            # Surface the overrun on the consumer thread instead of the audio callback
+            self._error = e
+            self._buff.close()
+            return False
+        return True
 
     def empty_buffer(self):
-        """Generates audio chunks from the stream."""
-        while not self.closed:
-            chunk = self._buff.get()
-            if chunk is None:
+        """Generates audio chunks from the stream.
+
+        Chunks are memoryview slices of the ring buffer and are only valid until
+        the next chunk is requested; call bytes() on them to keep the audio.
+        """
+        if self._coalesce:
+            yield from self._coalesced()
+            return
+
+        while True:
+            views = self._buff.read_views()
+            if self._error is not None:
+                raise self._error
+            if not views:
                 self.logger.info("Stream closed, no more data.")
                 return
 
-            data = [chunk]
-
-            # Adding additional chunks, if available
-            while True:
-                try:
-                    chunk = self._buff.get(block=False)
-                    if chunk is None:
-                        return
-                    data.append(chunk)
-                except queue.Empty:
-                    break
+            offset = self._buff.read_position
+            for view in views:
+                if self._latency:
+                    self._latency.chunk_yielded(offset)
+                    offset += len(view)
+                if self._summary:
+                    self._summary.add_yield()
+                if self._log_mode == "verbose":
+                    self.logger.info("Yielding a total of %d bytes of audio data.", len(view))
+                yield view
+
+    def _coalesced(self):
+        """empty_buffer under a CoalescingPolicy: one chunk per request-sized frame.
+
+        A frame that wraps around the end of the ring is joined into bytes; every
+        other frame is still a borrowed memoryview.
+        """
+        policy = self._coalesce
+        while True:
+            backlog = self._buff.wait()
+            waited = 0 < backlog < policy.target_bytes and policy.max_delay > 0
+            if waited:
+                backlog = self._buff.wait(policy.target_bytes, policy.max_delay)
+            views = self._buff.read_views(max_bytes=policy.frame_bytes(backlog)) if backlog else []
+            if self._error is not None:
+                raise self._error
+            if not views:
+                self.logger.info("Stream closed, no more data.")
+                return
 
-            yield b"".join(data)
+            chunk = views[0] if len(views) == 1 else b"".join(views)
+            policy.record(len(chunk), waited)
+            if self._latency:
+                self._latency.chunk_yielded(self._buff.read_position)
+            if self._summary:
+                self._summary.add_yield()
+            if self._log_mode == "verbose":
+                self.logger.info("Yielding a total of %d bytes of audio data.", len(chunk))
+            yield chunk
+
+    async def async_buffer(self):
+        """Async variant of empty_buffer for asyncio consumers.
+
+        Reads happen on a worker thread, so chunks are copied to bytes before they
+        cross over to the event loop.
+        """
+        async for chunk in iterate_in_thread(lambda: (bytes(view) for view in self.empty_buffer())):
+            yield chunk
+
+    def buffer_stats(self) -> dict:
+        """Ring buffer level, high-water mark and overrun counters."""
+        return self._buff.stats()
 
     def __exit__(self, type, value, traceback):
-        self._audio_stream.stop_stream()
-        self._audio_stream.close()
         self.closed = True
-        self._buff.put(None)
-        self._audio_interface.terminate()
-        self.logger.info("Audio stream closed.")
+        self._buff.close()
+        self._source.stop()
+        if self._summary:
+            self._summary.flush()
+        self.logger.info(f"Audio stream closed. Buffer stats: {self.buffer_stats()}")
+        if self._coalesce:
+            self.logger.info(f"Request sizes: {self._coalesce.stats()}")
+        if self._recorder:
+            self._recorder.close()
+            self.logger.info(f"Session recorded to {self._recorder.directory}: {self._recorder.stats()}")
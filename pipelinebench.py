@@ -0,0 +1,265 @@
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import raven
+from audiosource import AudioSource, ThreadedSource
+from fakellm import FakeLLM
+from fakerecognizer import FakeSpeechClient, encode_script
+from latency import LatencyTracker
+from micstream import MicStream
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "SpeechToText"))
+from VertexModel import VertexModel  # noqa: E402
+
+RATE = 16000
+CHUNK = int(RATE / 10)  # 100ms, one FakeSpeechClient frame
+VOCABULARY = [
+    "what", "is", "the", "weather", "like", "today", "tell", "me", "a", "joke",
+    "how", "far", "moon", "explain", "this", "error", "please", "thanks", "show", "route",
+]
+SCHEMA = 1  # Bump when the report layout changes
+
+
+class ScriptSource(ThreadedSource):
+    """Endless scripted speech in FakeSpeechClient's encoding, rendered one frame at a time.
+
+    Utterances of `min_words` to `max_words` random vocabulary words are
+    separated by `pause_frames` silent frames, reproducibly from a seed.
+    on_progress(seconds), if given, is called with the audio produced so far
+    every `progress_seconds`.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        chunk: int,
+        duration: float,
+        speed: float = 1.0,
+        min_words: int = 4,
+        max_words: int = 12,
+        pause_frames: int = 6,
+        seed: int = 0,
+        on_progress=None,
+        progress_seconds: float = 60.0,
+    ) -> None:
+        super().__init__(rate, chunk)
+        self.duration = duration
+        self.speed = speed
+        self.min_words = min_words
+        self.max_words = max_words
+        self.pause_frames = pause_frames
+        self.seed = seed
+        self.on_progress = on_progress
+        self.progress_seconds = progress_seconds
+        frame_ms = 1000 * chunk / rate
+        # Each word is one constant frame, so render every frame once up front
+        self._frames = {
+            word: encode_script([word], VOCABULARY, rate, frame_ms) for word in VOCABULARY + [None]
+        }
+
+    def _chunks(self):
+        rng = random.Random(self.seed)
+        frames = int(self.duration * self.rate / self.chunk)
+        progress_frames = max(1, int(self.progress_seconds * self.rate / self.chunk))
+        produced = 0
+        while produced < frames:
+            words = [rng.choice(VOCABULARY) for _ in range(rng.randint(self.min_words, self.max_words))]
+            for word in words + [None] * self.pause_frames:
+                if produced >= frames:
+                    return
+                yield self._frames[word]
+                produced += 1
+                if self.on_progress and produced % progress_frames == 0:
+                    self.on_progress(produced * self.chunk / self.rate)
+
+
+def _rss_megabytes() -> float:
+    """Current resident set size, or the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _percentiles(values: list) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+
+    def percentile(p: float) -> float:
+        return round(1000 * values[min(len(values) - 1, int(p / 100 * len(values)))], 2)
+
+    return {
+        "count": len(values),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(1000 * values[-1], 2),
+    }
+
+
+def _run_stream(source: AudioSource, client: FakeSpeechClient, llm: FakeLLM, latency: LatencyTracker) -> dict:
+    """MicStream -> request generator -> raven.listen_print_loop -> VertexModel, for one stream."""
+    vertex_model = VertexModel(None, None, model=llm)
+    chunks = 0
+
+    def counted(audio):
+        nonlocal chunks
+        for chunk in audio:
+            chunks += 1
+            yield chunk
+
+    with MicStream(RATE, CHUNK, source=source, latency=latency, log_mode="off") as stream:
+        requests = (
+            SimpleNamespace(audio_content=bytes(content))
+            for content in latency.requests(counted(stream.empty_buffer()))
+        )
+        responses = client.streaming_recognize(None, requests)
+        raven.listen_print_loop(responses, latency, answer_tokens=vertex_model.generate_tokens)
+    return {"chunks": chunks}
+
+
+def run(
+    streams: int = 4,
+    seconds: float = 30.0,
+    speed: float = 1.0,
+    recognizer_latency: float = 0.0,
+    llm: dict = None,
+    seed: int = 0,
+) -> dict:
+    """Runs `streams` concurrent pipelines over `seconds` of scripted audio each.
+
+    Returns chunks/s, CPU seconds per stream and per audio second, and the
+    per-stage latencies of every stream pooled, including final_to_first_token
+    (time to first token once the speaker stops).
+    """
+    samples = {}
+    lock = threading.Lock()
+
+    def on_sample(stage, value):
+        with lock:
+            samples.setdefault(stage, []).append(value)
+
+    results = [None] * streams
+
+    def worker(index):
+        source = ScriptSource(RATE, CHUNK, seconds, speed=speed, seed=seed + index)
+        client = FakeSpeechClient(VOCABULARY, RATE, response_latency=recognizer_latency)
+        answers = FakeLLM(seed=seed + index, **(llm or {}))
+        results[index] = _run_stream(source, client, answers, LatencyTracker(RATE, on_sample=on_sample))
+        results[index]["llm_calls"] = answers.calls
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(streams)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    chunks = sum(r["chunks"] for r in results)
+    audio_seconds = streams * seconds
+    return {
+        "streams": streams,
+        "audio_s": audio_seconds,
+        "wall_s": round(wall, 3),
+        "chunks": chunks,
+        "chunks_per_s": round(chunks / wall, 1),
+        "realtime_factor": round(audio_seconds / wall, 2),  # Audio seconds processed per wall second
+        "cpu_s": round(cpu, 3),
+        "cpu_s_per_stream": round(cpu / streams, 3),
+        "cpu_per_audio_s": round(cpu / audio_seconds, 5),
+        "llm_calls": sum(r["llm_calls"] for r in results),
+        "stages": {stage: _percentiles(values) for stage, values in sorted(samples.items())},
+    }
+
+
+def soak(seconds: float = 3600.0, sample_seconds: float = 300.0, speed: float = 100.0, seed: int = 0) -> dict:
+    """One stream over `seconds` of scripted audio, replayed at `speed` times real time.
+
+    Stubs answer instantly so the run takes a fraction of the simulated time,
+    while chunks stay close to their live size.
+    RSS is sampled every `sample_seconds` of audio; growth is measured from the
+    first sample so warm-up allocations are not counted.
+    """
+    rss = []
+    source = ScriptSource(
+        RATE,
+        CHUNK,
+        seconds,
+        speed=speed,
+        seed=seed,
+        on_progress=lambda at: rss.append((round(at), round(_rss_megabytes(), 2))),
+        progress_seconds=sample_seconds,
+    )
+    client = FakeSpeechClient(VOCABULARY, RATE)
+    answers = FakeLLM(first_token_latency=0, token_latency=0, seed=seed)
+    latency = LatencyTracker(RATE)
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = _run_stream(source, client, answers, latency)
+    wall = time.perf_counter() - started
+    growth = rss[-1][1] - rss[0][1] if rss else 0.0
+    hours = (rss[-1][0] - rss[0][0]) / 3600 if len(rss) > 1 else 0.0
+    return {
+        "audio_s": seconds,
+        "wall_s": round(wall, 3),
+        "chunks": result["chunks"],
+        "llm_calls": answers.calls,
+        "rss_start_mb": rss[0][1] if rss else None,
+        "rss_end_mb": rss[-1][1] if rss else None,
+        "rss_growth_mb": round(growth, 2),
+        "rss_growth_mb_per_hour": round(growth / hours, 2) if hours else 0.0,
+        "rss_samples": rss,  # (audio seconds, MB)
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(quick: bool = False) -> dict:
+    """The full suite as one JSON-serializable report, stamped with the commit it ran on."""
+    llm = {"first_token_latency": 0.3, "token_latency": 0.02, "tokens": 20}
+    return {
+        "schema": SCHEMA,
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "cores": os.cpu_count(),
+        "config": {"llm": llm, "recognizer_latency": 0.01, "quick": quick},
+        "realtime": run(streams=4, seconds=10.0 if quick else 30.0, recognizer_latency=0.01, llm=llm),
+        "soak": soak(seconds=600.0 if quick else 3600.0, sample_seconds=60.0 if quick else 300.0),
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python pipelinebench.py [report.json] [--quick]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    report = benchmark(quick="--quick" in sys.argv)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args:
+        with open(args[0], "w") as f:
+            f.write(text + "\n")
+    print(text)
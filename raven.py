@@ -1,18 +1,18 @@
-import queue
+import os
 import sys
-import base64
-import vertexai
-import pyaudio
-from google.cloud import speech
-from google.cloud import aiplatform
-from google.auth.credentials import AnonymousCredentials
-from vertexai.preview.generative_models import (
-    GenerativeModel,
-    Part,
-    SafetySetting,
-    Tool,
-)
-from vertexai.preview.generative_models import grounding
+import time
+import asyncio
+import clients
+from micstream import MicStream
+from coalesce import CoalescingPolicy
+from audiosource import source_from_args
+from vad import VoiceActivityGate
+from latency import LatencyTracker
+import asyncpipeline
+from speculation import SpeculativeGenerator
+from audioencoding import AudioEncoder, recognition_config
+from recorder import SessionRecorder
+from transcriptsink import TranscriptWriter, sinks_from_args
 
 # Audio recording parameters
 RATE = 16000
@@ -21,118 +21,67 @@ LANGUAGE_CODE = "en-US"
 LOCATION = "us-east1"
 PROJECT_ID = "propane-sphinx-448317-p4"
 
-# Create model
+# The model itself is built on first use (or warmed in main) by clients
 generation_config = {
     "max_output_tokens": 8192,
     "temperature": 1,
     "top_p": 0.95,
 }
-safety_settings = [
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-        threshold=SafetySetting.HarmBlockThreshold.OFF,
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF,
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF,
-    ),
-    SafetySetting(
-        category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
-        threshold=SafetySetting.HarmBlockThreshold.OFF,
-    ),
-]
-tools = [
-    Tool.from_google_search_retrieval(
-        google_search_retrieval=grounding.GoogleSearchRetrieval()
-    ),
-]
-vertexai.init(project="propane-sphinx-448317-p4", location="us-east1")
-model = GenerativeModel(
-    "gemini-1.5-pro-002",
-    tools=tools,
-)
-
-
-# Audio stream class
-class MicrophoneStream:
-    """Opens a recording stream as a generator yielding the audio chunks."""
-
-    def __init__(self: object, rate: int = RATE, chunk: int = CHUNK) -> None:
-        self._rate = rate
-        self._chunk = chunk
-        self._buff = queue.Queue()
-        self.closed = True
-
-    def __enter__(self: object) -> object:
-        self._audio_interface = pyaudio.PyAudio()
-        self._audio_stream = self._audio_interface.open(
-            format=pyaudio.paInt16,
-            channels=1,
-            rate=self._rate,
-            input=True,
-            frames_per_buffer=self._chunk,
-            stream_callback=self._fill_buffer,
-        )
-        self.closed = False
-        return self
-
-    def __exit__(self: object, type: object, value: object, traceback: object) -> None:
-        self._audio_stream.stop_stream()
-        self._audio_stream.close()
-        self.closed = True
-        self._buff.put(None)
-        self._audio_interface.terminate()
-
-    def _fill_buffer(
-        self: object,
-        in_data: object,
-        frame_count: int,
-        time_info: object,
-        status_flags: object,
-    ) -> object:
-        """Fill the buffer with audio data."""
-        self._buff.put(in_data)
-        return None, pyaudio.paContinue
-
-    def generator(self: object) -> object:
-        """Generates audio chunks from the stream."""
-        while not self.closed:
-            chunk = self._buff.get()
-            if chunk is None:
-                return
-            data = [chunk]
-            while True:
-                try:
-                    chunk = self._buff.get(block=False)
-                    if chunk is None:
-                        return
-                    data.append(chunk)
-                except queue.Empty:
-                    break
-            yield b"".join(data)
-
-
-def generate(transcript):
-    responses = model.generate_content(
+
+
+def generate_tokens(transcript):
+    """Yields the model's answer to transcript as it streams in."""
+    responses = clients.get(clients.GEMINI).generate_content(
         [transcript],
         generation_config=generation_config,
-        safety_settings=safety_settings,
+        safety_settings=clients.safety_settings(),
         stream=True,
     )
 
     for response in responses:
         if not response.candidates or not response.candidates[0].content.parts:
             continue
-        print(response.text, end="")
+        yield response.text
+
+
+def generate(transcript, latency=None, tokens=None, output=None):
+    """Print the answer to transcript; tokens overrides where the answer comes from.
 
+    output, a TranscriptWriter, takes the answer instead of stdout.
+    """
+    if latency:
+        latency.llm_request()
+    for text in tokens if tokens is not None else generate_tokens(transcript):
+        if latency:
+            latency.token()
+        if output:
+            output.token(text)
+        else:
+            print(text, end="")
+    if output:
+        output.answer_done()
+    if latency:
+        latency.llm_done()
+
+
+def listen_print_loop(
+    responses: object,
+    latency: LatencyTracker = None,
+    speculator: SpeculativeGenerator = None,
+    answer_tokens=None,
+    output: TranscriptWriter = None,
+) -> str:
+    """Process streaming responses and print the transcriptions, submitting each phrase to the generate function.
+
+    With a speculator, generation starts as soon as an interim transcript is stable.
+    answer_tokens(transcript), if given, replaces generate_tokens as the source of answers.
+    Transcripts and answers go to output, or to a TranscriptWriter on the
+    terminal made for this loop; either way the loop never waits on the writes.
+    """
+    if output is None:
+        with TranscriptWriter() as output:
+            return listen_print_loop(responses, latency, speculator, answer_tokens, output)
 
-def listen_print_loop(responses: object) -> str:
-    """Process streaming responses and print the transcriptions, submitting each phrase to the generate function."""
-    num_chars_printed = 0
     final_transcript = ""
     for response in responses:
         if not response.results:
@@ -141,58 +90,149 @@ def listen_print_loop(responses: object) -> str:
         result = response.results[0]
         if not result.alternatives:
             continue
+        if latency:
+            latency.result_received(result)
 
         transcript = result.alternatives[0].transcript
-        overwrite_chars = " " * (num_chars_printed - len(transcript))
 
         if not result.is_final:
-            sys.stdout.write(transcript + overwrite_chars + "\r")
-            sys.stdout.flush()
-            num_chars_printed = len(transcript)
+            output.interim(transcript)
+            if speculator:
+                speculator.on_interim(transcript)
         else:
-            print(f"Final Transcript Detected: {transcript + overwrite_chars}")
-            num_chars_printed = 0
+            output.final(transcript)
 
             # Check if the transcript is not empty or too short
             if transcript.strip():  # Only pass non-empty transcriptions
-                generate(
-                    transcript
-                )  # Just pass the current phrase to generate function
+                if speculator:
+                    tokens = speculator.on_final(transcript)
+                else:
+                    tokens = answer_tokens(transcript) if answer_tokens else None
+                generate(transcript, latency, tokens, output)  # Just pass the current phrase to generate function
             else:
-                print("Skipping empty or noise-only transcription.")
+                output.note("Skipping empty or noise-only transcription.")
 
     return final_transcript
 
 
-def main() -> None:
-    """Transcribe speech and get responses from Vertex AI."""
+def main(
+    source: object = None,
+    vad: bool = False,
+    latency_report: str = None,
+    use_async: bool = False,
+    speculate: bool = False,
+    codec: str = None,
+    coalesce: bool = False,
+    record: bool = False,
+    startup_report: bool = False,
+    sinks: list = None,
+) -> None:
+    """Transcribe speech and get responses from Vertex AI.
+
+    source is an audiosource.AudioSource; the live microphone is used if omitted.
+    vad puts a VoiceActivityGate in front of the recognizer to skip silence.
+    latency_report is a path to write per-stage latency percentiles to on exit.
+    use_async runs the asyncio pipeline, so answers stream while transcription
+    continues and a new utterance cancels the answer to the previous one.
+    speculate starts generating on stable interim transcripts (synchronous path).
+    codec compresses audio on the wire: "flac", "ogg_opus" or None for LINEAR16.
+    coalesce sends ~100 ms requests, holding audio back at most 50 ms to fill one.
+    record keeps the captured audio under recordings/ for replaying a bad transcription.
+    startup_report prints import and init time per component once they are ready.
+    sinks receive transcripts and answers (see transcriptsink); the terminal if omitted.
+    """
     language_code = "en-US"  # Language code
 
-    client = speech.SpeechClient()
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=RATE,
-        language_code=language_code,
+    # Clients and the model load in the background while the microphone starts
+    clients.warm(
+        clients.SPEECH,
+        clients.GEMINI,
+        on_ready=(lambda report: print(clients.format_startup_report(report))) if startup_report else None,
     )
 
-    streaming_config = speech.StreamingRecognitionConfig(
-        config=config, interim_results=True
-    )
+    latency = LatencyTracker(RATE) if latency_report else None
+    coalescing = CoalescingPolicy(RATE) if coalesce else None
+    recorder = SessionRecorder(os.path.join("recordings", time.strftime("%Y%m%d-%H%M%S")), RATE) if record else None
+
+    with MicStream(RATE, CHUNK, source=source, latency=latency, coalesce=coalescing, recorder=recorder) as stream:
+        clients.mark("capture_started")
+        speech = clients.module(clients.SPEECH)
+        client = clients.get(clients.SPEECH)
+        # The request encoding follows whatever codec the audio is sent in
+        config = recognition_config(speech, RATE, language_code, codec)
+        streaming_config = speech.StreamingRecognitionConfig(
+            config=config, interim_results=True
+        )
 
-    with MicrophoneStream(RATE, CHUNK) as stream:
-        audio_generator = stream.generator()
+        audio_generator = stream.empty_buffer()
+        gate = VoiceActivityGate(RATE) if vad else None
+        if gate:
+            audio_generator = gate.filter(audio_generator)
+        if latency:
+            audio_generator = latency.requests(audio_generator)
+        encoder = AudioEncoder(codec, RATE) if codec else None
+        if encoder:
+            audio_generator = encoder.filter(audio_generator)
         requests = (
-            speech.StreamingRecognizeRequest(audio_content=content)
+            speech.StreamingRecognizeRequest(audio_content=bytes(content))
             for content in audio_generator
         )
 
         print("Starting to listen and transcribe...")
-        responses = client.streaming_recognize(streaming_config, requests)
+        speculator = SpeculativeGenerator(generate_tokens) if speculate and not use_async else None
+        with TranscriptWriter(sinks) as output:
+            if use_async:
+                final_transcript = asyncio.run(
+                    asyncpipeline.run_pipeline(
+                        client,
+                        streaming_config,
+                        audio_generator,
+                        generate_tokens,
+                        make_request=lambda content: speech.StreamingRecognizeRequest(
+                            audio_content=content
+                        ),
+                        latency=latency,
+                        output=output,
+                    )
+                )
+            else:
+                responses = client.streaming_recognize(streaming_config, requests)
 
-        # Get the final transcription from the server responses
-        final_transcript = listen_print_loop(responses)
+                # Get the final transcription from the server responses
+                final_transcript = listen_print_loop(responses, latency, speculator, output=output)
         print(f"Final Transcription: {final_transcript}")
+        print(f"Output: {output.stats()}")
+        if speculator:
+            print(f"Speculation: {speculator.stats()}")
+        if encoder:
+            print(f"Audio encoding: {encoder.stats()}")
+        if gate:
+            print(f"Voice activity gate: {gate.stats()}")
+        if coalescing:
+            print(f"Request sizes: {coalescing.stats()}")
+        if latency:
+            latency.export_json(latency_report)
+            print(f"Latency report written to {latency_report}")
 
 
 if __name__ == "__main__":
-    main()
+    # Optional arguments replay a file or synthetic audio, e.g. "recording.wav 10 --vad --async"
+    # --jsonl appends transcripts and answers to logs/transcripts.jsonl, --socket sends them to 127.0.0.1:7878,
+    # --journal keeps them searchable in data/journal (see journal.py)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    main(
+        source_from_args(args, RATE, CHUNK),
+        vad="--vad" in sys.argv,
+        latency_report="logs/latency.json" if "--latency" in sys.argv else None,
+        use_async="--async" in sys.argv,
+        speculate="--speculate" in sys.argv,
+        codec="flac" if "--flac" in sys.argv else "ogg_opus" if "--opus" in sys.argv else None,
+        coalesce="--coalesce" in sys.argv,
+        record="--record" in sys.argv,
+        startup_report="--startup" in sys.argv,
+        sinks=sinks_from_args(
+            jsonl="logs/transcripts.jsonl" if "--jsonl" in sys.argv else None,
+            address=("127.0.0.1", 7878) if "--socket" in sys.argv else None,
+            journal="data/journal" if "--journal" in sys.argv else None,
+        ),
+    )
@@ -0,0 +1,411 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import wave
+from array import array
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+METADATA = "session.json"
+INDEX = "index.bin"
+INDEX_ENTRY = struct.Struct("<dq")  # Wall time, byte offset at the end of a chunk
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:06d}.pcm"
+
+
+class _Segment:
+    """One fixed-size segment file mapped into memory."""
+
+    def __init__(self, path: str, size: int, writable: bool) -> None:
+        self.path = path
+        mode = "r+b" if writable else "rb"
+        if writable:
+            with open(path, "wb") as f:
+                f.truncate(size)  # Sparse until written
+        with open(path, mode) as f:
+            self.map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self.view = memoryview(self.map)
+
+    def close(self) -> None:
+        self.view.release()
+        self.map.close()
+
+
+class SessionRecorder:
+    """Tees captured PCM into rotating fixed-size segment files written through mmap.
+
+    A write is a copy into the mapped segment plus, at most once per
+    `index_interval` seconds or after a gap in capture, an entry in an
+    in-memory time index (wall time -> byte offset at the end of the chunk).
+    The kernel writes pages back on its own schedule. The next segment is
+    created on a background thread before the current one fills, so rotation
+    does not touch the filesystem on the capture path. Another background
+    thread appends new index entries to disk and records the bytes written
+    every `flush_interval` seconds, so a process that dies loses at most that
+    much index. A SessionReader pulls ranges back out.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        rate: int,
+        segment_seconds: float = 60.0,
+        index_interval: float = 1.0,
+        gap_tolerance: float = 0.25,
+        flush_interval: float = 1.0,
+    ) -> None:
+        """
+        Args:
+            directory (str): Where segments, index and metadata go; created if missing.
+            rate (int): Sample rate in Hz of the 16-bit mono PCM written.
+            segment_seconds (float): Audio per segment file.
+            index_interval (float): Seconds between regular index entries.
+            gap_tolerance (float): Drift between wall time and audio time that
+                counts as a gap and gets its own index entry.
+            flush_interval (float): Seconds between index and metadata flushes.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rate = rate
+        self.bytes_per_second = rate * SAMPLE_WIDTH
+        self.segment_bytes = int(segment_seconds * rate) * SAMPLE_WIDTH
+        self.index_interval = index_interval
+        self.gap_tolerance = gap_tolerance
+        self.started = time.time()
+        self._times = array("d")
+        self._offsets = array("q")
+        self._flushed = 0  # Index entries already on disk
+        self._segment = self._open_segment(0)
+        self._position = 0  # Write position in the current segment
+        self._next = None
+        self._preparing = None
+        self.error = None
+        self.closed = False
+        self._stop = threading.Event()
+
+        # Statistics
+        self.bytes = 0
+        self.writes = 0
+        self.gaps = 0
+        self.inline_rotations = 0  # Rotations that had to create the segment on the capture path
+
+        self._write_metadata()
+        open(os.path.join(directory, INDEX), "wb").close()
+        self._flusher = threading.Thread(target=self._flush_periodically, args=(flush_interval,), daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self, number: int) -> _Segment:
+        return _Segment(os.path.join(self.directory, _segment_name(number)), self.segment_bytes, True)
+
+    def _prepare_next(self, number: int) -> None:
+        try:
+            self._next = self._open_segment(number)
+        except OSError as e:
+            self.error = e
+
+    def _write_metadata(self) -> None:
+        metadata = {
+            "rate": self.rate,
+            "sample_width": SAMPLE_WIDTH,
+            "segment_bytes": self.segment_bytes,
+            "started": self.started,
+            "bytes": self.bytes,
+            "complete": self.closed,
+        }
+        path = os.path.join(self.directory, METADATA)
+        with open(path + ".tmp", "w") as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(path + ".tmp", path)  # A crash leaves the old metadata, never half of it
+
+    def _flush_index(self) -> None:
+        count = len(self._offsets)  # Offsets are appended after times, so both hold this many
+        if count > self._flushed:
+            with open(os.path.join(self.directory, INDEX), "ab") as f:
+                f.write(b"".join(
+                    INDEX_ENTRY.pack(self._times[i], self._offsets[i]) for i in range(self._flushed, count)
+                ))
+            self._flushed = count
+
+    def _flush_periodically(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self._flush_index()
+                self._write_metadata()
+            except OSError as e:
+                self.error = e
+
+    def _rotate(self) -> None:
+        number = self.bytes // self.segment_bytes
+        if self._preparing is not None:
+            self._preparing.join()
+            self._preparing = None
+        segment, self._next = self._next, None
+        if segment is None:
+            self.inline_rotations += 1
+            segment = self._open_segment(number)
+        self._segment.close()
+        self._segment = segment
+        self._position = 0
+
+    def write(self, data) -> bool:
+        """Copy a captured chunk in; False once recording has stopped after an error."""
+        if self.closed:
+            return False
+        now = time.time()
+        view = memoryview(data).cast("B")
+        try:
+            while view:
+                size = min(len(view), self.segment_bytes - self._position)
+                self._segment.view[self._position : self._position + size] = view[:size]
+                self._position += size
+                self.bytes += size
+                view = view[size:]
+                if self._position == self.segment_bytes:
+                    self._rotate()
+                elif self._preparing is None and self._next is None and self._position * 2 >= self.segment_bytes:
+                    # Half full: create the next segment off the capture path
+                    self._preparing = threading.Thread(
+                        target=self._prepare_next, args=(self.bytes // self.segment_bytes + 1,), daemon=True
+                    )
+                    self._preparing.start()
+        except (OSError, ValueError) as e:
+            self.error = e
+            self.close()
+            return False
+        self.writes += 1
+        self._index(now, self.bytes)
+        return True
+
+    def _index(self, now: float, offset: int) -> None:
+        if self._times:
+            last_time, last_offset = self._times[-1], self._offsets[-1]
+            expected = last_time + (offset - last_offset) / self.bytes_per_second
+            gap = abs(now - expected) > self.gap_tolerance
+            if not gap and now - last_time < self.index_interval:
+                return
+            self.gaps += gap
+        self._times.append(now)
+        self._offsets.append(offset)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._stop.set()
+        self._flusher.join()
+        if self._preparing is not None:
+            self._preparing.join()
+        if self._next is not None:
+            self._next.close()
+            os.remove(self._next.path)  # Prepared but never written
+        self._segment.close()
+        self._flush_index()
+        self._write_metadata()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def stats(self) -> dict:
+        return {
+            "seconds": round(self.bytes / self.bytes_per_second, 3),
+            "bytes": self.bytes,
+            "writes": self.writes,
+            "segments": -(-self.bytes // self.segment_bytes),
+            "index_entries": len(self._times),
+            "gaps": self.gaps,
+            "inline_rotations": self.inline_rotations,
+            "error": repr(self.error) if self.error else None,
+        }
+
+
+class SessionReader:
+    """Reads a SessionRecorder directory back without copying the audio.
+
+    read() returns memoryview slices of the memory-mapped segments, one per
+    segment the range crosses. They stay valid until close(); release them
+    (or let them go) before closing.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        with open(os.path.join(directory, METADATA)) as f:
+            metadata = json.load(f)
+        self.rate = metadata["rate"]
+        self.bytes_per_second = self.rate * metadata["sample_width"]
+        self.segment_bytes = metadata["segment_bytes"]
+        self.started = metadata["started"]
+        self.complete = metadata["complete"]
+
+        entries = []
+        if os.path.exists(os.path.join(directory, INDEX)):
+            with open(os.path.join(directory, INDEX), "rb") as f:
+                data = f.read()
+            entries = list(INDEX_ENTRY.iter_unpack(data[: len(data) - len(data) % INDEX_ENTRY.size]))
+        self.times = [entry[0] for entry in entries]
+        self.offsets = [entry[1] for entry in entries]
+        self.bytes = metadata["bytes"]
+        if not self.complete:
+            # An interrupted session's last flush bounds it; failing that, the segment files do
+            self.bytes = max(self.bytes, self.offsets[-1] if self.offsets else 0)
+            if not self.bytes:
+                self.bytes = sum(
+                    os.path.getsize(os.path.join(directory, name))
+                    for name in os.listdir(directory)
+                    if name.startswith("segment-") and name.endswith(".pcm")
+                )
+        if not self.times:
+            # Without an index, wall time is taken to run with the audio from the session start
+            self.times, self.offsets = [self.started], [0]
+        self._segments = {}
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio recorded."""
+        return self.bytes / self.bytes_per_second
+
+    def _segment(self, number: int) -> _Segment:
+        if number not in self._segments:
+            self._segments[number] = _Segment(
+                os.path.join(self.directory, _segment_name(number)), self.segment_bytes, False
+            )
+        return self._segments[number]
+
+    def read(self, start: float, end: float) -> list:
+        """Audio from `start` to `end` seconds into the session, as zero-copy memoryviews."""
+        first = max(0, int(start * self.bytes_per_second)) // SAMPLE_WIDTH * SAMPLE_WIDTH
+        last = min(self.bytes, int(end * self.bytes_per_second) // SAMPLE_WIDTH * SAMPLE_WIDTH)
+        views = []
+        while first < last:
+            number, position = divmod(first, self.segment_bytes)
+            size = min(last - first, self.segment_bytes - position)
+            views.append(self._segment(number).view[position : position + size])
+            first += size
+        return views
+
+    def seconds_at(self, wall_time: float) -> float:
+        """Session audio time captured at `wall_time` (a time.time() value)."""
+        if not self.times:
+            return 0.0
+        i = max(0, bisect.bisect_right(self.times, wall_time) - 1)
+        seconds = self.offsets[i] / self.bytes_per_second + (wall_time - self.times[i])
+        if i + 1 < len(self.times):
+            # Inside a gap the audio does not advance past the next entry's chunk
+            seconds = min(seconds, self.offsets[i + 1] / self.bytes_per_second)
+        return max(0.0, min(seconds, self.duration))
+
+    def read_wall(self, start_time: float, end_time: float) -> list:
+        """Audio captured between two wall-clock times, as zero-copy memoryviews."""
+        return self.read(self.seconds_at(start_time), self.seconds_at(end_time))
+
+    def export_wav(self, path: str, start: float, end: float) -> None:
+        """Write a range out as a WAV file, e.g. to replay through FileSource."""
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(self.rate)
+            for view in self.read(start, end):
+                wav.writeframes(view)
+
+    def close(self) -> None:
+        for segment in self._segments.values():
+            segment.close()
+        self._segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+
+def benchmark(seconds: float = 600.0, rate: int = 16000, chunk: int = 1600, directory: str = None) -> dict:
+    """Per-chunk cost of recording next to the ring buffer write it accompanies.
+
+    Feeds `seconds` of audio unpaced through a RingBuffer alone and through a
+    RingBuffer plus a SessionRecorder, then reads random ranges back and checks
+    them against what was written.
+    """
+    import random
+    import tempfile
+    from ringbuffer import RingBuffer, DROP_OLDEST
+
+    chunks = int(seconds * rate / chunk)
+    chunk_bytes = chunk * SAMPLE_WIDTH
+    rng = random.Random(0)
+    # 64 distinct chunks written in rotation, so byte p of the session is pcm[p % len(pcm)]
+    pcm = bytes(rng.getrandbits(8) for _ in range(chunk_bytes * 64))
+    frames = [pcm[i * chunk_bytes : (i + 1) * chunk_bytes] for i in range(64)]
+
+    def timed(recorder=None) -> list:
+        ring = RingBuffer(rate * SAMPLE_WIDTH * 30, policy=DROP_OLDEST, align=SAMPLE_WIDTH)
+        costs = []
+        for i in range(chunks):
+            data = frames[i % 64]
+            started = time.perf_counter()
+            if recorder is not None:
+                recorder.write(data)
+            ring.write(data)
+            costs.append(time.perf_counter() - started)
+        return sorted(costs)
+
+    def summary(costs: list) -> dict:
+        def percentile(p: float) -> float:
+            return round(1e6 * costs[min(len(costs) - 1, int(p / 100 * len(costs)))], 2)
+
+        return {"p50_us": percentile(50), "p99_us": percentile(99), "max_us": round(1e6 * costs[-1], 2)}
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        baseline = summary(timed())
+        recorder = SessionRecorder(os.path.join(tmp, "session"), rate)
+        recording = summary(timed(recorder))
+        recorder.close()
+
+        mismatches = 0
+        with SessionReader(os.path.join(tmp, "session")) as reader:
+            for _ in range(200):
+                start = rng.uniform(0, reader.duration - 5)
+                end = start + rng.uniform(0.1, 5)
+                got = b"".join(reader.read(start, end))
+                first = int(start * rate) * SAMPLE_WIDTH % len(pcm)
+                mismatches += got != (pcm + pcm)[first : first + len(got)]
+            started = time.perf_counter()
+            views = reader.read(0, reader.duration)
+            read_us = 1e6 * (time.perf_counter() - started)
+            del views
+
+    chunk_seconds = chunk / rate
+    return {
+        "audio_s": seconds,
+        "ring_only": baseline,
+        "ring_and_recorder": recording,
+        # Share of each chunk's real-time budget the recorder adds at p99
+        "recorder_p99_budget_pct": round(
+            100 * (recording["p99_us"] - baseline["p99_us"]) / 1e6 / chunk_seconds, 4
+        ),
+        "recorder": recorder.stats(),
+        "read_all_us": round(read_us, 1),
+        "range_mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python recorder.py bench [seconds]
+    #        python recorder.py <session dir> <start s> <end s> <out.wav>
+    args = sys.argv[1:]
+    if args and args[0] == "bench":
+        print(json.dumps(benchmark(float(args[1]) if len(args) > 1 else 600.0), indent=2))
+    elif len(args) == 4:
+        with SessionReader(args[0]) as reader:
+            reader.export_wav(args[3], float(args[1]), float(args[2]))
+            print(f"Wrote {args[3]} from {args[0]} ({reader.duration:.1f} s recorded)")
+    else:
+        sys.exit("Usage: python recorder.py bench [seconds] | <session dir> <start s> <end s> <out.wav>")
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different
+    phrasings of the same transcript share a cache entry."""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class ResponseCache:
+    """Two-tier cache for model responses keyed on prompt plus generation config.
+
+    Prompts are normalized with normalize_prompt() unless `normalize` is
+    False, for callers whose output depends on case and punctuation.
+
+    The memory tier is an LRU bounded by `max_entries`; the optional disk tier is
+    a SQLite file that survives restarts. Entries older than `ttl` seconds are
+    treated as misses in both tiers.
+    """
+
+    def __init__(
+        self, max_entries: int = 256, ttl: float = 3600.0, disk_path: str = None, normalize: bool = True
+    ) -> None:
+        """
+        Args:
+            max_entries (int): Responses kept in memory.
+            ttl (float): Seconds a response stays valid; None keeps it forever.
+            disk_path (str): SQLite file for the persistent tier; None disables it.
+            normalize (bool): Key on the normalized prompt; False keys on the exact text.
+        """
+        self.max_entries = max_entries
+        self.normalize = normalize
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (response, stored_at, latency)
+        self._lock = threading.Lock()
+        self._db = None
+        if disk_path:
+            directory = os.path.dirname(disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT, stored_at REAL, latency REAL)"
+            )
+            self._db.commit()
+
+        # Statistics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    def make_key(self, prompt: str, config: dict) -> str:
+        prompt = normalize_prompt(prompt) if self.normalize else prompt
+        payload = json.dumps([prompt, config], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.ttl is None or time.time() - stored_at < self.ttl
+
+    def get(self, prompt: str, config: dict) -> str:
+        """Returns the cached response, or None on a miss."""
+        key = self.make_key(prompt, config)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._fresh(entry[1]):
+                del self._memory[key]
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.latency_saved += entry[2]
+                return entry[0]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, stored_at, latency FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._fresh(row[1]):
+                    self._store_memory(key, row)
+                    self.disk_hits += 1
+                    self.latency_saved += row[2]
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, prompt: str, config: dict, response: str, latency: float) -> None:
+        """Store a response along with how long the model took to produce it."""
+        key = self.make_key(prompt, config)
+        entry = (response, time.time(), latency)
+        with self._lock:
+            self._store_memory(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, *entry)
+                )
+                self._db.commit()
+
+    def _store_memory(self, key: str, entry: tuple) -> None:
+        self._memory[key] = tuple(entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self) -> None:
+        """Drop expired responses from the disk tier."""
+        if self._db is None or self.ttl is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "latency_saved_s": round(self.latency_saved, 3),
+            "memory_entries": len(self._memory),
+        }
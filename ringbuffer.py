@@ -0,0 +1,189 @@
+import threading
+
+# What write() does when the consumer has fallen behind and the ring is full
+BLOCK = "block"  # Wait for the consumer to free space
+DROP_OLDEST = "drop_oldest"  # Discard the oldest unread audio to make room
+RAISE = "raise"  # Raise BufferOverrun
+POLICIES = (BLOCK, DROP_OLDEST, RAISE)
+
+
+class BufferOverrun(Exception):
+    """Raised by RingBuffer.write when the ring is full under the "raise" policy."""
+
+
+class RingBuffer:
+    """Preallocated single-producer/single-consumer byte ring buffer.
+
+    The producer copies chunks in with write(). The consumer borrows memoryview
+    slices of the unread bytes with read_views(); those slices stay valid until
+    the next read_views() or release() call, so nothing is copied on the way out.
+    """
+
+    def __init__(self, capacity: int, policy: str = BLOCK, align: int = 1) -> None:
+        """
+        Args:
+            capacity (int): Size of the ring in bytes.
+            policy (str): One of BLOCK, DROP_OLDEST or RAISE.
+            align (int): Dropped audio is rounded up to a multiple of this many
+                bytes so sample frames are never split (2 for mono int16).
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {POLICIES}")
+        if capacity <= 0 or capacity % align:
+            raise ValueError(f"Capacity {capacity} must be a positive multiple of {align}")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.align = align
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._cond = threading.Condition()
+
+        # Monotonic byte counters; positions in the ring are taken modulo capacity
+        self._head = 0  # Bytes written by the producer
+        self._tail = 0  # Bytes handed out to the consumer
+        self._floor = 0  # Start of the region the consumer still borrows
+        self.read_position = 0  # Offset of the first byte returned by the last read_views()
+        self.closed = False
+
+        # Statistics
+        self.high_water = 0
+        self.overruns = 0
+        self.dropped_bytes = 0
+
+    def __len__(self) -> int:
+        """Number of unread bytes."""
+        return self._head - self._tail
+
+    @property
+    def write_position(self) -> int:
+        """Total bytes written so far; the offset just past the newest byte."""
+        return self._head
+
+    def write(self, data: bytes, timeout: float = None) -> int:
+        """Copy data into the ring, applying the overflow policy if it is full.
+
+        Returns the number of bytes stored (0 if the chunk itself was dropped).
+        """
+        src = memoryview(data).cast("B")
+        size = len(src)
+        if size > self.capacity:
+            raise ValueError(f"Chunk of {size} bytes exceeds ring capacity {self.capacity}")
+
+        with self._cond:
+            if self.closed:
+                return 0
+
+            if self.capacity - (self._head - self._floor) < size:
+                self.overruns += 1
+
+                if self.policy == RAISE:
+                    raise BufferOverrun(
+                        f"Ring buffer full: {len(self)} unread bytes, capacity {self.capacity}"
+                    )
+
+                if self.policy == BLOCK:
+                    has_room = self._cond.wait_for(
+                        lambda: self.closed
+                        or self.capacity - (self._head - self._floor) >= size,
+                        timeout,
+                    )
+                    if self.closed:
+                        return 0
+                    if not has_room:
+                        raise BufferOverrun(f"Timed out waiting for {size} bytes of space")
+
+                elif self._floor == self._tail:
+                    # DROP_OLDEST: nothing is borrowed, so unread audio can be discarded
+                    shortfall = size - (self.capacity - (self._head - self._floor))
+                    shortfall = -(-shortfall // self.align) * self.align
+                    shortfall = min(shortfall, self._head - self._tail)
+                    self._tail += shortfall
+                    self._floor = self._tail
+                    self.dropped_bytes += shortfall
+
+                if self.capacity - (self._head - self._floor) < size:
+                    # The consumer still borrows the space we need; drop the new chunk
+                    self.dropped_bytes += size
+                    return 0
+
+            start = self._head % self.capacity
+
+        # Only the producer touches the free region, so the copy needs no lock
+        first = min(size, self.capacity - start)
+        self._view[start : start + first] = src[:first]
+        if first < size:
+            self._view[: size - first] = src[first:]
+
+        with self._cond:
+            self._head += size
+            self.high_water = max(self.high_water, self._head - self._tail)
+            self._cond.notify_all()
+        return size
+
+    def wait(self, min_bytes: int = 1, timeout: float = None) -> int:
+        """Block until at least min_bytes are unread or the ring is closed.
+
+        Releases the previous borrow first. Returns the number of unread bytes,
+        which may be fewer than min_bytes on timeout or close.
+        """
+        with self._cond:
+            self._floor = self._tail
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self.closed or self._head - self._tail >= min_bytes, timeout)
+            return self._head - self._tail
+
+    def read_views(self, timeout: float = None, max_bytes: int = None) -> list:
+        """Borrow unread bytes as one or two memoryview slices.
+
+        Blocks until data is available. Releases the previous borrow first.
+        Hands out at most max_bytes (all unread bytes by default), leaving the
+        rest for the next read. Returns an empty list once the ring is closed
+        and drained, or on timeout.
+        """
+        with self._cond:
+            self._floor = self._tail
+            self._cond.notify_all()
+
+            self._cond.wait_for(lambda: self.closed or self._head > self._tail, timeout)
+            if self._head == self._tail:
+                return []
+
+            self.read_position = self._tail
+            start = self._tail % self.capacity
+            size = self._head - self._tail
+            if max_bytes is not None:
+                size = min(size, max_bytes)
+            self._tail += size
+
+        first = min(size, self.capacity - start)
+        views = [self._view[start : start + first]]
+        if first < size:
+            views.append(self._view[: size - first])
+        return views
+
+    def release(self) -> None:
+        """Give back the slices returned by the last read_views() call."""
+        with self._cond:
+            self._floor = self._tail
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Wake any waiting reader or writer; reads drain what is left, then return []."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of the buffer level and overflow counters."""
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "policy": self.policy,
+                "level": self._head - self._tail,
+                "free": self.capacity - (self._head - self._floor),  # Excludes borrowed slices
+                "high_water": self.high_water,
+                "overruns": self.overruns,
+                "dropped_bytes": self.dropped_bytes,
+                "bytes_written": self._head,
+            }
@@ -0,0 +1,152 @@
+import re
+import threading
+import time
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class _Speculation:
+    """A generation started from an interim transcript, buffering its tokens on a worker thread."""
+
+    def __init__(self, transcript: str, generate_tokens) -> None:
+        self.transcript = transcript
+        self.key = _normalize(transcript)
+        self.started = time.perf_counter()
+        self.tokens = []
+        self.done = False
+        self.cancelled = False
+        self.error = None  # Raised to the reader once the buffered tokens are out
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, args=(generate_tokens,), daemon=True)
+        self._thread.start()
+
+    def _run(self, generate_tokens) -> None:
+        tokens = None
+        try:
+            tokens = generate_tokens(self.transcript)
+            for token in tokens:
+                with self._cond:
+                    if self.cancelled:
+                        break
+                    self.tokens.append(token)
+                    self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            if hasattr(tokens, "close"):
+                tokens.close()
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    def cancel(self) -> None:
+        with self._cond:
+            self.cancelled = True
+            self.tokens = []
+            self._cond.notify_all()
+
+    def stream(self):
+        """Yields the tokens buffered so far, then the rest as they arrive.
+
+        If generation failed, its exception is raised after the tokens that came first.
+        """
+        position = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: position < len(self.tokens) or self.done)
+                pending = self.tokens[position:]
+                finished = self.done
+            position += len(pending)
+            yield from pending
+            if finished and position >= len(self.tokens):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class SpeculativeGenerator:
+    """Starts LLM generation before the recognizer finalizes an utterance.
+
+    Feed every interim transcript to on_interim(). Once one has stayed unchanged
+    for `stable_seconds`, generation starts in the background with its output
+    held back. on_final() returns the answer's tokens: the speculative ones if
+    the final transcript matches, otherwise the speculation is cancelled and a
+    fresh generation is started.
+    """
+
+    def __init__(self, generate_tokens, stable_seconds: float = 0.6) -> None:
+        """
+        Args:
+            generate_tokens: Callable returning an iterator of answer text for a transcript.
+            stable_seconds (float): How long an interim must stay unchanged before
+                speculating on it.
+        """
+        self.generate_tokens = generate_tokens
+        self.stable_seconds = stable_seconds
+        self._lock = threading.Lock()
+        self._timer = None
+        self._interim = None
+        self._speculation = None
+
+        # Statistics
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    def on_interim(self, transcript: str) -> None:
+        """Record an interim transcript; restarts the stability window when it changes."""
+        key = _normalize(transcript)
+        with self._lock:
+            if self._interim == key:
+                return
+            self._interim = key
+            if self._timer is not None:
+                self._timer.cancel()
+            if self._speculation is not None and self._speculation.key != key:
+                self._discard()
+            if key and self._speculation is None:
+                self._timer = threading.Timer(self.stable_seconds, self._speculate, args=(transcript, key))
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _speculate(self, transcript: str, key: str) -> None:
+        with self._lock:
+            if self._interim != key or self._speculation is not None:
+                return
+            self._speculation = _Speculation(transcript, self.generate_tokens)
+            self.started += 1
+
+    def _discard(self) -> None:
+        self._speculation.cancel()
+        self._speculation = None
+        self.misses += 1
+
+    def on_final(self, transcript: str):
+        """Returns an iterator over the answer to the final transcript."""
+        key = _normalize(transcript)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._interim = None
+            speculation, self._speculation = self._speculation, None
+            if speculation is not None and speculation.key == key:
+                self.hits += 1
+                self.latency_saved += time.perf_counter() - speculation.started
+                return speculation.stream()
+            if speculation is not None:
+                self._speculation = speculation
+                self._discard()
+        return self.generate_tokens(transcript)
+
+    def stats(self) -> dict:
+        return {
+            "speculations": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / self.started if self.started else 0.0,
+            "latency_saved_s": round(self.latency_saved, 3),
+        }
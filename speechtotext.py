@@ -1,82 +1,105 @@
-import whisper
+import sys
 import sounddevice as sd
-import numpy as np
-import queue
 import threading
-import torch
 from time import time
-from transformers import pipeline
+import clients
+from correction import CorrectionStage
+from whisperworker import PooledWindowDecoder, WhisperWorkerPool
 
-# Load Whisper whisperer with CUDA support if available
-device = "cuda" if torch.cuda.is_available() else "cpu"
-whisperer = whisper.load_model("base", device=device)
-
-# Load the model for text correction
-corrector = pipeline("text2text-generation", model="t5-small")
+# Whisper runs in worker processes started when listening starts; the T5 corrector
+# is loaded by clients in the background, instead of at import
 
 # Audio settings
 samplerate = 16000  # Required sample rate for Whisper
 channels = 1  # Mono audio
-blocksize = int(samplerate * 2)  # Process 2 seconds of audio
-overlap = int(samplerate * 1)  # 1 second overlap for smoother transcription
+window_seconds = 2.0  # Process 2 seconds of audio
+hop_seconds = 1.0  # 1 second overlap for smoother transcription
+noise_floor_db = -50.0  # Windows quieter than this are not transcribed
+workers = 1  # Whisper inference processes
+backend = "fp32"  # CPU inference backend for Whisper and T5, one of clients.BACKENDS
+threads = None  # Torch threads per process; None keeps torch's default
 
-# Audio queue to accumulate data
-audio_queue = queue.Queue()
-audio_buffer = np.array([], dtype=np.float32)
+# Shared-memory ring the callback writes into, created with the worker pool
+audio_ring = None
 
 # Phrase buffer for assembling final transcription
 phrase_buffer = []
 
 # Audio callback
 def audio_callback(indata, frames, time, status):
-    """Capture microphone input and add it to the audio queue."""
+    """Capture microphone input into the audio ring."""
     if status:
         print(f"Status: {status}")
-    audio_queue.put(indata.copy())
+    audio_ring.write(indata[:, 0])
 
 # Real-time transcription processing
-def process_audio():
-    global audio_buffer, phrase_buffer
+def process_audio(decoder, corrections):
+    global phrase_buffer
     last_transcription_time = time()
 
-    while True:
-        audio_data = audio_queue.get()
-        audio_buffer = np.concatenate((audio_buffer, audio_data.flatten()))
-
-        # Process audio when the buffer reaches the required size
-        if len(audio_buffer) >= blocksize:
-            # Extract and process the chunk
-            audio_chunk = audio_buffer[:blocksize]
-            audio_buffer = audio_buffer[blocksize - overlap:]  # Retain overlap for smooth transitions
-            audio_chunk = audio_chunk / np.max(np.abs(audio_chunk))  # Normalize
-
-            # Transcribe the audio
-            print("Transcribing...")
-            result = whisperer.transcribe(audio_chunk, fp16=False, language="en")
-            transcription = result["text"].strip()
+    # Each window yields only the words the overlapping windows agree are new
+    for words in decoder.decode():
+        # Handle phrase assembly
+        if words:
+            phrase_buffer.extend(words)
+            print(f"Partial Transcription: {' '.join(phrase_buffer)}")
 
-            # Handle phrase assembly
-            if transcription:
-                phrase_buffer.append(transcription)
-                print(f"Partial Transcription: {' '.join(phrase_buffer)}")
-
-            # Clear the phrase buffer after intervals
-            if time() - last_transcription_time > 5:  # Adjust as needed
-                ft = ' '.join(phrase_buffer)
-                print("Transcription: " +ft)
-                result = corrector(ft, max_length=100, num_return_sequences=1)
-                print('Corrected: ' + result[0]['generated_text'])
-                phrase_buffer = []
-                last_transcription_time = time()
+        # Clear the phrase buffer after intervals
+        if time() - last_transcription_time > 5 and phrase_buffer:  # Adjust as needed
+            ft = ' '.join(phrase_buffer)
+            print("Transcription: " +ft)
+            corrections.submit(ft)  # Corrected on the stage's thread; prints when done
+            phrase_buffer = []
+            last_transcription_time = time()
 
 
 # Start listening and processing
-def start_listening():
-    threading.Thread(target=process_audio, daemon=True).start()
-    with sd.InputStream(callback=audio_callback, samplerate=samplerate, channels=channels, dtype="float32"):
-        print("Listening... Press Ctrl+C to stop.")
-        while True:
-            sd.sleep(1000)
+def start_listening(backend=backend, startup_report=False):
+    global audio_ring
+    options = {"backend": backend, "threads": threads}
+    clients.warm(
+        (clients.CORRECTOR, options),
+        on_ready=(lambda report: print(clients.format_startup_report(report))) if startup_report else None,
+    )
+    corrections = CorrectionStage(lambda: clients.get(clients.CORRECTOR, **options))
+    with WhisperWorkerPool(samplerate, workers=workers, transcriber_options=options) as pool:
+        # Capture starts only once Whisper has loaded, so a failed load stops here with its reason
+        print("Loading Whisper...")
+        pool.wait_ready()
+        audio_ring = pool.ring
+        decoder = PooledWindowDecoder(
+            pool,
+            samplerate,
+            window_seconds=window_seconds,
+            hop_seconds=hop_seconds,
+            noise_floor_db=noise_floor_db,
+        )
+        threading.Thread(target=process_audio, args=(decoder, corrections), daemon=True).start()
+        try:
+            with sd.InputStream(callback=audio_callback, samplerate=samplerate, channels=channels, dtype="float32"):
+                clients.mark("capture_started")
+                print("Listening... Press Ctrl+C to stop.")
+                while True:
+                    sd.sleep(1000)
+        except KeyboardInterrupt:
+            print(f"Decoder stats: {decoder.stats()}")
+            print(f"Correction stats: {corrections.stats()}")
 
 if __name__ == "__main__":
-    start_listening()
+    # With a directory, e.g. "recordings/ data/transcripts.jsonl --parquet", transcribe its files instead
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if args:
+        from batchtranscribe import transcribe_directory
+
+        print(transcribe_directory(
+            args[0],
+            args[1] if len(args) > 1 else "data/transcripts.jsonl",
+            backend="int8" if "--int8" in sys.argv else backend,
+            noise_floor_db=noise_floor_db,
+            parquet="--parquet" in sys.argv,
+        ))
+    else:
+        start_listening(
+            backend="int8" if "--int8" in sys.argv else backend,
+            startup_report="--startup" in sys.argv,
+        )
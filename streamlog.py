@@ -0,0 +1,97 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOG_DIR = "logs"
+LOG_FILE = "audio_stream.log"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener = None
+_lock = threading.Lock()
+
+
+def get_stream_logger(name: str = "MicStream", level: int = logging.DEBUG) -> logging.Logger:
+    """Returns a logger whose records are written to logs/audio_stream.log by a background thread.
+
+    The calling thread only pays for a queue put. The file handler and its
+    listener are created once per process, however many streams ask for them.
+    """
+    global _listener
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+
+    with _lock:
+        if _listener is None:
+            # Ensure the 'logs' directory exists
+            os.makedirs(LOG_DIR, exist_ok=True)
+
+            handler = logging.FileHandler(os.path.join(LOG_DIR, LOG_FILE))
+            handler.setLevel(logging.DEBUG)
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+            _listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler)
+            _listener.start()
+            # Flush whatever is still queued when the interpreter exits
+            atexit.register(_listener.stop)
+
+        if not any(
+            isinstance(h, logging.handlers.QueueHandler) and h.queue is _listener.queue
+            for h in logger.handlers
+        ):
+            logger.addHandler(logging.handlers.QueueHandler(_listener.queue))
+
+    return logger
+
+
+class ThroughputSummary:
+    """Aggregates per-chunk events into one log record every `interval` seconds.
+
+    add_chunk() and add_yield() are cheap counter updates safe to call from the
+    audio callback; a summary with chunks/s, bytes/s and the deepest buffer level
+    seen is logged once the interval has elapsed.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 5.0) -> None:
+        self.logger = logger
+        self.interval = interval
+        self._reset(time.monotonic())
+
+    def _reset(self, now: float) -> None:
+        self._started = now
+        self.chunks = 0
+        self.bytes = 0
+        self.yields = 0
+        self.max_depth = 0
+
+    def add_chunk(self, size: int, depth: int) -> None:
+        """Record one captured chunk and the buffer level after it was stored."""
+        self.chunks += 1
+        self.bytes += size
+        if depth > self.max_depth:
+            self.max_depth = depth
+        now = time.monotonic()
+        if now - self._started >= self.interval:
+            self.flush(now)
+
+    def add_yield(self) -> None:
+        self.yields += 1
+
+    def flush(self, now: float = None) -> None:
+        """Log the current interval's summary and start a new one."""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._started
+        if self.chunks and elapsed > 0:
+            self.logger.info(
+                "Summary: %.1f chunks/s, %.0f bytes/s, %d yields, max queue depth %d bytes over %.1fs",
+                self.chunks / elapsed,
+                self.bytes / elapsed,
+                self.yields,
+                self.max_depth,
+                elapsed,
+            )
+        self._reset(now)
@@ -0,0 +1,402 @@
+import abc
+import atexit
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+INTERIM = "interim"
+FINAL = "final"
+TOKEN = "token"
+ANSWER_DONE = "answer_done"
+NOTE = "note"
+
+
+class TerminalSink:
+    """Renders events on a terminal: interim transcripts overwrite one line in place.
+
+    Each batch becomes a single write and flush.
+    """
+
+    interim = True  # Wants interim transcripts
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream or sys.stdout
+        self._chars = 0  # Width of the interim line on screen
+
+    def _pad(self, text: str) -> str:
+        return text + " " * (self._chars - len(text))
+
+    def write(self, events: list) -> None:
+        parts = []
+        for event in events:
+            kind, text = event["type"], event.get("text", "")
+            if kind == INTERIM:
+                parts.append(self._pad(text) + "\r")
+                self._chars = len(text)
+            elif kind == FINAL:
+                parts.append(f"Final Transcript Detected: {self._pad(text)}\n")
+                self._chars = 0
+            elif kind == TOKEN:
+                parts.append(text)
+            elif kind == NOTE:
+                parts.append(text + "\n")
+        if parts:
+            self.stream.write("".join(parts))
+            self.stream.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class _RecordSink(abc.ABC):
+    """Turns events into one JSON record per final transcript and per complete answer.
+
+    Answer tokens are collected until the answer is done, so a record holds
+    the whole answer next to the transcript it answers. Subclasses deliver
+    each batch's records in _emit().
+    """
+
+    interim = False
+
+    def __init__(self) -> None:
+        self._answer = []
+        self._answer_started = None
+        self._transcript = None
+
+    def _records(self, events: list) -> list:
+        records = []
+        for event in events:
+            kind = event["type"]
+            if kind == FINAL:
+                self._transcript = event["text"]
+                records.append(event)
+            elif kind == TOKEN:
+                if self._answer_started is None:
+                    self._answer_started = event["time"]
+                self._answer.append(event["text"])
+            elif kind == ANSWER_DONE:
+                records.append({
+                    "type": "answer",
+                    "time": self._answer_started or event["time"],
+                    "finished": event["time"],
+                    "utterance": event["utterance"],
+                    "transcript": self._transcript,
+                    "text": "".join(self._answer),
+                })
+                self._answer = []
+                self._answer_started = None
+        return records
+
+    def write(self, events: list) -> None:
+        records = self._records(events)
+        if records:
+            self._emit(records)
+
+    @staticmethod
+    def _lines(records: list) -> bytes:
+        return "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+
+    @abc.abstractmethod
+    def _emit(self, records: list) -> None:
+        """Deliver the records of one batch."""
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink(_RecordSink):
+    """Appends final transcripts and answers to a JSON Lines file."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._file = open(path, "ab")
+
+    def _emit(self, records: list) -> None:
+        self._file.write(self._lines(records))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SocketSink(_RecordSink):
+    """Sends final transcripts and answers as JSON lines over a local socket.
+
+    address is a Unix socket path or a (host, port) pair. The connection is
+    made on first use and remade after a failure; records that cannot be sent
+    are dropped and counted rather than retried.
+    """
+
+    def __init__(self, address, timeout: float = 1.0) -> None:
+        super().__init__()
+        self.address = address
+        self.timeout = timeout
+        self._socket = None
+
+        # Statistics
+        self.dropped = 0
+
+    def _connect(self) -> socket.socket:
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _emit(self, records: list) -> None:
+        try:
+            if self._socket is None:
+                self._socket = self._connect()
+            self._socket.sendall(self._lines(records))
+        except OSError:
+            self.dropped += len(records)
+            self.close()
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class JournalSink(_RecordSink):
+    """Appends final transcripts and answers to a journal.TranscriptJournal, which it closes."""
+
+    def __init__(self, journal) -> None:
+        super().__init__()
+        self.journal = journal
+
+    def _emit(self, records: list) -> None:
+        for record in records:
+            self.journal.append(record)
+
+    def close(self) -> None:
+        self.journal.close()
+
+
+class TranscriptWriter:
+    """Hands transcripts and answers to sinks from a background thread.
+
+    interim(), final(), token(), answer_done() and note() only put an event on
+    a queue, so the recognizer loop never waits on a terminal, file or socket.
+    The writer thread takes everything queued at once and gives each sink the
+    batch in order. Interim transcripts are coalesced: only the newest is kept,
+    it is dropped once a final supersedes it, and it is rendered at most `fps`
+    times a second.
+    """
+
+    def __init__(self, sinks=None, fps: float = 20.0) -> None:
+        """
+        Args:
+            sinks: Objects with write(events) and close(), e.g. TerminalSink,
+                JsonlSink, SocketSink or JournalSink; a TerminalSink if omitted. Sinks with
+                a false `interim` attribute never see interim transcripts.
+            fps (float): Most interim renders per second.
+        """
+        self.sinks = list(sinks) if sinks is not None else [TerminalSink()]
+        self.frame_interval = 1.0 / fps
+        self._queue = queue.SimpleQueue()
+        self._utterance = 0
+        self._closed = False
+
+        # Statistics
+        self.events = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.frames = 0
+        self.interim_coalesced = 0  # Interim updates never rendered because a newer one replaced them
+        self.sink_errors = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        # Whatever is still queued is written when the interpreter exits
+        atexit.register(self.close)
+
+    def _put(self, kind: str, text: str = None) -> None:
+        event = {"type": kind, "time": time.time(), "utterance": self._utterance}
+        if text is not None:
+            event["text"] = text
+        self._queue.put(event)
+
+    def interim(self, text: str) -> None:
+        self._put(INTERIM, text)
+
+    def final(self, text: str) -> None:
+        self._utterance += 1
+        self._put(FINAL, text)
+
+    def token(self, text: str) -> None:
+        """One chunk of the answer to the latest final transcript."""
+        self._put(TOKEN, text)
+
+    def answer_done(self) -> None:
+        self._put(ANSWER_DONE)
+
+    def note(self, text: str) -> None:
+        """A line of status text for the terminal, e.g. that a transcript was skipped."""
+        self._put(NOTE, text)
+
+    def _write(self, sinks: list, events: list) -> None:
+        for sink in sinks:
+            try:
+                sink.write(events)
+            except Exception:
+                self.sink_errors += 1
+
+    def _run(self) -> None:
+        pending = None  # Newest interim transcript not yet rendered
+        next_frame = 0.0
+        stopping = False
+        while not stopping:
+            timeout = None if pending is None else max(0.0, next_frame - time.monotonic())
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = []
+            for event in batch:
+                if event is None:
+                    stopping = True
+                elif event["type"] == INTERIM:
+                    if pending is not None:
+                        self.interim_coalesced += 1
+                    pending = event
+                else:
+                    if event["type"] == FINAL and pending is not None:
+                        self.interim_coalesced += 1
+                        pending = None
+                    events.append(event)
+            self.events += len(events)
+
+            if events:
+                self.batches += 1
+                self.max_batch = max(self.max_batch, len(events))
+                self._write(self.sinks, events)
+            now = time.monotonic()
+            if pending is not None and (now >= next_frame or stopping):
+                self._write([sink for sink in self.sinks if getattr(sink, "interim", False)], [pending])
+                self.events += 1
+                self.frames += 1
+                pending = None
+                next_frame = now + self.frame_interval
+
+    def close(self) -> None:
+        """Write out everything queued, then close the sinks."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(None)
+        self._thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self) -> "TranscriptWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "interim_frames": self.frames,
+            "interim_coalesced": self.interim_coalesced,
+            "sink_errors": self.sink_errors,
+            "socket_dropped": sum(getattr(sink, "dropped", 0) for sink in self.sinks),
+        }
+
+
+def sinks_from_args(terminal: bool = True, jsonl: str = None, address=None, journal: str = None) -> list:
+    """The sinks a command line asked for: the terminal, a JSONL path, a socket address and a journal directory."""
+    sinks = [TerminalSink()] if terminal else []
+    if jsonl:
+        sinks.append(JsonlSink(jsonl))
+    if address:
+        sinks.append(SocketSink(address))
+    if journal:
+        from journal import TranscriptJournal
+
+        sinks.append(JournalSink(TranscriptJournal(journal)))
+    return sinks
+
+
+def benchmark(updates: int = 20000, words: int = 12) -> dict:
+    """Times interim and final updates from a producer against a writer on a slow terminal.
+
+    Compares the producer's time per update with direct writes (the old
+    print-per-result loop) and with a TranscriptWriter, both writing to a
+    stream that takes 50 µs per write.
+    """
+
+    class SlowStream:
+        def __init__(self):
+            self.writes = 0
+
+        def write(self, text):
+            self.writes += 1
+            time.sleep(50e-6)
+
+        def flush(self):
+            pass
+
+    texts = [" ".join(["word"] * (1 + i % words)) for i in range(updates)]
+
+    direct = SlowStream()
+    started = time.perf_counter()
+    chars = 0
+    for i, text in enumerate(texts):
+        if (i + 1) % words:
+            direct.write(text + " " * (chars - len(text)) + "\r")
+            direct.flush()
+            chars = len(text)
+        else:
+            direct.write(f"Final Transcript Detected: {text}\n")
+            chars = 0
+    direct_seconds = time.perf_counter() - started
+
+    buffered = SlowStream()
+    writer = TranscriptWriter([TerminalSink(buffered)])
+    started = time.perf_counter()
+    for i, text in enumerate(texts):
+        if (i + 1) % words:
+            writer.interim(text)
+        else:
+            writer.final(text)
+    producer_seconds = time.perf_counter() - started
+    writer.close()
+    drained_seconds = time.perf_counter() - started
+
+    return {
+        "updates": updates,
+        "direct_us_per_update": round(1e6 * direct_seconds / updates, 2),
+        "direct_writes": direct.writes,
+        "writer_us_per_update": round(1e6 * producer_seconds / updates, 2),
+        "writer_drained_s": round(drained_seconds, 3),
+        "writer_writes": buffered.writes,
+        **writer.stats(),
+    }
+
+
+if __name__ == "__main__":
+    # Usage: python transcriptsink.py [updates]
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
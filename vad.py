@@ -0,0 +1,132 @@
+from collections import deque
+import numpy as np
+
+SAMPLE_WIDTH = 2  # bytes per int16 sample
+
+
+class VoiceActivityGate:
+    """Drops silent audio between MicStream and the recognizer request generator.
+
+    Each chunk is split into fixed-size int16 frames and classified with NumPy:
+    a frame is speech if its energy clears threshold_db, or if it clears the lower
+    fricative threshold with a high zero-crossing rate (quiet consonants like
+    "s" and "f"). Once speech stops the gate stays open for `hangover_ms`, and when
+    it reopens the last `preroll_ms` of suppressed audio is sent first so word
+    onsets are not clipped.
+    """
+
+    def __init__(
+        self,
+        rate: int,
+        frame_ms: int = 20,
+        threshold_db: float = -45.0,
+        fricative_margin_db: float = 10.0,
+        zcr_threshold: float = 0.25,
+        hangover_ms: int = 400,
+        preroll_ms: int = 300,
+        keepalive_seconds: float = 5.0,
+    ) -> None:
+        """
+        Args:
+            rate (int): Sample rate in Hz.
+            frame_ms (int): Analysis frame length in milliseconds.
+            threshold_db (float): Frame RMS level (dBFS) above which audio is speech.
+            fricative_margin_db (float): How far below threshold_db a high-ZCR frame
+                may be and still count as speech.
+            zcr_threshold (float): Zero crossings per sample that mark a fricative.
+            hangover_ms (int): Audio kept after the last speech frame.
+            preroll_ms (int): Suppressed audio replayed before a speech onset.
+            keepalive_seconds (float): Send one silent frame after this much
+                suppressed audio so the recognizer stream does not time out.
+                None disables it.
+        """
+        self.frame_bytes = int(rate * frame_ms / 1000) * SAMPLE_WIDTH
+        self.threshold_db = threshold_db
+        self.fricative_db = threshold_db - fricative_margin_db
+        self.zcr_threshold = zcr_threshold
+        self.hangover_frames = hangover_ms // frame_ms
+        self.keepalive_frames = (
+            None if keepalive_seconds is None else int(keepalive_seconds * 1000 / frame_ms)
+        )
+
+        self._preroll = deque(maxlen=preroll_ms // frame_ms)
+        self._remainder = b""
+        self._hangover = 0
+        self._silent_run = 0
+
+        # Statistics
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.speech_frames = 0
+        self.total_frames = 0
+
+    @property
+    def bytes_suppressed(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """Returns a boolean speech mask for a (n_frames, frame_len) int16 array."""
+        samples = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(samples * samples, axis=1))
+        level_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frames.shape[1]
+        return (level_db > self.threshold_db) | (
+            (level_db > self.fricative_db) & (zcr > self.zcr_threshold)
+        )
+
+    def process(self, chunk) -> bytes:
+        """Gates one chunk of int16 PCM and returns the audio to forward (maybe b"")."""
+        self.bytes_in += len(chunk)
+        data = self._remainder + bytes(chunk) if self._remainder else chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = bytes(data[usable:])
+        if not usable:
+            return b""
+
+        view = memoryview(data)[:usable]
+        frames = np.frombuffer(view, dtype=np.int16).reshape(-1, self.frame_bytes // SAMPLE_WIDTH)
+        speech = self.classify(frames)
+        self.total_frames += len(speech)
+        self.speech_frames += int(np.count_nonzero(speech))
+
+        out = []
+        for i, is_speech in enumerate(speech):
+            frame = view[i * self.frame_bytes : (i + 1) * self.frame_bytes]
+            if is_speech:
+                # Replay the audio just before the onset
+                out.extend(self._preroll)
+                self._preroll.clear()
+                self._hangover = self.hangover_frames
+                self._silent_run = 0
+                out.append(frame)
+            elif self._hangover > 0:
+                self._hangover -= 1
+                out.append(frame)
+            else:
+                self._preroll.append(bytes(frame))
+                self._silent_run += 1
+                if self.keepalive_frames and self._silent_run >= self.keepalive_frames:
+                    out.append(bytes(self.frame_bytes))
+                    self._silent_run = 0
+
+        forwarded = b"".join(out)
+        self.bytes_out += len(forwarded)
+        return forwarded
+
+    def filter(self, chunks):
+        """Wraps an audio chunk generator, yielding only the audio worth recognizing."""
+        for chunk in chunks:
+            forwarded = self.process(chunk)
+            if forwarded:
+                yield forwarded
+
+    def stats(self) -> dict:
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_suppressed": self.bytes_suppressed,
+            "suppressed_ratio": self.bytes_suppressed / self.bytes_in if self.bytes_in else 0.0,
+            "speech_frames": self.speech_frames,
+            "total_frames": self.total_frames,
+        }
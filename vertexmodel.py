@@ -1,77 +1,293 @@
-from vertexai.preview.generative_models import (
-    GenerativeModel,
-    SafetySetting,
-    Tool,
-)
-from vertexai.preview.generative_models import grounding
-import vertexai
+import asyncio
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import clients
+from asyncpipeline import iterate_in_thread
+from responsecache import ResponseCache
+
+# Exception type names (google.api_core and builtins) worth another attempt
+RETRYABLE = {
+    "ResourceExhausted",  # 429 quota
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "Aborted",
+    "TooManyRequests",
+    "ConnectionError",
+    "TimeoutError",
+}
+
+
+class GenerationError(Exception):
+    """A generation that failed, keeping what went wrong instead of a generic message.
+
+    kind is the underlying exception's type name (or "blocked" when the model
+    returned no content), retryable whether another attempt could succeed,
+    and partial whether tokens had already been yielded.
+    """
+
+    def __init__(self, message: str, kind: str, retryable: bool = False, partial: bool = False, cause=None) -> None:
+        super().__init__(message)
+        self.kind = kind
+        self.retryable = retryable
+        self.partial = partial
+        self.__cause__ = cause
+
+    @classmethod
+    def wrap(cls, error: Exception, partial: bool = False) -> "GenerationError":
+        if isinstance(error, GenerationError):
+            return error
+        kind = type(error).__name__
+        return cls(f"{kind}: {error}", kind, kind in RETRYABLE and not partial, partial, error)
+
+
+class _Attempt:
+    """One streaming generate_content call, forwarding its tokens to a shared queue from a thread.
+
+    A cancelled attempt stops at its next chunk; on_finish(attempt) runs when
+    its thread ends, whichever way.
+    """
+
+    def __init__(self, number: int, stream, events: queue.Queue, on_finish) -> None:
+        self.number = number  # 0 for the original request, 1 for a hedge
+        self.started = time.perf_counter()
+        self.cancelled = False
+        self._thread = threading.Thread(target=self._run, args=(stream, events, on_finish), daemon=True)
+        self._thread.start()
+
+    def _run(self, stream, events: queue.Queue, on_finish) -> None:
+        responses = None
+        try:
+            responses = stream()
+            produced = False
+            for response in responses:
+                if self.cancelled:
+                    return
+                if response.candidates and response.candidates[0].content.parts:
+                    produced = True
+                    events.put(("token", self, response.text))
+            if not produced:
+                raise GenerationError("The model returned no content", "blocked")
+            events.put(("done", self, None))
+        except Exception as e:
+            events.put(("error", self, e))
+        finally:
+            if hasattr(responses, "close"):
+                responses.close()
+            on_finish(self)
 
 
 class VertexModel:
     """Handles generating content using the Vertex AI model."""
 
     def __init__(
-        self, project_id: str = "propane-sphinx-448317-p4", location: str = "us-east1"
+        self,
+        project_id: str = clients.PROJECT_ID,
+        location: str = clients.LOCATION,
+        cache: ResponseCache = None,
+        model=None,
+        max_concurrent: int = 4,
+        retries: int = 2,
+        backoff: float = 0.5,
+        hedge: bool = False,
+        hedge_after: float = 2.0,
+        hedge_percentile: float = 95.0,
+        max_samples: int = 1000,
     ):
         """
-        Initialize Vertex AI model and set up generation configurations.
+        Start loading the model in the background and set up generation configurations.
 
         Args:
             project_id (str): The Google Cloud project ID for Vertex AI.
             location (str): The location of the Vertex AI resources.
+            cache (ResponseCache): Optional cache for repeated questions.
+            model: Stand-in for the GenerativeModel, e.g. a fakellm.FakeLLM;
+                gets no safety settings.
+            max_concurrent (int): Requests in flight at once, hedges included.
+            retries (int): Extra attempts after a retryable failure before the
+                first token; a stream that fails midway is not retried.
+            backoff (float): Seconds before the first retry, doubled (with
+                jitter) for each one after.
+            hedge (bool): Send a second request when the first token is late.
+            hedge_after (float): Seconds counted as late until enough
+                time-to-first-token samples exist to use hedge_percentile.
+            hedge_percentile (float): Observed time-to-first-token percentile
+                after which a request is hedged.
+            max_samples (int): Time-to-first-token samples kept.
         """
+        self.model_name = "gemini-1.5-pro-002"
+        self.cache = cache
         self.generation_config = {
             "max_output_tokens": 8192,
             "temperature": 1,
             "top_p": 0.95,
         }
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._ttft = deque(maxlen=max_samples)  # From the request, including queueing and retries
+        self._attempt_ttft = deque(maxlen=max_samples)  # From the attempt that answered, for hedging
+        self._lock = threading.Lock()
+        self._model = model
+        self._model_options = {"model_name": self.model_name, "project_id": project_id, "location": location}
+        if model is None:
+            clients.warm((clients.GEMINI, self._model_options))
 
-        # Define safety settings
-        self.safety_settings = [
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-            SafetySetting(
-                category=SafetySetting.HarmCategory.HARM_CATEGORY_HARASSMENT,
-                threshold=SafetySetting.HarmBlockThreshold.OFF,
-            ),
-        ]
-
-        # Initialize tools
-        self.tools = [
-            Tool.from_google_search_retrieval(
-                google_search_retrieval=grounding.GoogleSearchRetrieval()
-            ),
-        ]
-
-        # Initialize Vertex AI
+        # Statistics
+        self.requests = 0
+        self.attempts = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0  # Hedges whose first token beat the original request's
+        self.errors = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def model(self):
+        """The GenerativeModel; waits for the background load on first use."""
+        if self._model is not None:
+            return self._model
+        return clients.get(clients.GEMINI, **self._model_options)
+
+    def hedge_threshold(self) -> float:
+        """Seconds without a first token after which a hedge is sent."""
+        with self._lock:
+            samples = sorted(self._attempt_ttft)
+        if len(samples) < 20:
+            return self.hedge_after
+        return samples[min(len(samples) - 1, int(self.hedge_percentile / 100 * len(samples)))]
+
+    def _start(self, transcript: str, number: int, events: queue.Queue) -> _Attempt:
+        """Start an attempt in a slot the caller has already acquired.
+
+        If the attempt cannot be started the slot is released before the error is raised.
+        """
+        with self._lock:
+            self.attempts += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
         try:
-            vertexai.init(project=project_id, location=location)
-            print(
-                f"Vertex AI initialized with project ID: {project_id} and location: {location}"
+            safety_settings = clients.safety_settings() if self._model is None else None
+            return _Attempt(
+                number,
+                lambda: self.model.generate_content(
+                    [transcript],
+                    generation_config=self.generation_config,
+                    safety_settings=safety_settings,
+                    stream=True,
+                ),
+                events,
+                self._finished,
             )
-        except Exception as e:
-            print(f"Error initializing Vertex AI: {e}")
+        except BaseException:
+            # No thread will run to give the slot back
+            self._finished(None)
             raise
 
-        # Initialize the model
+    def _finished(self, attempt: _Attempt) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stream(self, transcript: str):
+        """Yields the answer's tokens as they arrive.
+
+        Waits for a free slot under max_concurrent first. Failures before the
+        first token are retried with backoff when retryable; anything else
+        raises GenerationError. With hedging, a late first token starts a second
+        request (if a slot is free) and whichever answers first is streamed; the
+        other is cancelled and frees its slot once its call returns.
+        """
+        cache_config = {"model": self.model_name, **self.generation_config}
+        if self.cache is not None:
+            cached = self.cache.get(transcript, cache_config)
+            if cached is not None:
+                yield cached
+                return
+
+        with self._lock:
+            self.requests += 1
+        started = time.perf_counter()
+        events = queue.Queue()
+        self._slots.acquire()
+        primary = self._start(transcript, 0, events)
+        live = {primary}
+        hedgeable = self.hedge
+        failures = 0
+        winner = None
+        parts = []
         try:
-            self.model = GenerativeModel(
-                "gemini-1.5-pro-002",
-                tools=self.tools,
-            )
-        except Exception as e:
-            print(f"Error initializing GenerativeModel: {e}")
-            raise
+            while True:
+                timeout = None
+                if winner is None and hedgeable:
+                    timeout = max(0.0, primary.started + self.hedge_threshold() - time.perf_counter())
+                try:
+                    kind, attempt, value = events.get(timeout=timeout)
+                except queue.Empty:
+                    hedgeable = False  # One hedge per attempt, and only if a slot is free now
+                    if self._slots.acquire(blocking=False):
+                        with self._lock:
+                            self.hedged += 1
+                        live.add(self._start(transcript, 1, events))
+                    continue
+                if attempt not in live:
+                    continue  # Leftovers from a cancelled attempt
+
+                if kind == "token":
+                    if winner is None:
+                        winner = attempt
+                        now = time.perf_counter()
+                        with self._lock:
+                            self._attempt_ttft.append(now - attempt.started)
+                            self._ttft.append(now - started)
+                            self.hedge_wins += attempt.number == 1
+                        for other in live - {attempt}:
+                            other.cancelled = True
+                        live = {attempt}
+                    parts.append(value)
+                    yield value
+                elif kind == "done":
+                    live.discard(attempt)
+                    break
+                else:
+                    live.discard(attempt)
+                    error = GenerationError.wrap(value, partial=winner is not None)
+                    with self._lock:
+                        self.errors[error.kind] += 1
+                    if live:
+                        continue  # The other attempt may still answer
+                    if winner is not None or not error.retryable or failures >= self.retries:
+                        raise error
+                    time.sleep(self.backoff * 2**failures * random.uniform(0.5, 1.5))
+                    failures += 1
+                    with self._lock:
+                        self.retried += 1
+                    self._slots.acquire()
+                    primary = self._start(transcript, 0, events)
+                    live.add(primary)
+                    hedgeable = self.hedge
+        finally:
+            # A failed or abandoned stream stops whatever is still running
+            for attempt in live:
+                attempt.cancelled = True
+
+        # Only answers that streamed to completion are cached
+        if self.cache is not None:
+            self.cache.put(transcript, cache_config, "".join(parts), time.perf_counter() - started)
+
+    async def astream(self, transcript: str):
+        """Async iterator over stream(transcript); the request runs on a worker thread."""
+        async for token in iterate_in_thread(lambda: self.stream(transcript)):
+            yield token
 
     def generate_response(self, transcript: str) -> str:
         """
@@ -82,29 +298,168 @@ class VertexModel:
 
         Returns:
             str: The generated response text from the model.
+
+        Raises:
+            GenerationError: What failed, once retries and hedges are exhausted.
         """
-        try:
-            responses = self.model.generate_content(
-                [transcript],
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings,
-                stream=True,
-            )
+        return "".join(self.stream(transcript))
 
-            # Collect and return the response text
-            complete_response = ""
-            for response in responses:
-                if response.candidates and response.candidates[0].content.parts:
-                    complete_response += response.text
-            return complete_response
+    def stats(self) -> dict:
+        with self._lock:
+            samples = sorted(self._ttft)
 
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            return "An error occurred while generating the response."
+        def percentile(p: float) -> float:
+            return round(samples[min(len(samples) - 1, int(p / 100 * len(samples)))], 3) if samples else 0.0
+
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "errors": dict(self.errors),
+            "max_in_flight": self.max_in_flight,
+            "ttft_p50_s": percentile(50),
+            "ttft_p95_s": percentile(95),
+            "ttft_p99_s": percentile(99),
+            "ttft_max_s": round(samples[-1], 3) if samples else 0.0,
+            "hedge_threshold_s": round(self.hedge_threshold(), 3),
+        }
+
+
+def benchmark(requests: int = 100, concurrency: int = 4, hedge: bool = False, seed: int = 0) -> dict:
+    """Streams `requests` answers from a fakellm.FakeLLM with a slow tail and failures.
+
+    Runs `concurrency` requests at a time against an in-process stub, so
+    hedging and retries can be compared without network access.
+    """
+    from fakellm import FakeLLM
+
+    llm = FakeLLM(
+        first_token_latency=0.05,
+        token_latency=0.005,
+        tokens=10,
+        jitter=0.2,
+        slow_rate=0.1,
+        slow_latency=1.0,
+        error_rate=0.05,
+        seed=seed,
+    )
+    vertex_model = VertexModel(
+        None, None, model=llm, max_concurrent=2 * concurrency, backoff=0.05, hedge=hedge, hedge_after=0.2
+    )
+    failed = 0
+
+    def worker(index):
+        nonlocal failed
+        for number in range(index, requests, concurrency):
+            try:
+                for _ in vertex_model.stream(f"question {number}"):
+                    pass
+            except GenerationError:
+                failed += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        "hedge": hedge,
+        "wall_s": round(time.perf_counter() - started, 3),
+        "failed": failed,
+        "llm_calls": llm.calls,
+        **vertex_model.stats(),
+    }
+
+
+def check() -> None:
+    """Asserts retry, error, concurrency and hedging behavior against a fakellm.FakeLLM.
+
+    Each case scripts the stub's calls, so the check is deterministic apart
+    from thread timing and needs no network access.
+    """
+    from fakellm import FakeLLM
+
+    def model(llm: FakeLLM, **options) -> VertexModel:
+        options = {"backoff": 0.01, "hedge_after": 0.1, **options}
+        return VertexModel(None, None, model=llm, **options)
+
+    # Retryable failures before the first token are retried, up to `retries` times
+    llm = FakeLLM(first_token_latency=0.01, token_latency=0.0, tokens=5, failing_calls={1: 0, 2: 0})
+    vertex_model = model(llm, retries=2)
+    assert vertex_model.generate_response("a b") == "a b a b a "
+    assert (llm.calls, vertex_model.retried, vertex_model.errors["ConnectionError"]) == (3, 2, 2)
+
+    llm = FakeLLM(first_token_latency=0.01, token_latency=0.0, failing_calls={1: 0, 2: 0})
+    try:
+        model(llm, retries=1).generate_response("a")
+        raise AssertionError("Expected the second failure to be raised")
+    except GenerationError as e:
+        assert (e.kind, e.retryable, e.partial, llm.calls) == ("ConnectionError", True, False, 2)
+
+    # Errors that another attempt cannot fix are raised at once, keeping their kind
+    llm = FakeLLM(first_token_latency=0.01, error=ValueError, failing_calls={1: 0})
+    try:
+        model(llm).generate_response("a")
+        raise AssertionError("Expected a GenerationError")
+    except GenerationError as e:
+        assert (e.kind, e.retryable, e.partial, llm.calls) == ("ValueError", False, False, 1)
+        assert isinstance(e.__cause__, ValueError)
+
+    # A stream that fails midway is partial and not retried
+    llm = FakeLLM(first_token_latency=0.01, token_latency=0.0, failing_calls={1: 3})
+    tokens = []
+    try:
+        for token in model(llm).stream("a"):
+            tokens.append(token)
+        raise AssertionError("Expected a GenerationError")
+    except GenerationError as e:
+        assert (e.kind, e.partial, e.retryable, len(tokens), llm.calls) == ("ConnectionError", True, False, 3, 1)
+
+    # Requests and hedges together never exceed max_concurrent
+    llm = FakeLLM(first_token_latency=0.02, token_latency=0.002, tokens=5, slow_rate=0.3, slow_latency=0.3, seed=1)
+    vertex_model = model(llm, max_concurrent=3, hedge=True)
+    threads = [
+        threading.Thread(target=lambda i=i: vertex_model.generate_response(f"question {i}")) for i in range(12)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert vertex_model.requests == 12
+    assert 1 <= vertex_model.max_in_flight <= 3, vertex_model.stats()
+
+    # A hedge sent after a slow first call answers first and is the one streamed
+    llm = FakeLLM(first_token_latency=0.02, token_latency=0.0, tokens=3, slow_calls={1}, slow_latency=2.0)
+    vertex_model = model(llm, hedge=True)
+    started = time.perf_counter()
+    assert vertex_model.generate_response("a") == "a a a "
+    assert time.perf_counter() - started < 1.0
+    assert (vertex_model.hedged, vertex_model.hedge_wins, llm.calls) == (1, 1, 2)
+
+
+async def _print_answer(vertex_model: VertexModel, transcript: str) -> None:
+    async for token in vertex_model.astream(transcript):
+        print(token, end="", flush=True)
+    print()
 
 
 if __name__ == "__main__":
-    vertex_model = VertexModel()
+    # Usage: python vertexmodel.py [bench [requests] | check] [--hedge]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if args and args[0] == "check":
+        check()
+        print("VertexModel checks passed.")
+        sys.exit()
+    if args and args[0] == "bench":
+        requests = int(args[1]) if len(args) > 1 else 100
+        print(benchmark(requests, hedge=False))
+        print(benchmark(requests, hedge=True))
+        sys.exit()
+
+    vertex_model = VertexModel(cache=ResponseCache(disk_path="data/response_cache.sqlite"), hedge="--hedge" in sys.argv)
 
     while True:
         user_transcript = input(
@@ -120,8 +475,11 @@ if __name__ == "__main__":
 
         print("Processing your input...")
 
-        # Generate a response from the Vertex model
-        model_response = vertex_model.generate_response(user_transcript)
-
+        # Stream the response from the Vertex model as it arrives
         print("\nModel Response:")
-        print(model_response)
+        try:
+            asyncio.run(_print_answer(vertex_model, user_transcript))
+        except GenerationError as e:
+            print(f"\nGeneration failed ({e.kind}{', partial answer' if e.partial else ''}): {e}")
+        print(f"Cache: {vertex_model.cache.stats()}")
+        print(f"Model: {vertex_model.stats()}")
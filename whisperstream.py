@@ -0,0 +1,293 @@
+import re
+import threading
+import time
+import numpy as np
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class SampleRing:
+    """Preallocated float32 ring buffer between an audio callback and a window decoder.
+
+    Samples are addressed by absolute position (samples written so far), so the
+    decoder can copy out any recent window with window() while the producer
+    keeps writing. Nothing is reallocated per block; if the decoder falls more
+    than `capacity` samples behind, the oldest audio is overwritten.
+    """
+
+    def __init__(self, capacity: int, buffer=None) -> None:
+        """
+        Args:
+            capacity (int): Samples held, e.g. 30 seconds' worth.
+            buffer: Memory to hold the samples in, e.g. SharedMemory.buf so
+                another process can read windows; allocated here if omitted.
+        """
+        self.capacity = capacity
+        if buffer is None:
+            self._buf = np.zeros(capacity, dtype=np.float32)
+        else:
+            self._buf = np.ndarray((capacity,), dtype=np.float32, buffer=buffer)
+        self._cond = threading.Condition()
+        self.written = 0
+        self.closed = False
+
+    def write(self, samples) -> None:
+        """Copy a block of samples in; accepts any array sounddevice delivers."""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if len(samples) > self.capacity:
+            samples = samples[-self.capacity :]
+        size = len(samples)
+        start = self.written % self.capacity
+        first = min(size, self.capacity - start)
+        self._buf[start : start + first] = samples[:first]
+        if first < size:
+            self._buf[: size - first] = samples[first:]
+        with self._cond:
+            self.written += size
+            self._cond.notify_all()
+
+    def wait(self, position: int, timeout: float = None) -> bool:
+        """Block until `position` samples have been written; False if closed (or timed out) first."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.closed or self.written >= position, timeout)
+            return self.written >= position
+
+    @property
+    def oldest(self) -> int:
+        """Position of the oldest sample still held."""
+        return max(0, self.written - self.capacity)
+
+    def window(self, end: int, length: int, out: np.ndarray = None) -> np.ndarray:
+        """Copy samples [end - length, end) into out, clipped to what the ring still holds."""
+        start = max(end - length, self.oldest)
+        size = max(0, end - start)
+        out = out[:size] if out is not None else np.empty(size, dtype=np.float32)
+        offset = start % self.capacity
+        first = min(size, self.capacity - offset)
+        out[:first] = self._buf[offset : offset + first]
+        if first < size:
+            out[first:] = self._buf[: size - first]
+        return out
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def detach(self) -> None:
+        """Stop using the buffer passed in, e.g. before its SharedMemory is closed.
+
+        The ring keeps working on private, zeroed memory.
+        """
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+
+
+class HypothesisMerger:
+    """Turns transcripts of overlapping windows into a stream of new words.
+
+    Each hypothesis is aligned against the previous one inside their overlap,
+    and only the words after the last already-emitted word are returned. The
+    final `holdback` words of a hypothesis are withheld until the next window
+    confirms them, because a word cut off at the window edge is often wrong.
+    """
+
+    def __init__(self, overlap_fraction: float, holdback: int = 1) -> None:
+        """
+        Args:
+            overlap_fraction (float): Share of each window that overlaps the next one.
+            holdback (int): Trailing words withheld until the next window.
+        """
+        self.overlap_fraction = overlap_fraction
+        self.holdback = holdback
+        self._words = []
+        self._normalized = []
+        self._emitted = 0  # Words of the previous hypothesis already returned
+
+    @staticmethod
+    def _same(a: str, b: str) -> bool:
+        """Equal, or one is a truncation of the other as happens to words cut by a window edge."""
+        return a == b or (min(len(a), len(b)) >= 2 and (a.startswith(b) or b.startswith(a)))
+
+    def _align(self, normalized: list, tail_fraction: float, head_fraction: float) -> list:
+        """Matched (previous index, new index) pairs where the two hypotheses overlap."""
+        previous = self._normalized
+        # Only the tail of the previous window and the head of the new one cover the same audio
+        slack = 2
+        tail_start = max(0, min(self._emitted, int(len(previous) * (1 - tail_fraction))) - slack)
+        head_end = min(len(normalized), int(len(normalized) * head_fraction) + slack + self.holdback)
+        tail, head = previous[tail_start:], normalized[:head_end]
+
+        # Longest common subsequence of the two word lists; when a word repeats, pair the new
+        # window's head with the latest possible words of the previous tail
+        lengths = [[0] * (len(head) + 1) for _ in range(len(tail) + 1)]
+        for i in range(len(tail) - 1, -1, -1):
+            for j in range(len(head) - 1, -1, -1):
+                if self._same(tail[i], head[j]):
+                    lengths[i][j] = lengths[i + 1][j + 1] + 1
+                else:
+                    lengths[i][j] = max(lengths[i + 1][j], lengths[i][j + 1])
+        pairs = []
+        i = j = 0
+        while i < len(tail) and j < len(head):
+            if lengths[i + 1][j] == lengths[i][j]:
+                i += 1
+            elif self._same(tail[i], head[j]) and lengths[i][j] == lengths[i + 1][j + 1] + 1:
+                pairs.append((tail_start + i, j))
+                i += 1
+                j += 1
+            else:
+                j += 1
+        return pairs
+
+    def add(self, text: str, tail_fraction: float = None, head_fraction: float = None) -> list:
+        """Feed the next window's transcript; returns the newly confirmed words.
+
+        When windows vary in length, tail_fraction and head_fraction give the
+        share of the previous and of this window that the two have in common.
+        """
+        words = text.split()
+        normalized = [_normalize(w) for w in words]
+        tail_fraction = self.overlap_fraction if tail_fraction is None else tail_fraction
+        head_fraction = self.overlap_fraction if head_fraction is None else head_fraction
+        pairs = self._align(normalized, tail_fraction, head_fraction)
+
+        # Keep the fuller spelling when one of the windows cut a word off
+        for a, b in pairs:
+            if len(self._normalized[a]) > len(normalized[b]):
+                words[b], normalized[b] = self._words[a], self._normalized[a]
+
+        released = []
+        confirmed = [b for a, b in pairs if a < self._emitted]
+        if confirmed:
+            cut = confirmed[-1] + 1  # Continue right after the last word already emitted
+        elif pairs:
+            cut = pairs[0][1]  # Only withheld words recurred; continue from the first of them
+        else:
+            # Nothing to anchor on: release what was withheld rather than lose it, and
+            # assume the new window's overlap repeats the previous window's tail
+            released = self._words[self._emitted :]
+            cut = round(len(words) * head_fraction) if self._emitted else 0
+
+        cut = min(cut, len(words))
+        end = max(cut, len(words) - self.holdback)
+        self._words, self._normalized, self._emitted = words, normalized, end
+        return released + words[cut:end]
+
+    def flush(self) -> list:
+        """Release withheld words and forget the previous window, e.g. after a pause."""
+        pending = self._words[self._emitted :]
+        self._words, self._normalized, self._emitted = [], [], 0
+        return pending
+
+
+class SlidingWindowDecoder:
+    """Decodes a SampleRing in overlapping windows and yields only new words.
+
+    Every `hop_seconds` the last `window_seconds` of audio are transcribed,
+    unless the loudest 100 ms of the window is under `noise_floor_db`, in which
+    case the window is skipped and the merger is flushed. A decoder that falls
+    more than `max_lag_seconds` behind jumps to the newest audio rather than
+    building up lag.
+    """
+
+    def __init__(
+        self,
+        transcribe,
+        rate: int = 16000,
+        window_seconds: float = 2.0,
+        hop_seconds: float = 1.0,
+        noise_floor_db: float = -50.0,
+        holdback: int = 1,
+        max_lag_seconds: float = 10.0,
+    ) -> None:
+        """
+        Args:
+            transcribe: Callable taking a float32 array and returning its text,
+                e.g. lambda audio: model.transcribe(audio, fp16=False)["text"].
+            rate (int): Sample rate in Hz.
+            window_seconds (float): Audio per transcription.
+            hop_seconds (float): New audio between transcriptions.
+            noise_floor_db (float): Windows quieter than this (dBFS) are skipped.
+            holdback (int): Trailing words withheld until the next window.
+            max_lag_seconds (float): Backlog after which unread audio is skipped.
+        """
+        if not 0 < hop_seconds <= window_seconds:
+            raise ValueError("hop_seconds must be positive and no longer than window_seconds")
+        self.transcribe = transcribe
+        self.rate = rate
+        self.window = int(window_seconds * rate)
+        self.hop = int(hop_seconds * rate)
+        self.noise_floor_db = noise_floor_db
+        self.max_lag = int(max_lag_seconds * rate)
+        self.frame = rate // 10
+        self.merger = HypothesisMerger(1 - hop_seconds / window_seconds, holdback)
+        self._audio = np.empty(self.window, dtype=np.float32)
+
+        # Statistics
+        self.windows = 0
+        self.skipped_silent = 0
+        self.skipped_seconds = 0.0  # Audio jumped over to catch up
+        self.decode_seconds = 0.0
+        self.words = 0
+
+    def level_db(self, audio: np.ndarray) -> float:
+        """RMS level of the loudest 100 ms frame, in dBFS."""
+        frames = len(audio) // self.frame
+        if not frames:
+            return -np.inf
+        rms = np.sqrt(np.mean(np.square(audio[: frames * self.frame].reshape(frames, self.frame)), axis=1))
+        return 20 * np.log10(max(float(rms.max()), 1e-10))
+
+    def _decode(self, audio: np.ndarray) -> list:
+        self.windows += 1
+        if self.level_db(audio) < self.noise_floor_db:
+            self.skipped_silent += 1
+            return self.merger.flush()
+
+        started = time.process_time()
+        audio /= np.max(np.abs(audio))  # Normalize in place; the window is our own copy
+        text = self.transcribe(audio).strip()
+        self.decode_seconds += time.process_time() - started
+        return self.merger.add(text)
+
+    def decode(self, ring: SampleRing):
+        """Yields the list of new words for each window until the ring is closed and drained."""
+        end = self.window
+        while True:
+            if not ring.wait(end):
+                # Ring closed: decode whatever arrived since the last window, then release the rest
+                if ring.written > end - self.hop:
+                    words = self._decode(ring.window(ring.written, self.window, self._audio))
+                    words += self.merger.flush()
+                else:
+                    words = self.merger.flush()
+                self.words += len(words)
+                yield words
+                return
+
+            if ring.written - end > self.max_lag:
+                behind = ring.written - end
+                self.skipped_seconds += behind / self.rate
+                end = ring.written
+                words = self.merger.flush()  # The next window no longer overlaps the last one
+                self.words += len(words)
+                yield words
+
+            words = self._decode(ring.window(end, self.window, self._audio))
+            self.words += len(words)
+            yield words
+            end += self.hop
+
+    def stats(self) -> dict:
+        audio_seconds = (self.windows - self.skipped_silent) * self.hop / self.rate
+        return {
+            "windows": self.windows,
+            "skipped_silent": self.skipped_silent,
+            "skipped_lag_s": round(self.skipped_seconds, 2),
+            "words": self.words,
+            "decode_cpu_s": round(self.decode_seconds, 3),
+            # CPU seconds per second of (non-silent) audio advanced
+            "cpu_per_audio_s": round(self.decode_seconds / audio_seconds, 3) if audio_seconds else 0.0,
+        }
@@ -0,0 +1,340 @@
+import multiprocessing
+import queue
+import time
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+
+from whisperstream import SampleRing, SlidingWindowDecoder
+
+SAMPLE_BYTES = 4  # float32
+
+
+def whisper_batch_transcriber(size: str = "base", language: str = "en", backend: str = "fp32", threads: int = None):
+    """Loads Whisper in the worker and returns a function decoding a batch of windows at once.
+
+    Windows are padded to Whisper's 30 s input and decoded as one tensor batch,
+    so several queued windows cost little more than one. backend and threads
+    are as for clients.get(clients.WHISPER).
+    """
+    import clients
+    import torch
+    import whisper
+
+    model = clients.get(clients.WHISPER, size=size, backend=backend, threads=threads)
+    options = whisper.DecodingOptions(language=language, fp16=False, without_timestamps=True)
+
+    def transcribe(windows: list) -> list:
+        mels = torch.stack(
+            [
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(audio)), model.dims.n_mels)
+                for audio in windows
+            ]
+        ).to(model.device)
+        return [result.text for result in whisper.decode(model, mels, options)]
+
+    return transcribe
+
+
+def _worker(shm_name: str, capacity: int, tasks, results, make_transcriber, options: dict, max_batch: int) -> None:
+    """Worker process: copies windows out of shared memory and transcribes them in batches."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = SampleRing(capacity, buffer=shm.buf)
+    try:
+        try:
+            transcribe = make_transcriber(**options)
+        except Exception as e:
+            results.put(("error", repr(e), 0.0, 0))
+            return
+        results.put(("ready", None, 0.0, 0))
+        stopping = False
+        while not stopping:
+            task = tasks.get()
+            if task is None:
+                break
+            # Everything already queued goes into the same batch
+            batch = [task]
+            while len(batch) < max_batch:
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is None:
+                    stopping = True
+                    break
+                batch.append(task)
+
+            started = time.perf_counter()
+            try:
+                windows = []
+                for _, start, end in batch:
+                    audio = ring.window(end, end - start)
+                    peak = np.max(np.abs(audio))
+                    if peak > 0:
+                        audio /= peak  # Normalize in place; window() returned a copy
+                    windows.append(audio)
+                texts = [text.strip() for text in transcribe(windows)]
+            except Exception:
+                texts = [None] * len(batch)  # Failed windows come back without text
+            elapsed = time.perf_counter() - started
+            for (window_id, _, _), text in zip(batch, texts):
+                results.put((window_id, text, elapsed / len(batch), len(batch)))
+    finally:
+        ring = None  # Release the view before closing the shared memory
+        shm.close()
+
+
+class WhisperWorkerPool:
+    """Whisper inference in separate processes, fed through a shared-memory sample ring.
+
+    The capture callback writes into `ring` exactly as it would a local
+    SampleRing; only (id, start, end) window positions cross the process
+    boundary. Inference no longer shares the capturing process's GIL, and each
+    worker decodes whatever windows have queued up as one batch.
+    """
+
+    def __init__(
+        self,
+        rate: int = 16000,
+        ring_seconds: float = 30.0,
+        workers: int = 1,
+        max_batch: int = 4,
+        make_transcriber=whisper_batch_transcriber,
+        transcriber_options: dict = None,
+    ) -> None:
+        """
+        Args:
+            rate (int): Sample rate in Hz.
+            ring_seconds (float): Audio held in shared memory.
+            workers (int): Inference processes.
+            max_batch (int): Windows decoded together at most.
+            make_transcriber: Picklable callable run in each worker that returns
+                transcribe(list of float32 arrays) -> list of texts.
+            transcriber_options (dict): Keyword arguments for make_transcriber.
+        """
+        self.rate = rate
+        capacity = int(ring_seconds * rate)
+        self._shm = shared_memory.SharedMemory(create=True, size=capacity * SAMPLE_BYTES)
+        self.ring = SampleRing(capacity, buffer=self._shm.buf)
+        self._context = multiprocessing.get_context("spawn")  # No forking a process that holds threads
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+        self._processes = [
+            self._context.Process(
+                target=_worker,
+                args=(
+                    self._shm.name,
+                    capacity,
+                    self._tasks,
+                    self._results,
+                    make_transcriber,
+                    transcriber_options or {},
+                    max_batch,
+                ),
+                daemon=True,
+            )
+            for _ in range(workers)
+        ]
+
+    def __enter__(self):
+        for process in self._processes:
+            process.start()
+        return self
+
+    def wait_ready(self, timeout: float = None) -> None:
+        """Block until every worker has loaded its model."""
+        for _ in self._processes:
+            message = self._results.get(timeout=timeout)
+            if message[0] == "error":
+                raise RuntimeError(f"Worker failed to load its transcriber: {message[1]}")
+            if message[0] != "ready":
+                raise RuntimeError(f"Unexpected message from worker: {message!r}")
+
+    def check(self) -> None:
+        """Raise RuntimeError if a worker process has died, taking its windows with it."""
+        for process in self._processes:
+            if process.exitcode is not None:
+                raise RuntimeError(f"Whisper worker {process.pid} exited with code {process.exitcode}")
+
+    def submit(self, window_id: int, start: int, end: int) -> None:
+        self._tasks.put((window_id, start, end))
+
+    def result(self, timeout: float = None):
+        """Next (id, text, seconds, batch size) from any worker, or None on timeout."""
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def __exit__(self, type, value, traceback):
+        self.ring.close()
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.ring.detach()  # So the shared memory can close while others still hold the ring
+        self._shm.close()
+        self._shm.unlink()
+
+
+class PooledWindowDecoder(SlidingWindowDecoder):
+    """SlidingWindowDecoder whose windows are transcribed by a WhisperWorkerPool.
+
+    Up to `max_in_flight` windows are outstanding at once. While the workers
+    are busy, hops keep accumulating and are then sent as one merged window of
+    up to `max_window_seconds`; once the unsent backlog exceeds
+    `max_lag_seconds` it is dropped and decoding resumes at the newest audio.
+    Silent windows are still skipped before they reach a worker.
+    """
+
+    def __init__(
+        self,
+        pool: WhisperWorkerPool,
+        rate: int = 16000,
+        window_seconds: float = 2.0,
+        hop_seconds: float = 1.0,
+        noise_floor_db: float = -50.0,
+        holdback: int = 1,
+        max_lag_seconds: float = 10.0,
+        max_in_flight: int = 2,
+        max_window_seconds: float = 10.0,
+        max_samples: int = 10000,
+    ) -> None:
+        """
+        Args:
+            pool (WhisperWorkerPool): Started pool whose ring the audio is written to.
+            max_in_flight (int): Windows outstanding before new hops are merged.
+            max_window_seconds (float): Longest merged window.
+            max_samples (int): Queue lag samples kept for percentiles.
+
+        The remaining arguments are as for SlidingWindowDecoder.
+        """
+        super().__init__(None, rate, window_seconds, hop_seconds, noise_floor_db, holdback, max_lag_seconds)
+        self.pool = pool
+        self.max_in_flight = max_in_flight
+        self.max_window = int(max_window_seconds * rate)
+        self._scratch = np.empty(self.max_window, dtype=np.float32)
+        self._lags = deque(maxlen=max_samples)
+
+        # Statistics
+        self.submitted = 0
+        self.merged_hops = 0  # Hops folded into a longer window instead of sent alone
+        self.results = 0
+        self.batch_total = 0  # Sum of the batch size of each result
+        self.failed = 0  # Windows whose transcription raised in the worker
+        self.busy_seconds = 0.0  # Worker time, shared out over the windows of each batch
+        self.audio_advanced = 0  # Samples of new audio covered by decoded windows
+
+    def decode(self, ring: SampleRing = None):
+        """Yields the list of new words for each window until the ring is closed and drained."""
+        ring = ring or self.pool.ring
+        next_id = 0
+        emit_id = 0
+        pending = {}  # id -> (start, end, ready_at) for windows sent to a worker
+        done = {}  # id -> (text, or None to flush, start, end) waiting for earlier ids
+        end = self.window  # End of the next window
+        last_stop = 0  # End of the last window sent or skipped
+        previous = None  # (start, end) of the last window fed to the merger
+
+        while True:
+            can_submit = ring.written >= end and len(pending) < self.max_in_flight
+            message = self.pool.result(timeout=0 if can_submit else 0.02)
+            while message is not None:
+                window_id, text, seconds, batch = message
+                if window_id == "error":
+                    raise RuntimeError(f"Worker failed to load its transcriber: {text}")
+                if window_id != "ready":  # Only seen when wait_ready() was not called
+                    start, stop, ready_at = pending.pop(window_id)
+                    self._lags.append(time.perf_counter() - ready_at)
+                    self.busy_seconds += seconds
+                    self.results += 1
+                    self.batch_total += batch
+                    if text is None:
+                        self.failed += 1  # Treated like a skipped window: the merger is flushed
+                    done[window_id] = (text, start, stop)
+                message = self.pool.result(timeout=0)
+            if pending and not can_submit:
+                self.pool.check()
+
+            # Hand results to the merger strictly in window order
+            while emit_id in done:
+                text, start, stop = done.pop(emit_id)
+                emit_id += 1
+                if text is None:
+                    words = self.merger.flush()
+                    previous = None
+                else:
+                    overlap = max(0, previous[1] - start) if previous else 0
+                    tail = overlap / (previous[1] - previous[0]) if previous else 0.0
+                    words = self.merger.add(text, tail, overlap / (stop - start))
+                    previous = (start, stop)
+                self.words += len(words)
+                yield words
+
+            if ring.written < end:
+                if not ring.closed:
+                    continue
+                if pending or done:
+                    continue  # Wait for the last results
+                if ring.written <= last_stop:
+                    words = self.merger.flush()
+                    self.words += len(words)
+                    yield words
+                    return
+                end = ring.written  # One last window over the final partial hop
+
+            if ring.written - end > self.max_lag:
+                self.skipped_seconds += (ring.written - end) / self.rate
+                end = ring.written
+                done[next_id] = (None, end, end)  # The next window no longer overlaps the last one
+                next_id += 1
+                continue
+
+            if len(pending) >= self.max_in_flight:
+                continue  # Workers are busy; the hops piling up will be sent as one window
+
+            # Cover every whole hop available, up to the longest window allowed
+            hops = (ring.written - end) // self.hop
+            stop = min(end + hops * self.hop, end - self.window + self.max_window)
+            start = max(end - self.window, 0)
+            self.merged_hops += (stop - end) // self.hop
+            self.windows += 1
+            self.audio_advanced += stop - last_stop
+
+            if self.level_db(ring.window(stop, stop - start, self._scratch)) < self.noise_floor_db:
+                self.skipped_silent += 1
+                done[next_id] = (None, start, stop)
+            else:
+                # When the window's last sample arrived, for queue lag
+                ready_at = time.perf_counter() - (ring.written - stop) / self.rate
+                pending[next_id] = (start, stop, ready_at)
+                self.pool.submit(next_id, start, stop)
+                self.submitted += 1
+            next_id += 1
+            last_stop = stop
+            end = stop + self.hop
+
+    def stats(self) -> dict:
+        lags = sorted(self._lags)
+
+        def percentile(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(p / 100 * len(lags)))], 3) if lags else 0.0
+
+        audio_seconds = self.audio_advanced / self.rate
+        return {
+            "windows": self.windows,
+            "submitted": self.submitted,
+            "skipped_silent": self.skipped_silent,
+            "merged_hops": self.merged_hops,
+            "skipped_lag_s": round(self.skipped_seconds, 2),
+            "mean_batch": round(self.batch_total / self.results, 2) if self.results else 0.0,
+            "failed": self.failed,
+            "words": self.words,
+            # Worker seconds per second of audio; above 1.0 the workers cannot keep up
+            "rtf": round(self.busy_seconds / audio_seconds, 3) if audio_seconds else 0.0,
+            "queue_lag_p50_s": percentile(50),
+            "queue_lag_p95_s": percentile(95),
+            "queue_lag_max_s": round(lags[-1], 3) if lags else 0.0,
+        }